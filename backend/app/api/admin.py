@@ -1,13 +1,35 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy import func
+import os
+import tempfile
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from sqlalchemy import func, case, select, union_all
 from sqlalchemy.orm import Session
-from app.database import SessionLocal
+from app.database import SessionLocal, ReadSessionLocal
 from app.middlewares.auth_middleware import get_current_user
 from app.models import transaction as txn_model, user as user_model
+from app.core.models import TransactionType
+from app.config import ADMIN_ANALYTICS_CACHE_TTL, HOT_WALLET_SHARDS
+from app.crud.wallet import set_wallet_shards, wallet_balance
+from app.models.wallet import Wallet
+from app.utils.db_retry import contention
+from app.utils import scheduler as job_scheduler
+from app.models.scheduler import JobRun, SchedulerLease
+from app.utils.cache import TTLCache, on_model_commit
+from app.schemas.transaction import ExportFormat, TransactionExportFilter
+from app.tasks.export import MEDIA_TYPES, iter_rows, require_pyarrow, stream_export, write_parquet
+from app.utils.notifications import notifications
+from app.core.security import auth_cache_stats, invalidate_principal
+from app.core.engine import pool_stats
+from app.middlewares import auth_middleware
 from typing import List
 
 router = APIRouter()
 
+# Dashboard aggregates, dropped whenever new transactions are committed
+analytics_cache = TTLCache(ttl=ADMIN_ANALYTICS_CACHE_TTL, maxsize=16)
+on_model_commit(txn_model.Transaction, analytics_cache.clear)
+
 def get_db():
     db = SessionLocal()
     try:
@@ -15,43 +37,150 @@ def get_db():
     finally:
         db.close()
 
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def get_read_session_factory():
+    # Streaming responses outlive the request's dependencies, so they open their own session
+    return ReadSessionLocal
+
 @router.get("/flagged-transactions")
-def get_flagged_transactions(db: Session = Depends(get_db)):
+def get_flagged_transactions(db: Session = Depends(get_read_db)):
     flagged = db.query(txn_model.Transaction).filter(txn_model.Transaction.is_flagged == True).all()
     return flagged
 
 @router.get("/total-balances")
-def get_total_balances(db: Session = Depends(get_db)):
-    # Sum balances of all users (calculated dynamically)
-    users = db.query(user_model.User).all()
-    total = 0
-    for u in users:
-        credit = db.query(func.coalesce(func.sum(txn_model.Transaction.amount), 0)).filter(
-            (txn_model.Transaction.receiver_id == u.id) &
-            (txn_model.Transaction.type.in_(["deposit", "transfer"]))
-        ).scalar()
-        debit = db.query(func.coalesce(func.sum(txn_model.Transaction.amount), 0)).filter(
-            (txn_model.Transaction.sender_id == u.id) &
-            (txn_model.Transaction.type.in_(["withdraw", "transfer"]))
-        ).scalar()
-        total += (credit - debit)
-    return {"total_balance": total}
+def get_total_balances(db: Session = Depends(get_read_db)):
+    return analytics_cache.get_or_set("total_balances", lambda: _total_balances(db))
 
 @router.get("/top-users")
-def get_top_users(db: Session = Depends(get_db)):
-    # Return users sorted by transaction volume (sum of amounts sent or received)
-    users = db.query(user_model.User).all()
-    user_volumes = []
-    for u in users:
-        volume = db.query(func.coalesce(func.sum(txn_model.Transaction.amount), 0)).filter(
-            (txn_model.Transaction.receiver_id == u.id) | (txn_model.Transaction.sender_id == u.id)
-        ).scalar()
-        user_volumes.append({"user": u.username, "transaction_volume": volume})
-    user_volumes.sort(key=lambda x: x["transaction_volume"], reverse=True)
-    return user_volumes[:10]
+def get_top_users(db: Session = Depends(get_read_db)):
+    return analytics_cache.get_or_set("top_users", lambda: _top_users(db))
+
+def _total_balances(db: Session) -> dict:
+    # Sum balances of all users: transfers cancel out, so only deposits and withdrawals count
+    Transaction = txn_model.Transaction
+    total = db.query(func.coalesce(func.sum(case(
+        (Transaction.transaction_type == TransactionType.DEPOSIT, Transaction.amount),
+        (Transaction.transaction_type == TransactionType.WITHDRAWAL, -Transaction.amount),
+        else_=0
+    )), 0)).join(user_model.User, user_model.User.id == Transaction.user_id).scalar()
+    return {"total_balance": total}
+
+def _top_users(db: Session, limit: int = 10) -> List[dict]:
+    # Users sorted by transaction volume (sum of amounts sent or received)
+    Transaction = txn_model.Transaction
+    movements = union_all(
+        select(Transaction.user_id.label("user_id"), Transaction.amount.label("amount")),
+        select(Transaction.recipient_id, Transaction.amount).where(Transaction.recipient_id.isnot(None))
+    ).subquery()
+    volumes = select(
+        movements.c.user_id,
+        func.sum(movements.c.amount).label("volume")
+    ).group_by(movements.c.user_id).subquery()
+
+    volume = func.coalesce(volumes.c.volume, 0)
+    rows = db.query(user_model.User.username, volume).outerjoin(
+        volumes, volumes.c.user_id == user_model.User.id
+    ).order_by(volume.desc()).limit(limit).all()
+    return [{"user": username, "transaction_volume": total} for username, total in rows]
+
+@router.get("/notifications")
+def get_notification_stats():
+    # Email queue depth and delivery counters
+    return notifications.stats()
+
+@router.get("/auth-cache")
+def get_auth_cache_stats():
+    # Hit rates of the decoded-token and principal caches
+    return {**auth_cache_stats(), "legacy_tokens": auth_middleware.token_cache.stats()}
+
+@router.get("/db-pool")
+def get_db_pool_stats():
+    # Connections in use, overflow and checkout wait per engine
+    return pool_stats()
+
+@router.get("/wallet-contention")
+def get_wallet_contention_stats():
+    # Wallet lock waits and deadlock/serialization retries
+    return contention.stats()
+
+@router.put("/wallets/{user_id}/shards")
+def set_hot_wallet_shards(
+    user_id: int,
+    count: int = Query(HOT_WALLET_SHARDS, ge=0, le=256),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user)
+):
+    # Split a hot (merchant) wallet's credits over count rows; 0 merges them back
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+    wallet = db.query(Wallet).filter(Wallet.user_id == user_id).first()
+    if not wallet:
+        raise HTTPException(status_code=404, detail="Wallet not found")
+    wallet = set_wallet_shards(db, wallet, count)
+    return {"user_id": user_id, "shards": wallet.shard_count, "balance": wallet_balance(db, wallet)}
+
+@router.get("/jobs")
+def get_job_runs(limit: int = Query(50, ge=1, le=500), db: Session = Depends(get_read_db)):
+    # Current scheduler leader and the most recent job runs
+    lease = db.get(SchedulerLease, job_scheduler.leader.name)
+    runs = db.query(JobRun).order_by(JobRun.started_at.desc(), JobRun.id.desc()).limit(limit).all()
+    return {
+        "leader": lease.owner if lease else None,
+        "lease_expires_at": lease.expires_at if lease else None,
+        "this_worker": job_scheduler.leader.owner,
+        "runs": runs
+    }
+
+@router.get("/transactions/export")
+def export_transactions(
+    format: ExportFormat = Query(ExportFormat.CSV),
+    filters: TransactionExportFilter = Depends(),
+    session_factory=Depends(get_read_session_factory),
+    user=Depends(get_current_user)
+):
+    # Stream every transaction in [start_date, end_date) matching the filters
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+    if filters.end_date <= filters.start_date:
+        raise HTTPException(status_code=400, detail="end_date must be after start_date")
+    filename = f"transactions_{filters.start_date:%Y%m%d}_{filters.end_date:%Y%m%d}.{format.value}"
+
+    if format != ExportFormat.PARQUET:
+        return StreamingResponse(
+            stream_export(session_factory, filters, format),
+            media_type=MEDIA_TYPES[format],
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        )
+
+    # Parquet puts its footer at the end, so the file is written out before it is sent
+    try:
+        require_pyarrow()
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    fd, path = tempfile.mkstemp(suffix=".parquet", prefix="export_")
+    os.close(fd)
+    db = session_factory()
+    try:
+        write_parquet(iter_rows(db, filters), path)
+    except Exception:
+        os.remove(path)
+        raise
+    finally:
+        db.close()
+    return FileResponse(
+        path, media_type=MEDIA_TYPES[format], filename=filename, background=BackgroundTask(os.remove, path)
+    )
 
 @router.delete("/me")
 def soft_delete_user(db: Session = Depends(get_db), user=Depends(get_current_user)):
-    user.is_deleted = True
+    # user is a cached snapshot; flag the persistent row
+    db.query(user_model.User).filter(user_model.User.id == user.id).update({"is_deleted": True})
     db.commit()
+    invalidate_principal(user.id, user.username)
     return {"msg": "User account soft-deleted"}
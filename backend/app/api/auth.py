@@ -1,31 +1,60 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from app.schemas.user import UserCreate, UserOut, UserLogin
 from app.crud import user as crud_user
-from app.database import SessionLocal
+from app.core.passwords import hash_password, verify_and_update_password
+from app.database import SessionLocal, get_read_db
 from app.config import create_access_token
 
 router = APIRouter()
 
-def get_db():
+# Lookups go to the read engine and password hashing runs on the dedicated
+# hashing pool, so no writer connection is held while bcrypt works; a writer
+# session is opened only for the insert or the rehash.
+
+def _create_user(user: UserCreate, hashed_password: str):
     db = SessionLocal()
     try:
-        yield db
+        return crud_user.create_user(db, user, hashed_password)
+    except IntegrityError:
+        # Registered by a concurrent request since the lookup
+        raise HTTPException(status_code=400, detail="Username already registered")
+    finally:
+        db.close()
+
+def _update_password_hash(user_id: int, hashed_password: str) -> None:
+    db = SessionLocal()
+    try:
+        crud_user.update_password_hash(db, user_id, hashed_password)
     finally:
         db.close()
 
 @router.post("/register", response_model=UserOut)
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    db_user = crud_user.get_user_by_username(db, user.username)
+async def register(user: UserCreate, db: Session = Depends(get_read_db)):
+    db_user = await run_in_threadpool(crud_user.get_user_by_username, db, user.username)
     if db_user:
         raise HTTPException(status_code=400, detail="Username already registered")
-    return crud_user.create_user(db, user)
+    # Give the connection back before hashing
+    db.close()
+    hashed_password = await hash_password(user.password)
+    return await run_in_threadpool(_create_user, user, hashed_password)
 
 @router.post("/login")
-def login(user: UserLogin, db: Session = Depends(get_db)):
-    db_user = crud_user.get_user_by_username(db, user.username)
-    if not db_user or not crud_user.verify_password(user.password, db_user.hashed_password):
+async def login(user: UserLogin, db: Session = Depends(get_read_db)):
+    db_user = await run_in_threadpool(crud_user.get_user_by_username, db, user.username)
+    if not db_user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
-    
-    token = create_access_token(data={"sub": db_user.username})
+    user_id, username, stored_hash = db_user.id, db_user.username, db_user.hashed_password
+    # Give the connection back before hashing
+    db.close()
+    verified, new_hash = await verify_and_update_password(user.password, stored_hash)
+    if not verified:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    if new_hash:
+        # Stored hash used outdated parameters; replace it while we have the password
+        await run_in_threadpool(_update_password_hash, user_id, new_hash)
+
+    token = create_access_token(data={"sub": username})
     return {"access_token": token, "token_type": "bearer"}
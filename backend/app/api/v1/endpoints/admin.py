@@ -1,13 +1,17 @@
 from typing import Any, List
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
+from app.core.models import User as UserModel
 from app.core.security import get_current_active_admin
 from app.schemas.transaction import Transaction, TransactionUpdate
 from app.schemas.user import User
 from app.services.transaction import TransactionService
 from app.services.user import UserService
+from app.models.transaction import Transaction as TransactionModel
+from app.utils.serialization import fast_response, schema_columns
 
 router = APIRouter()
 
@@ -21,8 +25,10 @@ def get_all_users(
     """
     Get all users (admin only).
     """
-    users = UserService.get_multi(db, skip=skip, limit=limit)
-    return users
+    rows = db.connection().execute(
+        select(*schema_columns(UserModel, User)).order_by(UserModel.id).offset(skip).limit(limit)
+    ).all()
+    return fast_response(List[User], rows)
 
 @router.get("/transactions", response_model=List[Transaction])
 def get_all_transactions(
@@ -34,8 +40,10 @@ def get_all_transactions(
     """
     Get all transactions (admin only).
     """
-    transactions = TransactionService.get_multi(db, skip=skip, limit=limit)
-    return transactions
+    rows = db.connection().execute(
+        select(*schema_columns(TransactionModel, Transaction)).order_by(TransactionModel.id).offset(skip).limit(limit)
+    ).all()
+    return fast_response(List[Transaction], rows)
 
 @router.put("/transactions/{transaction_id}", response_model=Transaction)
 def update_transaction(
@@ -1,12 +1,14 @@
 from datetime import timedelta
 from typing import Any
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
 from app.core import security
 from app.core.config import settings
-from app.core.database import get_db
+from app.core.database import SessionLocal, get_db, get_read_db
+from app.core.passwords import hash_password
 from app.core.security import create_access_token, create_refresh_token
 from app.schemas.auth import Token, TokenPayload
 from app.schemas.user import UserCreate, User
@@ -16,14 +18,14 @@ from app.services.user import UserService
 router = APIRouter()
 
 @router.post("/login", response_model=Token)
-def login(
-    db: Session = Depends(get_db),
+async def login(
+    db: Session = Depends(get_read_db),
     form_data: OAuth2PasswordRequestForm = Depends()
 ) -> Any:
     """
     OAuth2 compatible token login, get an access token for future requests
     """
-    user = AuthService.authenticate(
+    user = await AuthService.authenticate_async(
         db, email=form_data.username, password=form_data.password
     )
     if not user:
@@ -52,22 +54,32 @@ def login(
     }
 
 @router.post("/register", response_model=User)
-def register(
+async def register(
     *,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     user_in: UserCreate,
 ) -> Any:
     """
     Create new user.
     """
-    user = UserService.get_by_email(db, email=user_in.email)
+    user = await run_in_threadpool(UserService.get_by_email, db, email=user_in.email)
     if user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="The user with this email already exists in the system.",
         )
-    user = UserService.create(db, obj_in=user_in)
-    return user
+    # No connection is held while hashing; the insert gets a writer session of its own
+    db.close()
+    hashed_password = await hash_password(user_in.password)
+    return await run_in_threadpool(_create_user, user_in, hashed_password)
+
+
+def _create_user(user_in: UserCreate, hashed_password: str) -> Any:
+    db = SessionLocal()
+    try:
+        return AuthService.create_user(db, obj_in=user_in, hashed_password=hashed_password)
+    finally:
+        db.close()
 
 @router.post("/refresh", response_model=Token)
 def refresh_token(
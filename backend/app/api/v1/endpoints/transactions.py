@@ -1,34 +1,61 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Any, Callable, List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
 from app.core.security import get_current_user
-from app.schemas.transaction import Transaction, TransactionCreate
+from app.schemas.transaction import (
+    Transaction, TransactionCreate, BatchTransactionRequest, BatchTransactionResult
+)
+from app.schemas.pagination import Page
 from app.services.transaction import TransactionService
-from app.models.transaction import TransactionType
+from app.models.transaction import Transaction as TransactionModel, TransactionType
+from app.config import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.utils.pagination import apply_keyset, build_page
+from app.utils.idempotency import idempotency, request_fingerprint
+from app.utils.serialization import fast_response, schema_columns
 
 router = APIRouter()
 
+def run_idempotent(
+    db: Session, key: Optional[str], user_id: int, endpoint: str, payload: Any, response_model: Any,
+    work: Callable[[], Any]
+) -> Any:
+    """Run work() directly, or at most once per Idempotency-Key when the client sent one"""
+    if key is None:
+        return work()
+    return idempotency.run(
+        db, user_id, key, request_fingerprint(endpoint, payload),
+        lambda: jsonable_encoder(response_model.model_validate(work()))
+    )
+
 @router.post("/deposit", response_model=Transaction)
 def deposit(
     *,
     db: Session = Depends(get_db),
     amount: float,
     currency: str,
-    current_user: Any = Depends(get_current_user)
+    current_user: Any = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ) -> Any:
     """
     Deposit funds into the user's wallet.
     """
-    transaction_service = TransactionService(db)
-    transaction, is_suspicious = transaction_service.process_transaction(
-        user_id=current_user.id,
-        amount=amount,
-        currency=currency,
-        transaction_type=TransactionType.DEPOSIT
+    def work():
+        transaction, is_suspicious = TransactionService(db).process_transaction(
+            user_id=current_user.id,
+            amount=amount,
+            currency=currency,
+            transaction_type=TransactionType.DEPOSIT
+        )
+        return transaction
+
+    return run_idempotent(
+        db, idempotency_key, current_user.id, "POST /transactions/deposit",
+        {"amount": amount, "currency": currency}, Transaction, work
     )
-    return transaction
 
 @router.post("/withdraw", response_model=Transaction)
 def withdraw(
@@ -36,19 +63,25 @@ def withdraw(
     db: Session = Depends(get_db),
     amount: float,
     currency: str,
-    current_user: Any = Depends(get_current_user)
+    current_user: Any = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ) -> Any:
     """
     Withdraw funds from the user's wallet.
     """
-    transaction_service = TransactionService(db)
-    transaction, is_suspicious = transaction_service.process_transaction(
-        user_id=current_user.id,
-        amount=amount,
-        currency=currency,
-        transaction_type=TransactionType.WITHDRAWAL
+    def work():
+        transaction, is_suspicious = TransactionService(db).process_transaction(
+            user_id=current_user.id,
+            amount=amount,
+            currency=currency,
+            transaction_type=TransactionType.WITHDRAWAL
+        )
+        return transaction
+
+    return run_idempotent(
+        db, idempotency_key, current_user.id, "POST /transactions/withdraw",
+        {"amount": amount, "currency": currency}, Transaction, work
     )
-    return transaction
 
 @router.post("/transfer", response_model=Transaction)
 def transfer(
@@ -57,34 +90,65 @@ def transfer(
     amount: float,
     currency: str,
     recipient_id: int,
-    current_user: Any = Depends(get_current_user)
+    current_user: Any = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ) -> Any:
     """
     Transfer funds to another user.
     """
-    transaction_service = TransactionService(db)
-    transaction, is_suspicious = transaction_service.process_transaction(
-        user_id=current_user.id,
-        amount=amount,
-        currency=currency,
-        transaction_type=TransactionType.TRANSFER,
-        recipient_id=recipient_id
+    def work():
+        transaction, is_suspicious = TransactionService(db).process_transaction(
+            user_id=current_user.id,
+            amount=amount,
+            currency=currency,
+            transaction_type=TransactionType.TRANSFER,
+            recipient_id=recipient_id
+        )
+        return transaction
+
+    return run_idempotent(
+        db, idempotency_key, current_user.id, "POST /transactions/transfer",
+        {"amount": amount, "currency": currency, "recipient_id": recipient_id}, Transaction, work
     )
-    return transaction
 
-@router.get("/history", response_model=List[Transaction])
-def get_transaction_history(
+@router.post("/batch", response_model=BatchTransactionResult)
+def batch(
+    *,
     db: Session = Depends(get_db),
-    skip: int = 0,
-    limit: int = 100,
+    batch_in: BatchTransactionRequest,
+    current_user: Any = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+) -> Any:
+    """
+    Process a batch of deposits, withdrawals and transfers with a single commit.
+    In atomic mode the whole batch fails if any item fails; in best_effort mode
+    the valid items are committed and the failures are reported per item.
+    """
+    def work():
+        return TransactionService(db).process_batch(
+            user_id=current_user.id,
+            operations=batch_in.operations,
+            mode=batch_in.mode
+        )
+
+    return run_idempotent(
+        db, idempotency_key, current_user.id, "POST /transactions/batch",
+        batch_in, BatchTransactionResult, work
+    )
+
+@router.get("/history", response_model=Page[Transaction])
+def get_transaction_history(
+    db: Session = Depends(get_read_db),
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     current_user: Any = Depends(get_current_user)
 ) -> Any:
     """
-    Get transaction history for the current user.
+    Get transaction history for the current user, newest first.
+    Pass the returned `next_cursor` to fetch the following page.
     """
-    transactions = db.query(Transaction).filter(
-        Transaction.user_id == current_user.id
-    ).order_by(
-        Transaction.created_at.desc()
-    ).offset(skip).limit(limit).all()
-    return transactions 
\ No newline at end of file
+    query = select(*schema_columns(TransactionModel, Transaction)).where(
+        TransactionModel.user_id == current_user.id
+    )
+    rows = db.connection().execute(apply_keyset(query, TransactionModel, cursor, limit)).all()
+    return fast_response(Page[Transaction], build_page(rows, limit))
@@ -4,17 +4,17 @@ from sqlalchemy.orm import Session
 
 from app.core.database import get_db
 from app.core.security import get_current_user, get_current_active_admin
-from app.schemas.user import User, UserCreate, UserUpdate
+from app.schemas.user import CurrentUser, User, UserCreate, UserUpdate
 from app.services.user import UserService
 
 router = APIRouter()
 
-@router.get("/me", response_model=User)
+@router.get("/me", response_model=CurrentUser)
 def read_user_me(
     current_user: Any = Depends(get_current_user)
 ) -> Any:
     """
-    Get current user.
+    Get current user, as the cached principal snapshot.
     """
     return current_user
 
@@ -28,7 +28,9 @@ def update_user_me(
     """
     Update current user.
     """
-    user = UserService.update(db, db_obj=current_user, obj_in=user_in)
+    # current_user is a cached snapshot; update the persistent row
+    user = UserService.get(db, id=current_user.id)
+    user = UserService.update(db, db_obj=user, obj_in=user_in)
     return user
 
 @router.get("/{user_id}", response_model=User)
@@ -2,7 +2,7 @@ from typing import Any, List
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
 from app.core.security import get_current_user
 from app.schemas.wallet import Wallet, WalletCreate, WalletUpdate
 from app.services.wallet import WalletService
@@ -11,7 +11,7 @@ router = APIRouter()
 
 @router.get("/", response_model=Wallet)
 def get_wallet(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: Any = Depends(get_current_user)
 ) -> Any:
     """
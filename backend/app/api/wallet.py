@@ -1,100 +1,127 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
-from app.core.database import get_db
-from app.core.security import get_current_user
+from typing import List, Optional
+from app.core.database import get_async_db, get_async_read_db
+from app.core.security import get_current_user_async
 from app.schemas.transaction import TransactionCreate, TransactionOut, TransactionFilter
+from app.schemas.pagination import Page
 from app.schemas.wallet import Wallet, WalletCreate
 from app.services.wallet import WalletService
-from app.services.fraud_detection import FraudDetectionService
-from app.models.transaction import Transaction, TransactionStatus
+from app.crud.wallet import wallet_balance
+from app.services.transaction import TransactionService
+from app.models.transaction import Transaction, TransactionType
 from app.models.wallet import Wallet
 from app.models.user import User
-from sqlalchemy.exc import SQLAlchemyError
 from fastapi.responses import JSONResponse
+from app.config import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.utils.pagination import apply_keyset, build_page
+from app.utils.db_retry import retry_transaction_async
+from app.utils.idempotency import idempotency, request_fingerprint
+from app.utils.serialization import fast_response, schema_columns
 
 router = APIRouter()
 
+# Model columns behind the TransactionOut fields that are named differently
+TRANSACTION_OUT_SOURCES = {
+    "type": Transaction.transaction_type,
+    "timestamp": Transaction.created_at,
+    "sender_id": Transaction.user_id,
+    "receiver_id": Transaction.recipient_id,
+}
+
 @router.post("/transactions", response_model=TransactionOut, status_code=status.HTTP_201_CREATED)
 async def create_transaction(
     transaction: TransactionCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
     """
     Create a new transaction.
     
+    - **type**: deposit, withdraw or transfer
     - **amount**: Transaction amount (must be positive)
-    - **currency**: Currency code (e.g., USD)
-    - **transaction_type**: Type of transaction (DEPOSIT/WITHDRAWAL/TRANSFER)
-    - **description**: Optional transaction description
-    - **recipient_id**: Required for transfers
+    - **currency**: Currency code of the wallet (e.g., USD)
+    - **receiver_username**: Required for transfers
+    - **Idempotency-Key** header: retries with the same key get the first response back
     
     Returns the created transaction with status and fraud detection results.
     """
-    try:
-        # Get user's wallet
-        wallet = db.query(Wallet).filter(Wallet.user_id == current_user.id).first()
-        if not wallet:
-            raise HTTPException(status_code=404, detail="Wallet not found")
+    if idempotency_key is None:
+        return await _create_transaction(transaction, db, current_user)
 
-        # Validate transaction
-        if transaction.transaction_type == "TRANSFER" and not transaction.recipient_id:
-            raise HTTPException(status_code=400, detail="Recipient ID required for transfers")
+    async def work():
+        return jsonable_encoder(await _create_transaction(transaction, db, current_user))
 
-        # Check fraud detection
-        fraud_service = FraudDetectionService(db)
-        is_suspicious, reason = fraud_service.check_transaction(
-            current_user.id,
-            transaction.amount,
-            transaction.transaction_type
-        )
+    return await idempotency.run_async(
+        db, current_user.id, idempotency_key,
+        request_fingerprint("POST /wallet/transactions", transaction),
+        work, status_code=status.HTTP_201_CREATED
+    )
 
-        # Create transaction
-        db_transaction = Transaction(
-            user_id=current_user.id,
-            wallet_id=wallet.id,
-            transaction_type=transaction.transaction_type,
-            amount=transaction.amount,
-            currency=transaction.currency,
-            description=transaction.description,
-            recipient_id=transaction.recipient_id,
-            is_flagged=is_suspicious,
-            flag_reason=reason if is_suspicious else None
-        )
+# TransactionCreate.type values
+TRANSACTION_TYPES = {
+    "deposit": TransactionType.DEPOSIT,
+    "withdraw": TransactionType.WITHDRAWAL,
+    "transfer": TransactionType.TRANSFER,
+}
 
-        # Process transaction
-        if transaction.transaction_type == "DEPOSIT":
-            wallet.balance += transaction.amount
-        elif transaction.transaction_type == "WITHDRAWAL":
-            if wallet.balance < transaction.amount:
-                raise HTTPException(status_code=400, detail="Insufficient funds")
-            wallet.balance -= transaction.amount
-        elif transaction.transaction_type == "TRANSFER":
-            if wallet.balance < transaction.amount:
-                raise HTTPException(status_code=400, detail="Insufficient funds")
-            recipient_wallet = db.query(Wallet).filter(Wallet.user_id == transaction.recipient_id).first()
-            if not recipient_wallet:
-                raise HTTPException(status_code=404, detail="Recipient wallet not found")
-            wallet.balance -= transaction.amount
-            recipient_wallet.balance += transaction.amount
+async def _create_transaction(transaction: TransactionCreate, db: AsyncSession, current_user: User) -> TransactionOut:
+    # The sync service takes the wallet locks and credits hot wallets on their
+    # shards on this request's connection. Lost deadlocks are retried here so
+    # the backoff awaits instead of blocking the event loop
+    try:
+        return await retry_transaction_async(db, lambda: db.run_sync(
+            lambda session: _process_transaction(session, transaction, current_user.id)
+        ))
+    except DBAPIError:
+        raise HTTPException(status_code=500, detail="Database error occurred")
 
-        db_transaction.status = TransactionStatus.COMPLETED
-        db.add(db_transaction)
-        db.commit()
-        db.refresh(db_transaction)
+def _process_transaction(db: Session, transaction: TransactionCreate, user_id: int) -> TransactionOut:
+    transaction_type = TRANSACTION_TYPES.get(transaction.type.lower())
+    if transaction_type is None:
+        raise HTTPException(status_code=400, detail="Invalid transaction type")
 
-        return db_transaction
+    recipient_id = None
+    if transaction_type == TransactionType.TRANSFER:
+        if not transaction.receiver_username:
+            raise HTTPException(status_code=400, detail="Receiver username required for transfers")
+        recipient_id = db.scalar(select(User.id).where(
+            User.username == transaction.receiver_username,
+            User.is_deleted == False
+        ))
+        if recipient_id is None:
+            raise HTTPException(status_code=404, detail="Receiver not found")
 
-    except SQLAlchemyError as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail="Database error occurred")
+    created, _ = TransactionService(db).process_transaction(
+        user_id=user_id,
+        amount=transaction.amount,
+        currency=(transaction.currency or "USD").upper(),
+        transaction_type=transaction_type,
+        recipient_id=recipient_id,
+        retry=False
+    )
+    return TransactionOut(
+        id=created.id,
+        type=created.transaction_type.value,
+        amount=created.amount,
+        currency=created.currency,
+        timestamp=created.created_at,
+        sender_id=created.user_id,
+        receiver_id=created.recipient_id
+    )
 
-@router.get("/transactions", response_model=List[TransactionOut])
+@router.get("/transactions", response_model=Page[TransactionOut])
 async def get_transactions(
     filters: TransactionFilter = Depends(),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """
     Get user's transactions with optional filtering.
@@ -105,38 +132,48 @@ async def get_transactions(
     - **min_amount**: Filter transactions above this amount
     - **max_amount**: Filter transactions below this amount
     - **is_flagged**: Filter flagged transactions
+    - **cursor**: `next_cursor` from the previous page
+    - **limit**: Page size
     """
-    query = db.query(Transaction).filter(Transaction.user_id == current_user.id)
+    query = select(*schema_columns(Transaction, TransactionOut, TRANSACTION_OUT_SOURCES)).where(
+        Transaction.user_id == current_user.id
+    )
 
     if filters.start_date:
-        query = query.filter(Transaction.created_at >= filters.start_date)
+        query = query.where(Transaction.created_at >= filters.start_date)
     if filters.end_date:
-        query = query.filter(Transaction.created_at <= filters.end_date)
+        query = query.where(Transaction.created_at <= filters.end_date)
     if filters.transaction_type:
-        query = query.filter(Transaction.transaction_type == filters.transaction_type)
+        query = query.where(Transaction.transaction_type == filters.transaction_type)
     if filters.min_amount:
-        query = query.filter(Transaction.amount >= filters.min_amount)
+        query = query.where(Transaction.amount >= filters.min_amount)
     if filters.max_amount:
-        query = query.filter(Transaction.amount <= filters.max_amount)
+        query = query.where(Transaction.amount <= filters.max_amount)
     if filters.is_flagged is not None:
-        query = query.filter(Transaction.is_flagged == filters.is_flagged)
+        query = query.where(Transaction.is_flagged == filters.is_flagged)
 
-    return query.order_by(Transaction.created_at.desc()).all()
+    # Plain columns gain nothing from the ORM's row loading
+    connection = await db.connection()
+    result = await connection.execute(apply_keyset(query, Transaction, cursor, limit))
+    return fast_response(Page[TransactionOut], build_page(result.all(), limit, created_at_key="timestamp"))
 
 @router.get("/balance")
 async def get_balance(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """
     Get user's current wallet balance.
     """
-    wallet = db.query(Wallet).filter(Wallet.user_id == current_user.id).first()
+    result = await db.execute(select(Wallet).where(Wallet.user_id == current_user.id))
+    wallet = result.scalars().first()
     if not wallet:
         raise HTTPException(status_code=404, detail="Wallet not found")
     
+    # Hot wallets keep part of their balance on shard rows
+    balance = await db.run_sync(lambda session: wallet_balance(session, wallet))
     return {
-        "balance": wallet.balance,
+        "balance": balance,
         "currency": wallet.currency.value,
         "last_updated": wallet.updated_at
     }
@@ -21,17 +21,80 @@ DEBUG = os.getenv("DEBUG", "False").lower() == "true"
 MAX_TRANSACTION_AMOUNT = float(os.getenv("MAX_TRANSACTION_AMOUNT", "10000"))
 MIN_TRANSACTION_AMOUNT = float(os.getenv("MIN_TRANSACTION_AMOUNT", "0.01"))
 DAILY_TRANSACTION_LIMIT = float(os.getenv("DAILY_TRANSACTION_LIMIT", "50000"))
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "5000"))
+
+# Pagination
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "50"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "200"))
 
 # Fraud Detection Settings
 SUSPICIOUS_TRANSACTION_THRESHOLD = float(os.getenv("SUSPICIOUS_TRANSACTION_THRESHOLD", "5000"))
 RAPID_TRANSACTION_WINDOW = int(os.getenv("RAPID_TRANSACTION_WINDOW", "300"))  # 5 minutes in seconds
 MAX_RAPID_TRANSACTIONS = int(os.getenv("MAX_RAPID_TRANSACTIONS", "5"))
+# Where fraud features come from: "sql" (one aggregate query) or "memory" (velocity counters).
+# The counters are per process, so several workers would each allow the full limits:
+# only opt into "memory" when the app runs as a single process
+FRAUD_FEATURE_SOURCE = os.getenv("FRAUD_FEATURE_SOURCE", "sql").lower()
+# Processes used by the daily fraud scan; 1 scores every shard in-process
+FRAUD_SCAN_WORKERS = int(os.getenv("FRAUD_SCAN_WORKERS", "1"))
+
+# Fraud alerts to one user within this many seconds are sent as a single digest
+ALERT_DIGEST_WINDOW = float(os.getenv("ALERT_DIGEST_WINDOW", "300"))
+ALERT_DIGEST_MAX_ITEMS = int(os.getenv("ALERT_DIGEST_MAX_ITEMS", "20"))
+
+# Retries for wallet transactions that hit a deadlock or serialization failure
+TRANSACTION_RETRY_ATTEMPTS = int(os.getenv("TRANSACTION_RETRY_ATTEMPTS", "4"))
+TRANSACTION_RETRY_BACKOFF = float(os.getenv("TRANSACTION_RETRY_BACKOFF", "0.02"))  # seconds, doubled per retry
+TRANSACTION_RETRY_MAX_BACKOFF = float(os.getenv("TRANSACTION_RETRY_MAX_BACKOFF", "0.5"))
+# Wallet lock waits longer than this many seconds are logged
+WALLET_LOCK_WAIT_WARN = float(os.getenv("WALLET_LOCK_WAIT_WARN", "0.5"))
+# Default number of credit sub-rows for a hot (merchant) wallet
+HOT_WALLET_SHARDS = int(os.getenv("HOT_WALLET_SHARDS", "8"))
+
+# Idempotency-Key handling for transaction-creating endpoints
+IDEMPOTENCY_KEY_TTL = int(os.getenv("IDEMPOTENCY_KEY_TTL", "86400"))  # seconds a stored response is replayed
+IDEMPOTENCY_WAIT_TIMEOUT = float(os.getenv("IDEMPOTENCY_WAIT_TIMEOUT", "10"))  # max wait on an in-flight duplicate
+IDEMPOTENCY_POLL_INTERVAL = float(os.getenv("IDEMPOTENCY_POLL_INTERVAL", "0.05"))
+# An in-flight key older than this is treated as abandoned by a crashed worker
+IDEMPOTENCY_IN_FLIGHT_TIMEOUT = int(os.getenv("IDEMPOTENCY_IN_FLIGHT_TIMEOUT", "60"))
+
+# Scheduled jobs run on a background thread pool in the process holding the leader lease
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "True").lower() == "true"
+SCHEDULER_THREADS = int(os.getenv("SCHEDULER_THREADS", "2"))
+SCHEDULER_LEASE_TTL = int(os.getenv("SCHEDULER_LEASE_TTL", "30"))  # seconds
+SCHEDULER_HEARTBEAT_INTERVAL = int(os.getenv("SCHEDULER_HEARTBEAT_INTERVAL", "10"))  # seconds
+
+# Admin dashboard aggregates cache (seconds)
+ADMIN_ANALYTICS_CACHE_TTL = int(os.getenv("ADMIN_ANALYTICS_CACHE_TTL", "60"))
+
+# Maximum flagged transactions listed in a daily report
+REPORT_FLAGGED_LIMIT = int(os.getenv("REPORT_FLAGGED_LIMIT", "100"))
+
+# Bulk transaction export: rows fetched per server-side cursor batch, and rows per Parquet row group
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "10000"))
+EXPORT_PARQUET_ROW_GROUP_SIZE = int(os.getenv("EXPORT_PARQUET_ROW_GROUP_SIZE", "100000"))
+
+# Prometheus metrics on /metrics; label sets per metric beyond the cap are folded into "other"
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "True").lower() == "true"
+METRICS_MAX_SERIES = int(os.getenv("METRICS_MAX_SERIES", "500"))
 
 # Email Settings (for notifications)
 SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
 SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
 SMTP_USER = os.getenv("SMTP_USER", "")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
+# Sender address; smtplib cannot send without one
+SMTP_FROM = os.getenv("SMTP_FROM", SMTP_USER or "no-reply@localhost")
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "True").lower() == "true"
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "10"))
+
+# Background notification dispatcher
+NOTIFICATION_QUEUE_SIZE = int(os.getenv("NOTIFICATION_QUEUE_SIZE", "1000"))
+NOTIFICATION_WORKERS = int(os.getenv("NOTIFICATION_WORKERS", "2"))
+NOTIFICATION_MAX_RETRIES = int(os.getenv("NOTIFICATION_MAX_RETRIES", "3"))
+NOTIFICATION_RETRY_BACKOFF = float(os.getenv("NOTIFICATION_RETRY_BACKOFF", "1.0"))  # seconds, doubled per retry
+# Idle seconds after which a pooled connection is checked with NOOP before reuse
+NOTIFICATION_IDLE_CHECK = float(os.getenv("NOTIFICATION_IDLE_CHECK", "30"))
 
 # JWT Token Generation
 def create_access_token(data: dict):
@@ -24,6 +24,29 @@ class Settings(BaseSettings):
 
     # Database Configuration
     DATABASE_URL: str = "sqlite:///./digital_wallet.db"
+
+    # Connection pool shared by every engine (see app.core.engine). The sync
+    # threadpool runs up to 40 requests at once, so size + overflow covers it.
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 30
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800  # Recycle connections after 30 minutes
+    DB_POOL_PRE_PING: bool = True
+
+    # File-backed SQLite: WAL and pragmas, a query_only read pool and a single
+    # BEGIN IMMEDIATE writer connection
+    SQLITE_PRODUCTION_PROFILE: bool = True
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE: int = 268435456  # 256 MB
+    SQLITE_CACHE_SIZE_KB: int = 65536
+
+    # Opt-in SQL profiling: per-request statement counts and DB time (also sent
+    # as X-DB-* response headers), a warning when one normalized statement runs
+    # more than SQL_REPEAT_THRESHOLD times in a request, and a slow-query log
+    SQL_PROFILING: bool = False
+    SQL_PROFILE_HEADERS: bool = True
+    SQL_REPEAT_THRESHOLD: int = 10
+    SQL_SLOW_QUERY_MS: float = 200.0
     
     # JWT Configuration
     SECRET_KEY: str = "your-secret-key-here"  # Change in production
@@ -31,6 +54,15 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
 
+    # Password hashing: bcrypt cost and the dedicated hashing pool
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_QUEUE: int = 64
+
+    # Authenticated principal cache (decoded tokens and user snapshots)
+    AUTH_CACHE_TTL: int = 60
+    AUTH_CACHE_SIZE: int = 10000
+
     # Email Configuration
     SMTP_TLS: bool = True
     SMTP_PORT: int = 587
@@ -0,0 +1,277 @@
+import logging
+import time
+from collections import deque
+from threading import Event, Lock
+from typing import Dict, Tuple
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool, StaticPool
+from app.core.config import settings
+from app.middlewares.request_context import current_endpoint
+from app.utils.sql_profiler import instrument_engine
+
+logger = logging.getLogger(__name__)
+
+
+class PoolMetrics:
+    """Checkout counters for one connection pool"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.exhausted = 0
+        self._lock = Lock()
+
+    def record_checkout(self, wait: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds_total += wait
+            self.wait_seconds_max = max(self.wait_seconds_max, wait)
+
+    def record_exhausted(self) -> None:
+        with self._lock:
+            self.exhausted += 1
+
+
+class _InstrumentedPoolMixin:
+    """Time every checkout and warn, naming the waiting endpoint, when the pool is exhausted"""
+
+    pool_name = "default"
+
+    @property
+    def metrics(self) -> PoolMetrics:
+        if not hasattr(self, "_metrics"):
+            self._metrics = PoolMetrics()
+        return self._metrics
+
+    def _do_get(self):
+        capacity = self.size() + max(self._max_overflow, 0)
+        if self._max_overflow >= 0 and self.checkedout() >= capacity:
+            self.metrics.record_exhausted()
+            logger.warning(
+                f"Connection pool '{self.pool_name}' exhausted "
+                f"({self.checkedout()}/{capacity} in use); "
+                f"{current_endpoint.get()} waiting up to {self._timeout}s"
+            )
+        start = time.perf_counter()
+        connection = self._checkout()
+        self.metrics.record_checkout(time.perf_counter() - start)
+        return connection
+
+    def _checkout(self):
+        return super()._do_get()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.pool_name = self.pool_name
+        pool._metrics = self.metrics
+        return pool
+
+    def stats(self) -> dict:
+        metrics = self.metrics
+        return {
+            "size": self.size(),
+            "max_overflow": self._max_overflow,
+            "in_use": self.checkedout(),
+            "idle": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            "checkouts": metrics.checkouts,
+            "wait_seconds_total": round(metrics.wait_seconds_total, 6),
+            "wait_seconds_max": round(metrics.wait_seconds_max, 6),
+            "exhausted": metrics.exhausted,
+        }
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+class _FairGate:
+    """Counting semaphore that grants permits strictly in arrival order"""
+
+    def __init__(self, permits: int):
+        self._permits = permits
+        self._waiters = deque()
+        self._lock = Lock()
+
+    def acquire(self, timeout: float) -> bool:
+        with self._lock:
+            if self._permits and not self._waiters:
+                self._permits -= 1
+                return True
+            waiter = Event()
+            self._waiters.append(waiter)
+        if waiter.wait(timeout):
+            return True
+        with self._lock:
+            # The permit may have been handed over just after the timeout
+            if waiter.is_set():
+                return True
+            self._waiters.remove(waiter)
+            return False
+
+    def release(self) -> None:
+        with self._lock:
+            if self._waiters:
+                # Hand the permit straight to the oldest waiter
+                self._waiters.popleft().set()
+            else:
+                self._permits += 1
+
+
+class InstrumentedWriterPool(InstrumentedQueuePool):
+    """
+    Queue pool that hands connections out first come, first served.
+
+    QueuePool lets a thread that has just returned a connection take it back
+    before a waiting thread wakes up. With the single SQLite writer connection
+    that starves every writer but one, so checkouts go through a FIFO gate.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._gate = _FairGate(self.size() + max(self._max_overflow, 0))
+
+    def _checkout(self):
+        if not self._gate.acquire(self._timeout):
+            raise exc.TimeoutError(
+                f"Writer pool '{self.pool_name}' timed out after {self._timeout}s "
+                f"for {current_endpoint.get()}"
+            )
+        try:
+            return super()._checkout()
+        except Exception:
+            self._gate.release()
+            raise
+
+    def _do_return_conn(self, record):
+        try:
+            super()._do_return_conn(record)
+        finally:
+            self._gate.release()
+
+
+_engines: Dict[Tuple[str, bool, str], object] = {}
+_engines_lock = Lock()
+
+
+def is_memory_database(url) -> bool:
+    url = make_url(url)
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def uses_sqlite_profile(url) -> bool:
+    """Whether file-backed SQLite gets the WAL / single-writer production profile"""
+    url = make_url(url)
+    return settings.SQLITE_PRODUCTION_PROFILE and url.get_backend_name() == "sqlite" and not is_memory_database(url)
+
+
+def get_engine(url: str, *, is_async: bool = False, name: str = None, role: str = "primary"):
+    """
+    Return the shared engine for a database URL, creating it on first use.
+
+    Both the legacy and the core database modules go through here, so they
+    share one pool when they point at the same database. Pool size, overflow,
+    timeout, recycle and pre-ping come from settings.
+
+    role="read" asks for an engine for read-only work. Under the SQLite
+    production profile that is a separate query_only pool next to a single
+    writer connection; elsewhere it is the primary engine.
+
+    role="lease" asks for a one-connection engine of its own for small,
+    time-critical writes (the scheduler's leader lease), which must never
+    queue behind request or job sessions for a connection of the main pool.
+    """
+    if role == "read" and not uses_sqlite_profile(url):
+        role = "primary"
+    if role == "lease" and is_memory_database(url):
+        # An in-memory database exists only on its one shared connection
+        role = "primary"
+    key = (str(url), is_async, role)
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            name = name or make_url(url).get_backend_name()
+            engine = _engines[key] = _create_engine(url, is_async, name, role)
+        return engine
+
+
+def _create_engine(url: str, is_async: bool, name: str, role: str = "primary"):
+    kwargs = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    if make_url(url).get_backend_name() == "sqlite":
+        kwargs["connect_args"] = {"check_same_thread": False}
+    if is_memory_database(url):
+        # One shared connection; there is nothing to pool
+        kwargs["poolclass"] = StaticPool
+    else:
+        kwargs.update(
+            poolclass=InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+        if role == "lease":
+            kwargs.update(pool_size=1, max_overflow=0)
+        if uses_sqlite_profile(url) and role == "primary":
+            # SQLite allows one writer at a time; queue writers on the pool
+            # instead of letting them collide on the database lock
+            kwargs.update(pool_size=1, max_overflow=0)
+            if not is_async:
+                kwargs["poolclass"] = InstrumentedWriterPool
+    engine = create_async_engine(url, **kwargs) if is_async else create_engine(url, **kwargs)
+    engine.pool.pool_name = name
+    if settings.SQL_PROFILING:
+        instrument_engine(engine.sync_engine if is_async else engine)
+    if uses_sqlite_profile(url):
+        configure_sqlite(engine.sync_engine if is_async else engine, writer=role != "read")
+    return engine
+
+
+def configure_sqlite(engine, writer: bool) -> None:
+    """
+    Apply the SQLite production profile to an engine.
+
+    WAL lets readers run alongside the writer, and the pragmas trade a little
+    durability on power loss (synchronous=NORMAL) for far fewer fsyncs. Writer
+    transactions start with BEGIN IMMEDIATE, taking the write lock up front so
+    that read-modify-write sequences cannot interleave; SELECT ... FOR UPDATE
+    does nothing on SQLite. Reader connections are query_only and, as with the
+    driver's default behaviour, run each SELECT in its own implicit transaction.
+    """
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        # Take BEGIN away from the driver; only the writer issues one
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_KB}")
+        if not writer:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+    if writer:
+        @event.listens_for(engine, "begin")
+        def on_begin(connection):
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def pool_stats() -> dict:
+    """Pool usage and checkout wait metrics for every engine created by get_engine"""
+    with _engines_lock:
+        engines = list(_engines.values())
+    stats = {}
+    for engine in engines:
+        pool = engine.sync_engine.pool if isinstance(engine, AsyncEngine) else engine.pool
+        if isinstance(pool, _InstrumentedPoolMixin):
+            stats[pool.pool_name] = pool.stats()
+    return stats
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Float, DateTime, Enum
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Float, DateTime, Enum, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -29,7 +29,7 @@ class User(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     wallet = relationship("Wallet", back_populates="user", uselist=False)
-    transactions = relationship("Transaction", back_populates="user")
+    transactions = relationship("Transaction", back_populates="user", foreign_keys="Transaction.user_id")
 
 class Wallet(Base):
     __tablename__ = "wallets"
@@ -60,4 +60,16 @@ class Transaction(Base):
 
     user = relationship("User", back_populates="transactions", foreign_keys=[user_id])
     wallet = relationship("Wallet", back_populates="transactions")
-    recipient = relationship("User", foreign_keys=[recipient_id]) 
\ No newline at end of file
+    recipient = relationship("User", foreign_keys=[recipient_id])
+
+    __table_args__ = (
+        Index("ix_transactions_user_created", "user_id", "created_at", "id"),
+        Index("ix_transactions_recipient_flagged", "recipient_id", "is_flagged"),
+        Index("ix_transactions_created_at", "created_at"),
+        Index(
+            "ix_transactions_flagged_created",
+            "created_at",
+            sqlite_where=is_flagged == True,
+            postgresql_where=is_flagged == True,
+        ),
+    ) 
\ No newline at end of file
@@ -0,0 +1,42 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore
+from typing import Callable, Optional, Tuple
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+from app.core.config import settings
+
+# Hashes with a cost other than BCRYPT_ROUNDS report needs_update and are
+# replaced on the next successful login
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS
+)
+
+# bcrypt releases the GIL, so a small dedicated pool keeps hashing off both the
+# event loop and the threadpool that serves sync endpoints and DB work
+_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+)
+_slots = BoundedSemaphore(settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_QUEUE)
+
+async def _run(fn: Callable, *args):
+    """Run a hashing job on the password executor, refusing work when it is saturated"""
+    if not _slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many password checks in progress",
+            headers={"Retry-After": "1"},
+        )
+    try:
+        return await asyncio.wrap_future(_executor.submit(fn, *args))
+    finally:
+        _slots.release()
+
+async def hash_password(password: str) -> str:
+    return await _run(pwd_context.hash, password)
+
+async def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """Verify a password; the second item is a replacement hash when the stored one is stale"""
+    return await _run(pwd_context.verify_and_update, plain_password, hashed_password)
@@ -1,17 +1,53 @@
+import time
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Any, Union, Optional
+from typing import Any, Hashable, Union, Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from passlib.context import CryptContext
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.core.config import settings
-from app.core.database import get_db
+from app.core.database import get_read_db, get_async_read_db
 from app.core.models import User
+from app.core.passwords import pwd_context
+from app.utils.cache import TTLCache
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
+@dataclass(frozen=True)
+class Principal:
+    """Snapshot of the authenticated user, safe to share between requests"""
+    id: int
+    email: str
+    is_active: bool
+    is_admin: bool
+    username: Optional[str] = None
+
+    @classmethod
+    def from_user(cls, user) -> "Principal":
+        return cls(
+            id=user.id,
+            email=user.email,
+            is_active=bool(user.is_active),
+            is_admin=bool(user.is_admin),
+            username=getattr(user, "username", None),
+        )
+
+# token -> (user id, expiry timestamp) and ("id", user id) -> Principal
+token_cache = TTLCache(ttl=settings.AUTH_CACHE_TTL, maxsize=settings.AUTH_CACHE_SIZE)
+principal_cache = TTLCache(ttl=settings.AUTH_CACHE_TTL, maxsize=settings.AUTH_CACHE_SIZE)
+
+def invalidate_principal(user_id: int, username: Optional[str] = None) -> None:
+    """Drop cached snapshots of a user after it is updated, deactivated or deleted"""
+    principal_cache.pop(("id", int(user_id)))
+    if username is not None:
+        principal_cache.pop(("username", username))
+
+def auth_cache_stats() -> dict:
+    return {"tokens": token_cache.stats(), "principals": principal_cache.stats()}
+
 def create_access_token(
     subject: Union[str, Any], expires_delta: timedelta = None
 ) -> str:
@@ -48,31 +84,51 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
-async def get_current_user(
-    db: Session = Depends(get_db),
-    token: str = Depends(oauth2_scheme)
-) -> User:
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def _decode_access_token(token: str) -> int:
+    """Return the user id of a valid access token"""
+    cached = token_cache.get(token)
+    if cached is not None:
+        user_id, expires_at = cached
+        if expires_at > time.time():
+            return user_id
+        token_cache.pop(token)
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
         )
         user_id: str = payload.get("sub")
         if user_id is None:
-            raise credentials_exception
+            raise _credentials_exception()
         token_type: str = payload.get("type")
         if token_type != "access":
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
+            raise _credentials_exception()
+        user_id = int(user_id)
+    except (JWTError, ValueError):
+        raise _credentials_exception()
+    token_cache.set(token, (user_id, payload.get("exp", 0)))
+    return user_id
 
-    user = db.query(User).filter(User.id == user_id).first()
+def get_cached_principal(key: Hashable, load) -> Optional[Principal]:
+    """Return the cached principal for key, loading the user with load() on a miss"""
+    principal = principal_cache.get(key)
+    if principal is None:
+        user = load()
+        if user is None:
+            return None
+        principal = Principal.from_user(user)
+        principal_cache.set(key, principal)
+    return principal
+
+def _check_user(user: Optional[Principal]) -> Principal:
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
     if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -80,9 +136,37 @@ async def get_current_user(
         )
     return user
 
+def authenticate_token(db: Session, token: str) -> Principal:
+    """Resolve a bearer token to an active principal, querying only on a cache miss"""
+    user_id = _decode_access_token(token)
+    principal = get_cached_principal(
+        ("id", user_id), lambda: db.query(User).filter(User.id == user_id).first()
+    )
+    return _check_user(principal)
+
+async def get_current_user(
+    db: Session = Depends(get_read_db),
+    token: str = Depends(oauth2_scheme)
+) -> Principal:
+    return authenticate_token(db, token)
+
+async def get_current_user_async(
+    db: AsyncSession = Depends(get_async_read_db),
+    token: str = Depends(oauth2_scheme)
+) -> Principal:
+    user_id = _decode_access_token(token)
+    principal = principal_cache.get(("id", user_id))
+    if principal is None:
+        result = await db.execute(select(User).where(User.id == user_id))
+        user = result.scalars().first()
+        if user is not None:
+            principal = Principal.from_user(user)
+            principal_cache.set(("id", user_id), principal)
+    return _check_user(principal)
+
 async def get_current_active_user(
-    current_user: User = Depends(get_current_user),
-) -> User:
+    current_user: Principal = Depends(get_current_user),
+) -> Principal:
     if not current_user.is_active:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
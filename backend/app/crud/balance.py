@@ -0,0 +1,145 @@
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import String, event, select, insert, delete, literal, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from app.models.balance import UserBalance
+from app.models.transaction import Transaction, TransactionStatus, TransactionType
+from app.models.wallet import CurrencyType, Wallet, WalletShard
+
+UPSERTS = {
+    "sqlite": sqlite_insert,
+    "postgresql": pg_insert,
+}
+
+
+def get_user_balances(db: Session, user_id: int) -> dict:
+    rows = db.query(UserBalance.currency, UserBalance.balance).filter(
+        UserBalance.user_id == user_id
+    ).all()
+    return {currency: round(balance, 2) for currency, balance in rows}
+
+
+def get_user_balance(db: Session, user_id: int, currency: str, for_update: bool = False) -> float:
+    query = db.query(UserBalance.balance).filter(
+        UserBalance.user_id == user_id,
+        UserBalance.currency == currency
+    )
+    if for_update:
+        query = query.with_for_update()
+    balance = query.scalar()
+    return round(balance, 2) if balance is not None else 0.0
+
+
+def _balance_upsert(dialect_name: str, user_id: int, currency: str, delta: float):
+    """INSERT ... ON CONFLICT adding delta to a balance row, or None if the dialect has no upsert"""
+    upsert = UPSERTS.get(dialect_name)
+    if upsert is None:
+        return None
+    now = datetime.utcnow()
+    stmt = upsert(UserBalance).values(
+        user_id=user_id, currency=currency, balance=delta, version=1, updated_at=now
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[UserBalance.user_id, UserBalance.currency],
+        set_={
+            "balance": UserBalance.balance + delta,
+            "version": UserBalance.version + 1,
+            "updated_at": now,
+        }
+    )
+
+
+def apply_balance_delta(db: Session, user_id: int, currency: str, delta: float) -> None:
+    """Add delta to a balance row inside the caller's transaction, creating it if needed"""
+    stmt = _balance_upsert(db.get_bind().dialect.name, user_id, currency, delta)
+    if stmt is not None:
+        db.execute(stmt)
+        return
+
+    row = db.query(UserBalance).filter(
+        UserBalance.user_id == user_id,
+        UserBalance.currency == currency
+    ).with_for_update().first()
+    if row is None:
+        db.add(UserBalance(user_id=user_id, currency=currency, balance=delta, version=1))
+        db.flush()
+    else:
+        row.balance += delta
+        row.version += 1
+
+
+def apply_balance_deltas(db: Session, deltas: dict) -> None:
+    """Apply {(user_id, currency): delta} in a stable order"""
+    for (user_id, currency), delta in sorted(deltas.items()):
+        if delta:
+            apply_balance_delta(db, user_id, currency, delta)
+
+
+def transaction_deltas(transactions) -> dict:
+    """Balance changes implied by completed ledger rows, keyed by (user_id, currency)"""
+    deltas = defaultdict(float)
+    for t in transactions:
+        if t.status != TransactionStatus.COMPLETED:
+            continue
+        if t.transaction_type == TransactionType.DEPOSIT:
+            deltas[(t.user_id, t.currency)] += t.amount
+        elif t.transaction_type == TransactionType.WITHDRAWAL:
+            deltas[(t.user_id, t.currency)] -= t.amount
+        elif t.transaction_type == TransactionType.TRANSFER:
+            deltas[(t.user_id, t.currency)] -= t.amount
+            deltas[(t.recipient_id, t.currency)] += t.amount
+    return deltas
+
+
+def apply_transaction(db: Session, transaction: Transaction) -> None:
+    apply_balance_deltas(db, transaction_deltas([transaction]))
+
+
+def wallet_currency(wallet: Wallet) -> str:
+    return (wallet.currency or CurrencyType.USD).value
+
+
+def _seed_opening_balance(mapper, connection, wallet: Wallet) -> None:
+    """Every new wallet opens its balance row in the same flush, with its opening balance"""
+    currency = wallet_currency(wallet)
+    stmt = _balance_upsert(connection.dialect.name, wallet.user_id, currency, wallet.balance or 0.0)
+    if stmt is None:
+        stmt = insert(UserBalance).values(
+            user_id=wallet.user_id, currency=currency, balance=wallet.balance or 0.0, version=1
+        )
+    connection.execute(stmt)
+
+
+event.listen(Wallet, "after_insert", _seed_opening_balance)
+
+
+def rebuild_user_balances(db: Session) -> int:
+    """
+    Recompute every balance from the wallets with one INSERT ... SELECT and commit.
+
+    Wallets are the source of truth: a wallet's balance plus the credits still
+    held on its shards. The ledger alone cannot rebuild it, since opening
+    balances and wallets older than the table were never written to it.
+    """
+    shard_credits = select(
+        func.coalesce(func.sum(WalletShard.balance), 0.0)
+    ).where(WalletShard.wallet_id == Wallet.id).scalar_subquery()
+
+    totals = select(
+        Wallet.user_id,
+        func.coalesce(Wallet.currency, literal(CurrencyType.USD.value, String)),
+        Wallet.balance + shard_credits,
+        literal(1),
+        literal(datetime.utcnow())
+    ).where(Wallet.user_id.isnot(None))
+
+    db.execute(delete(UserBalance))
+    result = db.execute(
+        insert(UserBalance).from_select(
+            ["user_id", "currency", "balance", "version", "updated_at"], totals
+        )
+    )
+    db.commit()
+    return result.rowcount
@@ -1,18 +1,18 @@
 from sqlalchemy.orm import Session
-from app.crud.user import get_user_balances
+from app.crud.balance import get_user_balance, apply_balance_deltas
 from app.models import transaction as models, user as user_model
 from app.schemas import transaction as schemas
 from fastapi import HTTPException
 from app.services import fraud
 
 def create_transaction(db: Session, sender: user_model.User, data: schemas.TransactionCreate):
-    balances = get_user_balances(db, sender.id)
     currency = data.currency.upper()
 
     if data.amount <= 0:
         raise HTTPException(status_code=400, detail="Amount must be positive")
 
     if data.type == "deposit":
+        deltas = {(sender.id, currency): data.amount}
         txn = models.Transaction(
             type="deposit",
             amount=data.amount,
@@ -21,8 +21,9 @@ def create_transaction(db: Session, sender: user_model.User, data: schemas.Trans
         )
 
     elif data.type == "withdraw":
-        if balances.get(currency, 0) < data.amount:
+        if get_user_balance(db, sender.id, currency, for_update=True) < data.amount:
             raise HTTPException(status_code=400, detail=f"Insufficient {currency} balance")
+        deltas = {(sender.id, currency): -data.amount}
         txn = models.Transaction(
             type="withdraw",
             amount=data.amount,
@@ -39,8 +40,9 @@ def create_transaction(db: Session, sender: user_model.User, data: schemas.Trans
             raise HTTPException(status_code=404, detail="Receiver not found")
         if receiver.id == sender.id:
             raise HTTPException(status_code=400, detail="Cannot transfer to self")
-        if balances.get(currency, 0) < data.amount:
+        if get_user_balance(db, sender.id, currency, for_update=True) < data.amount:
             raise HTTPException(status_code=400, detail=f"Insufficient {currency} balance for transfer")
+        deltas = {(sender.id, currency): -data.amount, (receiver.id, currency): data.amount}
 
         txn = models.Transaction(
             type="transfer",
@@ -54,6 +56,7 @@ def create_transaction(db: Session, sender: user_model.User, data: schemas.Trans
         raise HTTPException(status_code=400, detail="Invalid transaction type")
 
     db.add(txn)
+    apply_balance_deltas(db, deltas)
     db.commit()
     db.refresh(txn)
 
@@ -1,11 +1,10 @@
+from typing import Optional
+from sqlalchemy import update
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from app.core.passwords import pwd_context
+from app.crud import balance as balance_crud
 from app.models import user as models
-from app.models import transaction as txn_model
 from app.schemas import user as schemas
-from passlib.context import CryptContext
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 def get_user_by_username(db: Session, username: str):
@@ -15,8 +14,10 @@ def get_user_by_username(db: Session, username: str):
     ).first()
 
 
-def create_user(db: Session, user: schemas.UserCreate):
-    hashed_password = pwd_context.hash(user.password)
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: Optional[str] = None):
+    # Callers on the request path hash with app.core.passwords.hash_password first
+    if hashed_password is None:
+        hashed_password = pwd_context.hash(user.password)
     db_user = models.User(
         username=user.username,
         email=user.email,
@@ -32,25 +33,13 @@ def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def update_password_hash(db: Session, user_id: int, hashed_password: str):
+    db.execute(
+        update(models.User).where(models.User.id == user_id).values(hashed_password=hashed_password)
+    )
+    db.commit()
+
+
 def get_user_balances(db: Session, user_id: int):
-    balances = {}
-
-    currencies = db.query(txn_model.Transaction.currency).distinct().all()
-    for (currency,) in currencies:
-        credit = db.query(func.coalesce(func.sum(txn_model.Transaction.amount), 0)).filter(
-            txn_model.Transaction.receiver_id == user_id,
-            txn_model.Transaction.currency == currency,
-            txn_model.Transaction.type.in_(["deposit", "transfer"]),
-            txn_model.Transaction.is_deleted == False
-        ).scalar()
-
-        debit = db.query(func.coalesce(func.sum(txn_model.Transaction.amount), 0)).filter(
-            txn_model.Transaction.sender_id == user_id,
-            txn_model.Transaction.currency == currency,
-            txn_model.Transaction.type.in_(["withdraw", "transfer"]),
-            txn_model.Transaction.is_deleted == False
-        ).scalar()
-
-        balances[currency] = round(credit - debit, 2)
-
-    return balances
+    # Materialized in user_balances, one indexed lookup per user
+    return balance_crud.get_user_balances(db, user_id)
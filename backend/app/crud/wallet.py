@@ -0,0 +1,102 @@
+import itertools
+import time
+from collections import defaultdict
+from threading import Lock
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+from app.models.wallet import Wallet, WalletShard
+from app.utils.db_retry import contention
+
+# Per-process round-robin position for each hot wallet
+_next_shard = defaultdict(itertools.count)
+_next_shard_lock = Lock()
+
+
+def lock_wallets(db: Session, user_ids: set, skip_hot: set = frozenset()) -> dict:
+    """
+    Lock the active wallets of the given users in ascending wallet id order.
+
+    Every writer takes wallet row locks in the same order, and shard locks only
+    afterwards, so two transfers in opposite directions cannot deadlock.
+    Wallets of users in skip_hot are returned unlocked when they are sharded:
+    they are only credited, and credits go to a shard row instead.
+    """
+    user_ids = {uid for uid in user_ids if uid is not None}
+    start = time.perf_counter()
+    if skip_hot:
+        hot = set(db.scalars(select(Wallet.user_id).where(
+            Wallet.user_id.in_(skip_hot), Wallet.shard_count > 0, Wallet.is_active == True
+        )))
+        user_ids -= hot
+    else:
+        hot = set()
+
+    wallets = db.query(Wallet).filter(
+        Wallet.user_id.in_(user_ids),
+        Wallet.is_active == True
+    ).order_by(Wallet.id).with_for_update().all()
+    if hot:
+        wallets += db.query(Wallet).filter(
+            Wallet.user_id.in_(hot),
+            Wallet.is_active == True
+        ).all()
+
+    # Debited hot wallets need their shards folded in before the balance is checked
+    for wallet in sorted(wallets, key=lambda w: w.id):
+        if wallet.shard_count and wallet.user_id not in hot:
+            settle_shards(db, wallet)
+    contention.record_lock_wait(time.perf_counter() - start, f"wallets of users {sorted(user_ids | hot)}")
+    return {w.user_id: w for w in wallets}
+
+
+def settle_shards(db: Session, wallet: Wallet) -> None:
+    """Lock a hot wallet's shards in order and move their balances onto the wallet row"""
+    shards = db.query(WalletShard).filter(
+        WalletShard.wallet_id == wallet.id
+    ).order_by(WalletShard.shard).with_for_update().all()
+    settled = sum(s.balance for s in shards)
+    if settled:
+        wallet.balance += settled
+        for shard in shards:
+            shard.balance = 0.0
+
+
+def credit_wallet(db: Session, wallet: Wallet, amount: float) -> None:
+    """Add amount to a wallet; hot wallets are credited on their shards round-robin"""
+    if wallet.shard_count:
+        with _next_shard_lock:
+            shard = next(_next_shard[wallet.id]) % wallet.shard_count
+        result = db.execute(
+            update(WalletShard)
+            .where(WalletShard.wallet_id == wallet.id, WalletShard.shard == shard)
+            .values(balance=WalletShard.balance + amount)
+        )
+        if result.rowcount:
+            return
+        # Sharding was switched off concurrently; credit the row itself
+        db.refresh(wallet, with_for_update=True)
+    wallet.balance += amount
+
+
+def wallet_balance(db: Session, wallet: Wallet) -> float:
+    """Balance of a wallet including credits still held on its shards"""
+    if not wallet.shard_count:
+        return wallet.balance
+    shards = db.scalar(
+        select(func.coalesce(func.sum(WalletShard.balance), 0.0)).where(WalletShard.wallet_id == wallet.id)
+    )
+    return wallet.balance + shards
+
+
+def set_wallet_shards(db: Session, wallet: Wallet, count: int) -> Wallet:
+    """
+    Split a wallet's credits over count shard rows, or merge them back with count=0.
+    Existing shard balances are folded into the wallet row first. Commits.
+    """
+    db.refresh(wallet, with_for_update=True)
+    settle_shards(db, wallet)
+    db.query(WalletShard).filter(WalletShard.wallet_id == wallet.id).delete()
+    db.add_all([WalletShard(wallet_id=wallet.id, shard=i, balance=0.0) for i in range(count)])
+    wallet.shard_count = count
+    db.commit()
+    return wallet
@@ -1,21 +1,19 @@
-from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import QueuePool
 from app.config import DATABASE_URL
+from app.core.engine import get_engine
 
-# Configure the database engine with connection pooling
-engine = create_engine(
-    DATABASE_URL,
-    poolclass=QueuePool,
-    pool_size=5,
-    max_overflow=10,
-    pool_timeout=30,
-    pool_recycle=1800,  # Recycle connections after 30 minutes
-)
+# Shared, instrumented engine; pool sizing comes from the DB_POOL_* settings
+engine = get_engine(DATABASE_URL, name="legacy")
+# Engine for read-only work; a separate reader pool under the SQLite profile
+read_engine = get_engine(DATABASE_URL, name="legacy_read", role="read")
+# One connection of its own for the scheduler's leader lease
+lease_engine = get_engine(DATABASE_URL, name="legacy_lease", role="lease")
 
-# Create session factory
+# Create session factories
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+LeaseSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=lease_engine)
 
 # Create base class for models
 Base = declarative_base()
@@ -23,6 +21,14 @@ Base = declarative_base()
 # Dependency to get DB session
 def get_db():
     db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+# Dependency to get a session for read-only endpoints
+def get_read_db():
+    db = ReadSessionLocal()
     try:
         yield db
     finally:
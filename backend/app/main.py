@@ -1,7 +1,15 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from app.api import auth, wallet, admin
-from app.utils.scheduler import start_scheduler
+from app.config import METRICS_ENABLED
+from app.utils.scheduler import start_scheduler, stop_scheduler
+from app.utils.notifications import notifications
+from app.utils.alerts import alerts
 from fastapi.middleware.cors import CORSMiddleware
+from app.middlewares.request_context import RequestContextMiddleware
+from app.middlewares.metrics import MetricsMiddleware
+from app.middlewares.sql_profiler import SQLProfilerMiddleware
+from app.core.config import settings
+from app.utils import metrics
 
 app = FastAPI(
     title="Digital Wallet API",
@@ -13,6 +21,9 @@ origins = [
     "http://127.0.0.1:5173",
 ]
 
+if settings.SQL_PROFILING:
+    app.add_middleware(SQLProfilerMiddleware)
+app.add_middleware(RequestContextMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173"],  # Add your frontend URL(s)
@@ -20,15 +31,34 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if METRICS_ENABLED:
+    # Outermost, so the measured latency covers every other middleware
+    app.add_middleware(MetricsMiddleware)
+    metrics.track_committed_transactions()
 
-# Start the scheduler after app creation
-start_scheduler(app)
+@app.on_event("startup")
+def run_scheduler():
+    # Jobs run on the scheduler's thread pool, in whichever worker holds the leader lease
+    start_scheduler(app)
+
+@app.on_event("shutdown")
+def stop_background_work():
+    # Finish running jobs and release the lease, send pending alert digests,
+    # then flush queued emails and close pooled SMTP connections
+    stop_scheduler()
+    alerts.stop()
+    notifications.stop()
 
 # Include routers
 app.include_router(auth.router, prefix="/auth", tags=["Auth"])
 app.include_router(wallet.router, prefix="/wallet", tags=["Wallet"])
 app.include_router(admin.router, prefix="/admin", tags=["Admin"])
 
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    # Prometheus text format
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 @app.get("/", tags=["Health Check"])
 def read_root():
     return {"message": "Digital Wallet API is running 🚀"}
@@ -1,26 +1,45 @@
- 
+import time
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from app.config import SECRET_KEY, ALGORITHM
-from app.database import SessionLocal
+from app.core.config import settings
+from app.core.security import get_cached_principal
+from app.database import ReadSessionLocal
 from app.models import user as models
+from app.utils.cache import TTLCache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
-def get_current_user(token: str = Depends(oauth2_scheme)):
+# Decoded legacy tokens: token -> (username, expiry timestamp)
+token_cache = TTLCache(ttl=settings.AUTH_CACHE_TTL, maxsize=settings.AUTH_CACHE_SIZE)
+
+def _load_user(username: str):
+    db = ReadSessionLocal()
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        return db.query(models.User).filter(
+            models.User.username == username,
+            models.User.is_deleted == False
+        ).first()
+    finally:
+        db.close()
+
+def get_current_user(token: str = Depends(oauth2_scheme)):
+    """Return a principal snapshot; the database is only hit on a cache miss"""
+    cached = token_cache.get(token)
+    if cached is not None and cached[1] > time.time():
+        username = cached[0]
+    else:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
+            raise HTTPException(status_code=401, detail="Invalid token")
         username = payload.get("sub")
         if username is None:
             raise HTTPException(status_code=401, detail="Invalid token")
+        token_cache.set(token, (username, payload.get("exp", 0)))
 
-        db = SessionLocal()
-        db_user = db.query(models.User).filter(models.User.username == username).first()
-        db.close()
-        if db_user is None:
-            raise HTTPException(status_code=404, detail="User not found")
-        return db_user
-
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+    db_user = get_cached_principal(("username", username), lambda: _load_user(username))
+    if db_user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return db_user
@@ -0,0 +1,43 @@
+import time
+from app.utils.metrics import http_request_duration, http_requests, http_requests_in_flight
+
+KNOWN_METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+
+
+class MetricsMiddleware:
+    """
+    Count and time every HTTP request by method and route template.
+
+    Routes are labelled by their template ("/admin/wallets/{user_id}/shards"),
+    never the raw path, and requests that match no route share one label, so
+    the number of series is bounded by the routes the app declares.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_requests_in_flight.dec()
+            # The router has stored the matched route in the scope by now
+            route = scope.get("route")
+            template = getattr(route, "path_format", None) or getattr(route, "path", None) or "unmatched"
+            method = scope["method"] if scope["method"] in KNOWN_METHODS else "OTHER"
+            http_requests.inc(method, template, str(status_code))
+            http_request_duration.observe(elapsed, method, template)
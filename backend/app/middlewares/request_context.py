@@ -0,0 +1,19 @@
+from contextvars import ContextVar
+
+# "METHOD /path" of the request being served, for logs raised deep in the stack
+current_endpoint: ContextVar[str] = ContextVar("current_endpoint", default="background task")
+
+class RequestContextMiddleware:
+    """Record the endpoint of each request in current_endpoint"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        token = current_endpoint.set(f"{scope['method']} {scope['path']}")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_endpoint.reset(token)
@@ -0,0 +1,46 @@
+import logging
+from app.core.config import settings
+from app.utils.sql_profiler import RequestProfile, current_profile
+
+logger = logging.getLogger(__name__)
+
+
+class SQLProfilerMiddleware:
+    """
+    Count the statements each request runs and the time spent in the database.
+
+    The totals go out as X-DB-Queries and X-DB-Time-Ms response headers (unless
+    SQL_PROFILE_HEADERS is off) and into a debug log line per request; a
+    statement repeated more than SQL_REPEAT_THRESHOLD times in one request is
+    logged as a likely N+1. Only engines built while SQL_PROFILING is on are
+    instrumented. Streamed bodies are still running when the headers go out,
+    so their headers cover the work done up to the first chunk.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        profile = RequestProfile(f"{scope['method']} {scope['path']}")
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and settings.SQL_PROFILE_HEADERS:
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-db-queries", str(profile.statements).encode()),
+                    (b"x-db-time-ms", f"{profile.db_seconds * 1000:.1f}".encode()),
+                ]
+            await send(message)
+
+        token = current_profile.set(profile)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_profile.reset(token)
+            logger.debug(
+                f"{profile.endpoint}: {profile.statements} queries, {profile.db_seconds * 1000:.1f} ms in database"
+            )
+            for statement, count in profile.repeated():
+                logger.warning(f"Possible N+1 in {profile.endpoint}: ran {count} times: {statement}")
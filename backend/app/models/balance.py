@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from datetime import datetime
+from app.database import Base
+
+class UserBalance(Base):
+    """Materialized per-currency balance, updated with every ledger insert"""
+    __tablename__ = "user_balances"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    currency = Column(String, primary_key=True)
+    balance = Column(Float, default=0.0, nullable=False)
+    version = Column(Integer, default=1, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<UserBalance {self.user_id} - {self.currency}: {self.balance}>"
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Enum
+from datetime import datetime
+from app.database import Base
+from app.core.models import TransactionType
+
+class DailyTransactionRollup(Base):
+    """Per-day transaction aggregates; weekly and monthly reports are summed from these rows"""
+    __tablename__ = "daily_transaction_rollups"
+
+    day = Column(Date, primary_key=True)
+    currency = Column(String, primary_key=True)
+    transaction_type = Column(Enum(TransactionType), primary_key=True)
+    txn_count = Column(Integer, nullable=False, default=0)
+    total_amount = Column(Float, nullable=False, default=0.0)
+    min_amount = Column(Float, nullable=True)
+    max_amount = Column(Float, nullable=True)
+    flagged_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<DailyTransactionRollup {self.day} {self.currency} {self.transaction_type}>"
@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, String, Float, Text, DateTime
+from datetime import datetime
+from app.database import Base
+
+class SchedulerLease(Base):
+    """Leader lease; only the process holding an unexpired lease runs scheduled jobs"""
+    __tablename__ = "scheduler_leases"
+
+    name = Column(String(64), primary_key=True)
+    owner = Column(String(255), nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    heartbeat_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<SchedulerLease {self.name} held by {self.owner}>"
+
+class JobRun(Base):
+    """History of scheduled job executions"""
+    __tablename__ = "job_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(String(64), nullable=False)
+    owner = Column(String(255), nullable=False)
+    started_at = Column(DateTime, nullable=False)
+    finished_at = Column(DateTime, nullable=False)
+    duration_seconds = Column(Float, nullable=False)
+    rows_scanned = Column(Integer, nullable=True)
+    outcome = Column(String(16), nullable=False)  # success or failed
+    error = Column(Text, nullable=True)
+
+    def __repr__(self):
+        return f"<JobRun {self.job_id} {self.outcome} at {self.started_at}>"
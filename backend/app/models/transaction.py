@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum, Boolean, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -30,5 +30,23 @@ class Transaction(Base):
     recipient = relationship("User", back_populates="received_transactions", foreign_keys=[recipient_id])
     wallet = relationship("Wallet", back_populates="transactions")
 
+    __table_args__ = (
+        # History pages and per-user ranges: WHERE user_id = ? ORDER BY created_at, id
+        Index("ix_transactions_user_created", "user_id", "created_at", "id"),
+        # Fraud velocity: WHERE user_id = ? AND status = ? AND created_at >= ?
+        Index("ix_transactions_user_status_created", "user_id", "status", "created_at"),
+        # Fraud scoring: WHERE recipient_id = ? AND is_flagged
+        Index("ix_transactions_recipient_flagged", "recipient_id", "is_flagged"),
+        # Reports and scans over a time range
+        Index("ix_transactions_created_at", "created_at"),
+        # Flagged transaction lists, only flagged rows are indexed
+        Index(
+            "ix_transactions_flagged_created",
+            "created_at",
+            sqlite_where=is_flagged == True,
+            postgresql_where=is_flagged == True,
+        ),
+    )
+
     def __repr__(self):
         return f"<Transaction {self.id} - {self.transaction_type.value}>"
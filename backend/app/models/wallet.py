@@ -17,6 +17,8 @@ class Wallet(Base):
     user_id = Column(Integer, ForeignKey("users.id"), unique=True)
     currency = Column(Enum(CurrencyType), default=CurrencyType.USD)
     balance = Column(Float, default=0.0)
+    # Hot wallets take credits on this many wallet_shards rows; 0 means unsharded
+    shard_count = Column(Integer, default=0, nullable=False, server_default="0")
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     is_active = Column(Boolean, default=True)
@@ -26,4 +28,16 @@ class Wallet(Base):
     transactions = relationship("Transaction", back_populates="wallet")
 
     def __repr__(self):
-        return f"<Wallet {self.id} - {self.currency.value}>" 
\ No newline at end of file
+        return f"<Wallet {self.id} - {self.currency.value}>"
+
+class WalletShard(Base):
+    """Credit sub-row of a hot wallet; the wallet balance is its own plus all shards"""
+    __tablename__ = "wallet_shards"
+
+    wallet_id = Column(Integer, ForeignKey("wallets.id"), primary_key=True)
+    shard = Column(Integer, primary_key=True)
+    balance = Column(Float, default=0.0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<WalletShard {self.wallet_id}/{self.shard}: {self.balance}>"
@@ -1,7 +1,9 @@
-from pydantic import BaseModel, ConfigDict
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Optional, List
 from datetime import datetime
-from app.core.models import TransactionType
+import enum
+from app.core.models import TransactionType, TransactionStatus
+from app.config import MAX_BATCH_SIZE
 
 class TransactionCreate(BaseModel):
     type: str  # deposit, withdraw, transfer
@@ -28,3 +30,47 @@ class TransactionFilter(BaseModel):
     max_amount: Optional[float] = None
     is_flagged: Optional[bool] = None
 
+class ExportFormat(str, enum.Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+    PARQUET = "parquet"
+
+class TransactionExportFilter(BaseModel):
+    # Half-open range [start_date, end_date) on created_at
+    start_date: datetime
+    end_date: datetime
+    user_id: Optional[int] = None
+    transaction_type: Optional[TransactionType] = None
+    status: Optional[TransactionStatus] = None
+    currency: Optional[str] = None
+    min_amount: Optional[float] = None
+    max_amount: Optional[float] = None
+    is_flagged: Optional[bool] = None
+
+class BatchMode(str, enum.Enum):
+    ATOMIC = "atomic"            # commit every operation or none of them
+    BEST_EFFORT = "best_effort"  # commit the operations that pass validation
+
+class BatchOperation(BaseModel):
+    transaction_type: TransactionType
+    amount: float = Field(gt=0)
+    currency: str = "USD"
+    description: Optional[str] = None
+    recipient_id: Optional[int] = None
+
+class BatchTransactionRequest(BaseModel):
+    operations: List[BatchOperation] = Field(min_length=1, max_length=MAX_BATCH_SIZE)
+    mode: BatchMode = BatchMode.ATOMIC
+
+class BatchItemResult(BaseModel):
+    index: int
+    success: bool
+    transaction_id: Optional[int] = None
+    is_flagged: bool = False
+    error: Optional[str] = None
+
+class BatchTransactionResult(BaseModel):
+    committed: bool
+    processed: int
+    failed: int
+    results: List[BatchItemResult]
@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic import BaseModel, EmailStr, ConfigDict
 
 class UserCreate(BaseModel):
@@ -12,6 +13,16 @@ class UserOut(BaseModel):
 
     model_config = ConfigDict(from_attributes=True) 
 
+class CurrentUser(BaseModel):
+    """The authenticated principal as returned by get_current_user"""
+    id: int
+    email: EmailStr
+    username: Optional[str] = None
+    is_active: bool
+    is_admin: bool
+
+    model_config = ConfigDict(from_attributes=True)
+
 class UserLogin(BaseModel):
     username: str
     password: str
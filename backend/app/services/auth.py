@@ -1,7 +1,11 @@
 from typing import Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import update
 from sqlalchemy.orm import Session
+from app.core.database import SessionLocal
 from app.core.models import User
-from app.core.security import verify_password, get_password_hash
+from app.core.passwords import pwd_context, verify_and_update_password
+from app.core.security import get_password_hash
 from app.schemas.user import UserCreate
 
 class AuthService:
@@ -10,19 +14,62 @@ class AuthService:
         user = db.query(User).filter(User.email == email).first()
         if not user:
             return None
-        if not verify_password(password, user.hashed_password):
+        verified, new_hash = pwd_context.verify_and_update(password, user.hashed_password)
+        if not verified:
             return None
+        if new_hash:
+            AuthService._rehash(db, user, new_hash)
         return user
 
+    @staticmethod
+    async def authenticate_async(db: Session, *, email: str, password: str) -> Optional[User]:
+        """
+        authenticate() with bcrypt on the password pool and queries on the threadpool.
+        db may be a read-only session; it is closed before hashing, and a rehash
+        is written through a short writer session of its own.
+        """
+        user = await run_in_threadpool(
+            lambda: db.query(User).filter(User.email == email).first()
+        )
+        if not user:
+            return None
+        db.close()
+        verified, new_hash = await verify_and_update_password(password, user.hashed_password)
+        if not verified:
+            return None
+        if new_hash:
+            await run_in_threadpool(AuthService._rehash_by_id, user.id, new_hash)
+            user.hashed_password = new_hash
+        return user
+
+    @staticmethod
+    def _rehash(db: Session, user: User, new_hash: str) -> None:
+        # Stored hash used outdated parameters; replace it while we have the password
+        user.hashed_password = new_hash
+        db.commit()
+        db.refresh(user)
+
+    @staticmethod
+    def _rehash_by_id(user_id: int, new_hash: str) -> None:
+        db = SessionLocal()
+        try:
+            db.execute(update(User).where(User.id == user_id).values(hashed_password=new_hash))
+            db.commit()
+        finally:
+            db.close()
+
     @staticmethod
     def get_password_hash(password: str) -> str:
         return get_password_hash(password)
 
     @staticmethod
-    def create_user(db: Session, *, obj_in: UserCreate) -> User:
+    def create_user(db: Session, *, obj_in: UserCreate, hashed_password: Optional[str] = None) -> User:
+        # Callers on the request path hash with app.core.passwords.hash_password first
+        if hashed_password is None:
+            hashed_password = get_password_hash(obj_in.password)
         db_obj = User(
             email=obj_in.email,
-            hashed_password=get_password_hash(obj_in.password),
+            hashed_password=hashed_password,
             first_name=obj_in.first_name,
             last_name=obj_in.last_name,
             is_active=obj_in.is_active,
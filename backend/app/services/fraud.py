@@ -2,7 +2,9 @@ from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from app.models import transaction as txn_model
 from app.models import user as user_model
+from app.config import SMTP_USER
 from app.database import SessionLocal
+from app.utils.alerts import alerts
 from app.utils.email import send_mock_email_alert
 
 def flag_suspicious_transactions(db: Session, sender_id: int, new_txn: txn_model.Transaction):
@@ -34,7 +36,10 @@ def flag_suspicious_transactions(db: Session, sender_id: int, new_txn: txn_model
         db.commit()
 
         receiver = db.query(user_model.User).filter(user_model.User.id == sender_id).first()
-        if receiver:
+        if receiver and SMTP_USER:
+            alerts.add(receiver.email, new_txn.flag_reason, f"Transaction ID {new_txn.id}")
+        elif receiver:
+            # No SMTP account configured: keep logging the alert instead of mailing it
             send_mock_email_alert(
                 to=receiver.email,
                 subject="🚨 Suspicious Transaction Detected",
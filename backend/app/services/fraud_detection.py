@@ -1,17 +1,35 @@
-from datetime import datetime, timedelta
+from datetime import datetime
+from typing import Optional
 from sqlalchemy.orm import Session
 from app.models.transaction import Transaction, TransactionStatus
 from app.config import (
     SUSPICIOUS_TRANSACTION_THRESHOLD,
-    RAPID_TRANSACTION_WINDOW,
     MAX_RAPID_TRANSACTIONS,
     MAX_TRANSACTION_AMOUNT,
-    DAILY_TRANSACTION_LIMIT
+    DAILY_TRANSACTION_LIMIT,
+    FRAUD_FEATURE_SOURCE
 )
+from app.services.fraud_features import FraudFeatures, get_fraud_features
+from app.services.velocity import VelocityStore, velocity_store
+from app.utils.metrics import fraud_flags
+
+def _flag(rule: str, reason: str) -> tuple[bool, str]:
+    """Flag a transaction; the metric is labelled by rule since reasons carry amounts"""
+    fraud_flags.inc(rule)
+    return True, reason
 
 class FraudDetectionService:
-    def __init__(self, db: Session):
+    def __init__(
+        self,
+        db: Session,
+        velocity: Optional[VelocityStore] = None,
+        feature_source: str = FRAUD_FEATURE_SOURCE
+    ):
         self.db = db
+        self.velocity = velocity or velocity_store
+        self.feature_source = feature_source
+        if self.feature_source == "memory":
+            self.velocity.ensure_loaded(db)
 
     def check_transaction(self, user_id: int, amount: float, transaction_type: str) -> tuple[bool, str]:
         """
@@ -20,64 +38,106 @@ class FraudDetectionService:
         """
         # Check amount threshold
         if amount > MAX_TRANSACTION_AMOUNT:
-            return True, f"Transaction amount {amount} exceeds maximum allowed {MAX_TRANSACTION_AMOUNT}"
+            return _flag("max_amount", f"Transaction amount {amount} exceeds maximum allowed {MAX_TRANSACTION_AMOUNT}")
+
+        features = self._get_features(user_id)
+        return self._evaluate(amount, features.recent_count, features.daily_total)
+
+    def check_batch(self, user_id: int, amounts: list[float]) -> list[tuple[bool, str]]:
+        """
+        Check a sequence of transactions for one user with a single feature lookup.
+        Each amount is evaluated as if the previous ones had already completed.
+        """
+        features = self._get_features(user_id)
+        recent_count, daily_total = features.recent_count, features.daily_total
+        results = []
+        for amount in amounts:
+            if amount > MAX_TRANSACTION_AMOUNT:
+                results.append(_flag("max_amount", f"Transaction amount {amount} exceeds maximum allowed {MAX_TRANSACTION_AMOUNT}"))
+            else:
+                results.append(self._evaluate(amount, recent_count, daily_total))
+            recent_count += 1
+            daily_total += amount
+        return results
 
+    def _evaluate(self, amount: float, recent_count: int, daily_total: float) -> tuple[bool, str]:
+        """Apply the velocity and amount rules to precomputed features"""
         # Check for rapid transactions
-        recent_transactions = self._get_recent_transactions(user_id)
-        if len(recent_transactions) >= MAX_RAPID_TRANSACTIONS:
-            return True, f"Too many transactions in short period: {len(recent_transactions)}"
+        if recent_count >= MAX_RAPID_TRANSACTIONS:
+            return _flag("velocity", f"Too many transactions in short period: {recent_count}")
 
         # Check daily limit
-        daily_total = self._get_daily_total(user_id)
         if daily_total + amount > DAILY_TRANSACTION_LIMIT:
-            return True, f"Daily transaction limit exceeded: {daily_total + amount}"
+            return _flag("daily_limit", f"Daily transaction limit exceeded: {daily_total + amount}")
 
         # Check for suspicious amount
         if amount > SUSPICIOUS_TRANSACTION_THRESHOLD:
-            return True, f"Large transaction amount: {amount}"
+            return _flag("large_amount", f"Large transaction amount: {amount}")
 
         return False, ""
 
-    def _get_recent_transactions(self, user_id: int) -> list[Transaction]:
-        """Get transactions within the rapid transaction window"""
-        window_start = datetime.utcnow() - timedelta(seconds=RAPID_TRANSACTION_WINDOW)
-        return self.db.query(Transaction).filter(
-            Transaction.user_id == user_id,
-            Transaction.created_at >= window_start,
-            Transaction.status == TransactionStatus.COMPLETED
-        ).all()
+    def record_transaction(self, transaction: Transaction) -> None:
+        """Update velocity counters after a transaction has been committed"""
+        if self.feature_source == "memory" and transaction.status == TransactionStatus.COMPLETED:
+            self.velocity.record(
+                transaction.user_id, transaction.amount,
+                transaction.created_at or datetime.utcnow()
+            )
+
+    def record_batch(self, user_id: int, amounts: list[float], created_at: datetime) -> None:
+        """Update velocity counters after a batch has been committed"""
+        if self.feature_source == "memory":
+            for amount in amounts:
+                self.velocity.record(user_id, amount, created_at)
 
-    def _get_daily_total(self, user_id: int) -> float:
-        """Calculate total transaction amount for today"""
-        today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-        transactions = self.db.query(Transaction).filter(
-            Transaction.user_id == user_id,
-            Transaction.created_at >= today_start,
-            Transaction.status == TransactionStatus.COMPLETED
-        ).all()
-        return sum(t.amount for t in transactions)
+    def _get_features(self, user_id: int, recipient_id: Optional[int] = None) -> FraudFeatures:
+        """Get velocity and recipient features for a user/recipient pair"""
+        if self.feature_source == "sql":
+            return get_fraud_features(self.db, user_id, recipient_id)
+
+        recipient_flagged = 0
+        if recipient_id is not None:
+            recipient_flagged = self.db.query(Transaction).filter(
+                Transaction.recipient_id == recipient_id,
+                Transaction.is_flagged == True
+            ).count()
+        return FraudFeatures(
+            self.velocity.recent_count(user_id),
+            self.velocity.daily_total(user_id),
+            recipient_flagged
+        )
 
     def calculate_fraud_score(self, transaction: Transaction) -> float:
         """Calculate a fraud score for a transaction"""
+        is_transfer = transaction.transaction_type == "TRANSFER"
+        features = self._get_features(
+            transaction.user_id,
+            transaction.recipient_id if is_transfer else None
+        )
+        return self.score(
+            transaction.amount,
+            transaction.transaction_type,
+            features.recent_count,
+            features.recipient_flagged > 0
+        )
+
+    @staticmethod
+    def score(amount: float, transaction_type: str, recent_count: int, recipient_flagged: bool) -> float:
+        """Score a transaction from precomputed features"""
         score = 0.0
         
         # Amount-based scoring
-        if transaction.amount > SUSPICIOUS_TRANSACTION_THRESHOLD:
+        if amount > SUSPICIOUS_TRANSACTION_THRESHOLD:
             score += 0.3
         
         # Time-based scoring
-        recent_transactions = self._get_recent_transactions(transaction.user_id)
-        if len(recent_transactions) > 3:
+        if recent_count > 3:
             score += 0.2
         
         # Pattern-based scoring
-        if transaction.transaction_type == "TRANSFER":
+        if transaction_type == "TRANSFER":
             # Check if recipient has been involved in flagged transactions
-            recipient_flagged = self.db.query(Transaction).filter(
-                Transaction.recipient_id == transaction.recipient_id,
-                Transaction.is_flagged == True
-            ).count()
-            if recipient_flagged > 0:
+            if recipient_flagged:
                 score += 0.2
         
-        return min(score, 1.0)  # Cap score at 1.0 
\ No newline at end of file
+        return min(score, 1.0)  # Cap score at 1.0
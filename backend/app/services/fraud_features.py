@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+from sqlalchemy import select, func, case, literal
+from sqlalchemy.orm import Session
+from app.models.transaction import Transaction, TransactionStatus
+from app.config import RAPID_TRANSACTION_WINDOW
+
+
+class FraudFeatures(NamedTuple):
+    recent_count: int
+    daily_total: float
+    recipient_flagged: int
+
+
+def get_fraud_features(
+    db: Session,
+    user_id: int,
+    recipient_id: Optional[int] = None,
+    now: Optional[datetime] = None
+) -> FraudFeatures:
+    """
+    Fetch the fraud features for a user/recipient pair in one aggregate statement.
+
+    The rapid-window count and the UTC-day total are computed with conditional
+    aggregates over a single range scan of the user's recent transactions; the
+    recipient's flagged count is a scalar subquery of the same statement.
+    """
+    now = now or datetime.utcnow()
+    window_start = now - timedelta(seconds=RAPID_TRANSACTION_WINDOW)
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    user_rows = select(
+        func.count(case((Transaction.created_at >= window_start, 1))).label("recent_count"),
+        func.coalesce(
+            func.sum(case((Transaction.created_at >= today_start, Transaction.amount))), 0.0
+        ).label("daily_total"),
+    ).where(
+        Transaction.user_id == user_id,
+        Transaction.created_at >= min(window_start, today_start),
+        Transaction.status == TransactionStatus.COMPLETED
+    ).subquery()
+
+    if recipient_id is None:
+        recipient_flagged = literal(0)
+    else:
+        recipient_flagged = select(func.count(Transaction.id)).where(
+            Transaction.recipient_id == recipient_id,
+            Transaction.is_flagged == True
+        ).scalar_subquery()
+
+    row = db.execute(
+        select(
+            user_rows.c.recent_count,
+            user_rows.c.daily_total,
+            recipient_flagged.label("recipient_flagged"),
+        )
+    ).one()
+    return FraudFeatures(int(row[0]), float(row[1]), int(row[2]))
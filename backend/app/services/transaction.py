@@ -1,11 +1,18 @@
-from typing import Optional, Tuple
+from datetime import datetime
+from typing import Optional, Tuple, List
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from fastapi import HTTPException, status
 from app.models.transaction import Transaction, TransactionStatus, TransactionType
 from app.models.wallet import Wallet
+from app.models.user import User
+from app.crud.balance import apply_transaction, apply_balance_deltas, transaction_deltas, wallet_currency
+from app.crud.wallet import credit_wallet, lock_wallets
+from app.schemas.transaction import BatchOperation, BatchMode
 from app.services.fraud_detection import FraudDetectionService
-from app.utils.email import send_email_alert
+from app.utils.alerts import alerts
+from app.utils.db_retry import is_retryable_error, retry_transaction
 from decimal import Decimal, ROUND_DOWN
 import logging
 
@@ -23,54 +30,142 @@ class TransactionService:
         currency: str,
         transaction_type: TransactionType,
         description: Optional[str] = None,
-        recipient_id: Optional[int] = None
+        recipient_id: Optional[int] = None,
+        retry: bool = True
     ) -> Tuple[Transaction, bool]:
         """
         Process a transaction with proper error handling and transaction isolation.
+
+        Both wallets are locked up front in ascending id order, and the whole
+        transaction is retried with jitter on deadlocks and serialization failures.
+        With retry=False a lost deadlock propagates after the rollback instead,
+        for callers that retry on their own (see retry_transaction_async).
         Returns (transaction, is_suspicious)
         """
+        def attempt():
+            return self._apply_transaction(
+                user_id, amount, currency, transaction_type, description, recipient_id
+            )
+
         try:
-            # Start transaction
-            self.db.begin_nested()
+            transaction, is_suspicious = retry_transaction(self.db, attempt) if retry else attempt()
+        except HTTPException:
+            self.db.rollback()
+            raise
+        except IntegrityError as e:
+            self.db.rollback()
+            logger.error(f"Database integrity error: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid transaction data"
+            )
+        except SQLAlchemyError as e:
+            self.db.rollback()
+            if not retry and is_retryable_error(e):
+                raise
+            logger.error(f"Database error: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Database error occurred"
+            )
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Unexpected error: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="An unexpected error occurred"
+            )
 
-            # Get user's wallet
-            wallet = self._get_wallet(user_id)
-            if not wallet:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Wallet not found"
-                )
+        self.fraud_service.record_transaction(transaction)
 
-            # Validate transaction
-            self._validate_transaction(
-                wallet, amount, transaction_type, recipient_id
-            )
+        # Send notifications if needed
+        self._send_notifications(transaction, is_suspicious)
 
-            # Check for fraud
-            is_suspicious, reason = self.fraud_service.check_transaction(
-                user_id, float(amount), transaction_type
-            )
+        return transaction, is_suspicious
 
-            # Create transaction record
-            transaction = self._create_transaction(
-                user_id, wallet.id, amount, currency,
-                transaction_type, description, recipient_id,
-                is_suspicious, reason
+    def _apply_transaction(
+        self,
+        user_id: int,
+        amount: Decimal,
+        currency: str,
+        transaction_type: TransactionType,
+        description: Optional[str],
+        recipient_id: Optional[int]
+    ) -> Tuple[Transaction, bool]:
+        """One attempt at a transaction, from taking the locks to the commit"""
+        # Lock the user's and the recipient's wallets; a wallet that is only
+        # credited is left unlocked when it is sharded
+        if transaction_type == TransactionType.DEPOSIT:
+            credited = {user_id}
+        elif transaction_type == TransactionType.TRANSFER:
+            credited = {recipient_id}
+        else:
+            credited = set()
+        wallets = lock_wallets(self.db, {user_id, recipient_id}, skip_hot=credited)
+        wallet = wallets.get(user_id)
+        if not wallet:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Wallet not found"
             )
 
-            # Process the transaction
-            self._update_balances(
-                wallet, amount, transaction_type, recipient_id
-            )
+        # Validate transaction
+        self._validate_transaction(
+            wallet, amount, currency, transaction_type, recipient_id
+        )
+        if transaction_type == TransactionType.TRANSFER:
+            if recipient_id not in wallets:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Recipient wallet not found"
+                )
+            if wallet_currency(wallets[recipient_id]) != currency:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Currency does not match the recipient wallet"
+                )
 
-            # Commit the transaction
-            self.db.commit()
+        # Check for fraud
+        is_suspicious, reason = self.fraud_service.check_transaction(
+            user_id, float(amount), transaction_type
+        )
+
+        # Create transaction record
+        transaction = self._create_transaction(
+            user_id, wallet.id, amount, currency,
+            transaction_type, description, recipient_id,
+            is_suspicious, reason
+        )
 
-            # Send notifications if needed
-            self._send_notifications(transaction, is_suspicious)
+        # Process the transaction
+        self._update_balances(
+            wallet, amount, transaction_type, wallets.get(recipient_id)
+        )
 
-            return transaction, is_suspicious
+        # Commit the transaction
+        self.db.commit()
+        return transaction, is_suspicious
 
+    def process_batch(
+        self,
+        user_id: int,
+        operations: List[BatchOperation],
+        mode: BatchMode = BatchMode.ATOMIC
+    ) -> dict:
+        """
+        Process a batch of operations for one user with a single commit.
+
+        All affected wallets are locked once in ascending id order, balances are
+        validated against an in-memory running total, fraud checks share one
+        feature lookup and the rows are written with one bulk insert.
+        In atomic mode any failed item aborts the whole batch. Like single
+        transactions, the batch is retried with jitter on deadlocks.
+        """
+        try:
+            result, rows = retry_transaction(self.db, lambda: self._apply_batch(user_id, operations, mode))
+        except HTTPException:
+            self.db.rollback()
+            raise
         except IntegrityError as e:
             self.db.rollback()
             logger.error(f"Database integrity error: {str(e)}")
@@ -85,35 +180,163 @@ class TransactionService:
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Database error occurred"
             )
-        except Exception as e:
-            self.db.rollback()
-            logger.error(f"Unexpected error: {str(e)}")
+
+        if rows:
+            self.fraud_service.record_batch(user_id, [row["amount"] for row in rows], rows[0]["created_at"])
+        self._send_batch_notifications(user_id, [row for row in rows if row["is_flagged"]])
+        return result
+
+    def _apply_batch(
+        self,
+        user_id: int,
+        operations: List[BatchOperation],
+        mode: BatchMode
+    ) -> Tuple[dict, List[dict]]:
+        """One attempt at a batch, from taking the locks to the commit; returns (result, inserted rows)"""
+        # Recipients are only credited, so sharded ones are left unlocked
+        recipient_ids = {op.recipient_id for op in operations if op.recipient_id} - {user_id}
+        wallets = lock_wallets(self.db, {user_id} | recipient_ids, skip_hot=recipient_ids)
+        wallet = wallets.get(user_id)
+        if not wallet:
             raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="An unexpected error occurred"
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Wallet not found"
             )
 
-    def _get_wallet(self, user_id: int) -> Optional[Wallet]:
-        """Get user's wallet with proper locking"""
-        return self.db.query(Wallet).filter(
-            Wallet.user_id == user_id,
-            Wallet.is_active == True
-        ).with_for_update().first()
+        # Validate every item against the running balance of the locked wallet
+        balances = {user_id: wallet.balance}
+        credits = {}
+        results = []
+        accepted = []
+        for index, op in enumerate(operations):
+            error = self._validate_batch_item(op, user_id, balances, wallets)
+            results.append({"index": index, "success": error is None, "error": error})
+            if error is None:
+                accepted.append(index)
+                self._apply_to_balances(op, user_id, balances, credits)
+
+        failed = len(operations) - len(accepted)
+        if not accepted or (mode == BatchMode.ATOMIC and failed):
+            self.db.rollback()
+            for result in results:
+                if result["success"]:
+                    result["success"] = False
+                    result["error"] = "Not applied: batch aborted"
+            return {
+                "committed": False,
+                "processed": 0,
+                "failed": len(operations),
+                "results": results
+            }, []
+
+        # Run fraud checks for the accepted items in one pass
+        checks = self.fraud_service.check_batch(
+            user_id, [operations[i].amount for i in accepted]
+        )
+
+        now = datetime.utcnow()
+        rows = []
+        for index, (is_suspicious, reason) in zip(accepted, checks):
+            op = operations[index]
+            rows.append({
+                "user_id": user_id,
+                "wallet_id": wallet.id,
+                "transaction_type": op.transaction_type,
+                "amount": float(op.amount),
+                "currency": op.currency,
+                "description": op.description,
+                "recipient_id": op.recipient_id,
+                "is_flagged": is_suspicious,
+                "flag_reason": reason or None,
+                "status": TransactionStatus.COMPLETED,
+                "created_at": now,
+                "updated_at": now
+            })
+
+        transaction_ids = self.db.scalars(
+            insert(Transaction).returning(Transaction.id, sort_by_parameter_order=True),
+            rows
+        ).all()
+        apply_balance_deltas(
+            self.db, transaction_deltas(Transaction(**row) for row in rows)
+        )
+
+        wallet.balance = balances[user_id]
+        for recipient_id, amount in credits.items():
+            credit_wallet(self.db, wallets[recipient_id], amount)
+
+        self.db.commit()
+
+        for index, transaction_id, row in zip(accepted, transaction_ids, rows):
+            results[index]["transaction_id"] = transaction_id
+            results[index]["is_flagged"] = row["is_flagged"]
+        return {
+            "committed": True,
+            "processed": len(accepted),
+            "failed": failed,
+            "results": results
+        }, rows
+
+    def _validate_batch_item(
+        self,
+        op: BatchOperation,
+        user_id: int,
+        balances: dict,
+        wallets: dict
+    ) -> Optional[str]:
+        """Return an error message for an invalid batch item, or None"""
+        if op.currency != wallet_currency(wallets[user_id]):
+            return "Currency does not match wallet"
+        if op.transaction_type == TransactionType.TRANSFER:
+            if not op.recipient_id:
+                return "Recipient ID required for transfers"
+            if op.recipient_id == user_id:
+                return "Cannot transfer to self"
+            if op.recipient_id not in wallets:
+                return "Recipient wallet not found"
+            if op.currency != wallet_currency(wallets[op.recipient_id]):
+                return "Currency does not match the recipient wallet"
+
+        if op.transaction_type in [TransactionType.WITHDRAWAL, TransactionType.TRANSFER]:
+            if balances[user_id] < op.amount:
+                return "Insufficient funds"
+        return None
+
+    def _apply_to_balances(self, op: BatchOperation, user_id: int, balances: dict, credits: dict) -> None:
+        if op.transaction_type == TransactionType.DEPOSIT:
+            balances[user_id] += op.amount
+        elif op.transaction_type == TransactionType.WITHDRAWAL:
+            balances[user_id] -= op.amount
+        elif op.transaction_type == TransactionType.TRANSFER:
+            balances[user_id] -= op.amount
+            credits[op.recipient_id] = credits.get(op.recipient_id, 0.0) + op.amount
 
     def _validate_transaction(
         self,
         wallet: Wallet,
         amount: Decimal,
+        currency: str,
         transaction_type: TransactionType,
         recipient_id: Optional[int]
     ) -> None:
-        """Validate transaction parameters"""
+        """
+        Validate transaction parameters.
+
+        The locked wallet balance is the one checked; user_balances mirrors it
+        per currency, so the ledger currency must be the wallet's.
+        """
         if amount <= 0:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Amount must be positive"
             )
 
+        if currency != wallet_currency(wallet):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Currency does not match wallet"
+            )
+
         if transaction_type == TransactionType.TRANSFER:
             if not recipient_id:
                 raise HTTPException(
@@ -159,6 +382,7 @@ class TransactionService:
             status=TransactionStatus.COMPLETED
         )
         self.db.add(transaction)
+        apply_transaction(self.db, transaction)
         return transaction
 
     def _update_balances(
@@ -166,29 +390,34 @@ class TransactionService:
         wallet: Wallet,
         amount: Decimal,
         transaction_type: TransactionType,
-        recipient_id: Optional[int]
+        recipient_wallet: Optional[Wallet]
     ) -> None:
-        """Update wallet balances"""
+        """Update the already locked wallet balances"""
         if transaction_type == TransactionType.DEPOSIT:
-            wallet.balance += amount
+            credit_wallet(self.db, wallet, amount)
         elif transaction_type == TransactionType.WITHDRAWAL:
             wallet.balance -= amount
         elif transaction_type == TransactionType.TRANSFER:
-            recipient_wallet = self._get_wallet(recipient_id)
-            if not recipient_wallet:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Recipient wallet not found"
-                )
             wallet.balance -= amount
-            recipient_wallet.balance += amount
+            credit_wallet(self.db, recipient_wallet, amount)
 
     def _send_notifications(self, transaction: Transaction, is_suspicious: bool) -> None:
-        """Send notifications for the transaction"""
+        """Queue a fraud alert for the transaction, digested per user"""
         if is_suspicious:
-            send_email_alert(
-                to_email=transaction.user.email,
-                subject="Suspicious Transaction Alert",
-                body=f"A transaction of {transaction.amount} {transaction.currency} "
-                     f"has been flagged as suspicious. Reason: {transaction.flag_reason}"
-            ) 
\ No newline at end of file
+            alerts.add(
+                transaction.user.email,
+                transaction.flag_reason,
+                f"{transaction.amount} {transaction.currency}"
+            )
+
+    def _send_batch_notifications(self, user_id: int, flagged: list) -> None:
+        """Queue notifications for the flagged items of a batch"""
+        if not flagged:
+            return
+        user = self.db.query(User).filter(User.id == user_id).first()
+        if not user:
+            return
+        for row in flagged:
+            alerts.add(user.email, row["flag_reason"], f"{row['amount']} {row['currency']}")
+        # One digest for the whole batch
+        alerts.flush([user.email])
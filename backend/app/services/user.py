@@ -1,7 +1,9 @@
 from typing import Optional, List
 from sqlalchemy.orm import Session
 from app.core.models import User
+from app.core.security import invalidate_principal
 from app.schemas.user import UserCreate, UserUpdate
+from app.services.auth import AuthService
 
 class UserService:
     @staticmethod
@@ -42,6 +44,7 @@ class UserService:
             setattr(db_obj, field, update_data[field])
         db.add(db_obj)
         db.commit()
+        invalidate_principal(db_obj.id)
         db.refresh(db_obj)
         return db_obj
 
@@ -50,4 +53,5 @@ class UserService:
         obj = db.query(User).get(id)
         db.delete(obj)
         db.commit()
+        invalidate_principal(id)
         return obj 
\ No newline at end of file
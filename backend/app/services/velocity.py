@@ -0,0 +1,123 @@
+from collections import deque
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Optional
+from sqlalchemy.orm import Session
+from app.models.transaction import Transaction, TransactionStatus
+from app.config import RAPID_TRANSACTION_WINDOW
+
+
+class VelocityStore:
+    """
+    In-memory per-user velocity counters used by fraud checks.
+
+    Keeps a sliding window of recent transaction timestamps and a running
+    total for the current UTC day, so checks never have to query the ledger.
+    Counters are per process and are rebuilt from the database on cold start,
+    so they are only consulted when FRAUD_FEATURE_SOURCE=memory is set for a
+    single worker process. Users that went idle are evicted about once per
+    window, so the maps only hold users active in the window or today.
+    """
+
+    def __init__(self, window_seconds: int = RAPID_TRANSACTION_WINDOW):
+        self.window = timedelta(seconds=window_seconds)
+        self._recent: dict[int, deque] = {}
+        self._daily: dict[int, tuple] = {}
+        self._lock = Lock()
+        self._loaded = False
+        self._evicted_at = datetime.min
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded
+
+    def record(self, user_id: int, amount: float, created_at: Optional[datetime] = None) -> None:
+        """Register a committed transaction for the user"""
+        created_at = created_at or datetime.utcnow()
+        with self._lock:
+            self._record(user_id, amount, created_at)
+
+    def recent_count(self, user_id: int, now: Optional[datetime] = None) -> int:
+        """Number of transactions within the rapid transaction window"""
+        now = now or datetime.utcnow()
+        with self._lock:
+            timestamps = self._recent.get(user_id)
+            if not timestamps:
+                return 0
+            self._prune(timestamps, now)
+            return len(timestamps)
+
+    def daily_total(self, user_id: int, now: Optional[datetime] = None) -> float:
+        """Total transaction amount for the current UTC day"""
+        today = (now or datetime.utcnow()).date()
+        with self._lock:
+            day, total = self._daily.get(user_id, (today, 0.0))
+            return total if day == today else 0.0
+
+    def ensure_loaded(self, db: Session) -> None:
+        """Rebuild from the database once per process"""
+        if not self._loaded:
+            self.rebuild(db)
+
+    def rebuild(self, db: Session, now: Optional[datetime] = None) -> None:
+        """Reload counters from today's and the current window's completed transactions"""
+        now = now or datetime.utcnow()
+        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        since = min(today_start, now - self.window)
+        rows = db.query(
+            Transaction.user_id, Transaction.amount, Transaction.created_at
+        ).filter(
+            Transaction.created_at >= since,
+            Transaction.status == TransactionStatus.COMPLETED
+        ).order_by(Transaction.created_at).all()
+
+        with self._lock:
+            self._recent.clear()
+            self._daily.clear()
+            for user_id, amount, created_at in rows:
+                self._record(user_id, amount, created_at, now)
+            self._loaded = True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._recent.clear()
+            self._daily.clear()
+            self._loaded = False
+            self._evicted_at = datetime.min
+
+    def _record(self, user_id: int, amount: float, created_at: datetime, now: Optional[datetime] = None) -> None:
+        now = now or created_at
+        if created_at >= now - self.window:
+            timestamps = self._recent.setdefault(user_id, deque())
+            timestamps.append(created_at)
+            self._prune(timestamps, now)
+
+        today = now.date()
+        if created_at.date() == today:
+            day, total = self._daily.get(user_id, (today, 0.0))
+            if day != today:
+                total = 0.0
+            self._daily[user_id] = (today, total + (amount or 0.0))
+
+        if now - self._evicted_at >= self.window:
+            self._evict_idle(now)
+
+    def _evict_idle(self, now: datetime) -> None:
+        """Drop users with no transaction in the window, and daily totals of past days"""
+        for user_id in list(self._recent):
+            timestamps = self._recent[user_id]
+            self._prune(timestamps, now)
+            if not timestamps:
+                del self._recent[user_id]
+        today = now.date()
+        for user_id in [uid for uid, (day, _) in self._daily.items() if day != today]:
+            del self._daily[user_id]
+        self._evicted_at = now
+
+    def _prune(self, timestamps: deque, now: datetime) -> None:
+        window_start = now - self.window
+        while timestamps and timestamps[0] < window_start:
+            timestamps.popleft()
+
+
+velocity_store = VelocityStore()
@@ -1,46 +1,231 @@
+import multiprocessing
+import time
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+from sqlalchemy import create_engine, select, update
 from sqlalchemy.orm import Session
-from app.models.transaction import Transaction, TransactionStatus
+from sqlalchemy.pool import NullPool
+from app.models.transaction import Transaction, TransactionStatus, TransactionType
+from app.models.user import User
+from app.models import wallet  # noqa: F401  register models in spawned workers
+from app.core.engine import is_memory_database
 from app.services.fraud_detection import FraudDetectionService
-from app.utils.email import send_email_alert
+from app.utils.alerts import alerts
+from app.config import RAPID_TRANSACTION_WINDOW, FRAUD_SCAN_WORKERS
 
-def run_daily_fraud_scan(db: Session):
+HIGH_RISK_THRESHOLD = 0.7
+
+class ScanWindow(NamedTuple):
+    """Column arrays of the completed transactions in the scan window"""
+    ids: list
+    user_ids: list
+    amounts: list
+    currencies: list
+    types: list
+    recipient_ids: list
+    created_ats: list
+    is_flagged: list
+
+class ShardResult(NamedTuple):
+    """Outcome of scoring one time slice of the window"""
+    shard: int
+    scanned: int
+    # (transaction id, user id, amount, currency, fraud score)
+    flags: list
+    seconds: float
+
+def run_daily_fraud_scan(
+    db: Session, workers: int = FRAUD_SCAN_WORKERS, shards: Optional[int] = None, write_db: Optional[Session] = None
+):
     """
-    Run daily fraud scan on all transactions from the last 24 hours
+    Run daily fraud scan on all transactions from the last 24 hours.
+
+    The window is split into shards of consecutive time slices, so each shard
+    reads a disjoint created_at range off its index. Rapid-window counts only
+    look back, so a shard also loads one rapid window before its slice. With
+    more than one worker the shards are scored in a process pool, each worker
+    on its own engine; the parent merges the flags and writes them back with
+    one bulk UPDATE. The scan reads on db, which may be a read-only session;
+    the UPDATE is committed in one short transaction on write_db (default db).
     """
-    # Get transactions from last 24 hours
-    yesterday = datetime.utcnow() - timedelta(days=1)
-    transactions = db.query(Transaction).filter(
-        Transaction.created_at >= yesterday,
-        Transaction.status == TransactionStatus.COMPLETED,
-        Transaction.is_flagged == False
-    ).all()
-
-    fraud_service = FraudDetectionService(db)
-    flagged_transactions = []
-
-    for transaction in transactions:
-        # Recalculate fraud score
-        fraud_score = fraud_service.calculate_fraud_score(transaction)
-        
-        if fraud_score > 0.7:  # High risk threshold
-            transaction.is_flagged = True
-            transaction.fraud_score = fraud_score
-            transaction.flag_reason = f"High fraud score detected: {fraud_score}"
-            flagged_transactions.append(transaction)
-            
-            # Send email alert
-            send_email_alert(
-                to_email=transaction.user.email,
-                subject="Suspicious Transaction Alert",
-                body=f"A transaction of {transaction.amount} {transaction.currency} has been flagged as suspicious."
-            )
+    write_db = write_db or db
+    now = datetime.utcnow()
+    yesterday = now - timedelta(days=1)
+    shards = max(1, shards or workers)
+    slices = _time_slices(yesterday, now, shards)
+    flagged_recipients = _flagged_recipients(db, yesterday)
+
+    database_url = db.get_bind().url
+    if workers > 1 and shards > 1 and not is_memory_database(database_url):
+        url = database_url.render_as_string(hide_password=False)
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(workers, shards), mp_context=context) as pool:
+            results = list(pool.map(
+                _scan_shard_worker,
+                [url] * shards,
+                range(shards),
+                *zip(*slices),
+                [flagged_recipients] * shards,
+                [HIGH_RISK_THRESHOLD] * shards,
+            ))
+    else:
+        results = [
+            _scan_shard(db, shard, since, until, flagged_recipients, HIGH_RISK_THRESHOLD)
+            for shard, (since, until) in enumerate(slices)
+        ]
+
+    flags = [flag for result in results for flag in result.flags]
+    if flags:
+        write_db.execute(update(Transaction), [
+            {
+                "id": transaction_id,
+                "is_flagged": True,
+                "fraud_score": fraud_score,
+                "flag_reason": f"High fraud score detected: {fraud_score}",
+            }
+            for transaction_id, _, _, _, fraud_score in flags
+        ])
 
     # Commit changes
-    db.commit()
+    write_db.commit()
+
+    _send_alerts(db, flags)
 
     return {
-        "scanned_transactions": len(transactions),
-        "flagged_transactions": len(flagged_transactions),
-        "scan_time": datetime.utcnow()
-    } 
\ No newline at end of file
+        "scanned_transactions": sum(result.scanned for result in results),
+        "flagged_transactions": len(flags),
+        "scan_time": datetime.utcnow(),
+        "shards": [
+            {
+                "shard": result.shard,
+                "scanned_transactions": result.scanned,
+                "flagged_transactions": len(result.flags),
+                "seconds": round(result.seconds, 3),
+            }
+            for result in results
+        ]
+    }
+
+def _time_slices(since: datetime, now: datetime, shards: int) -> list:
+    """Split [since, now) into consecutive (since, until) slices; the last one is open-ended"""
+    width = (now - since) / shards
+    bounds = [since + width * i for i in range(shards)] + [None]
+    return list(zip(bounds, bounds[1:]))
+
+def _scan_shard_worker(
+    url: str, shard: int, since: datetime, until: Optional[datetime], flagged_recipients: set, threshold: float
+) -> ShardResult:
+    """Process pool entry point: score one shard on a dedicated engine"""
+    engine = create_engine(url, poolclass=NullPool)
+    try:
+        with Session(engine) as db:
+            return _scan_shard(db, shard, since, until, flagged_recipients, threshold)
+    finally:
+        engine.dispose()
+
+def _scan_shard(
+    db: Session,
+    shard: int,
+    since: datetime,
+    until: Optional[datetime],
+    flagged_recipients: set,
+    threshold: float
+) -> ShardResult:
+    """Score the unflagged transactions created in [since, until); until=None is open-ended"""
+    start = time.perf_counter()
+    window = timedelta(seconds=RAPID_TRANSACTION_WINDOW)
+
+    # Completed transactions of the slice plus one rapid window of history
+    columns = _load_window(db, since - window, until)
+    candidates = [
+        i for i, created_at in enumerate(columns.created_ats)
+        if created_at >= since and not columns.is_flagged[i]
+    ]
+    rapid_counts = _rapid_counts(columns, candidates, window)
+    flags = [
+        (columns.ids[i], columns.user_ids[i], columns.amounts[i], columns.currencies[i], fraud_score)
+        for i, fraud_score in _score(columns, candidates, rapid_counts, flagged_recipients, threshold)
+    ]
+    return ShardResult(shard, len(candidates), flags, time.perf_counter() - start)
+
+def _load_window(db: Session, since: datetime, until: Optional[datetime] = None) -> ScanWindow:
+    """Load the completed transactions created in [since, until) as column arrays"""
+    query = select(
+        Transaction.id,
+        Transaction.user_id,
+        Transaction.amount,
+        Transaction.currency,
+        Transaction.transaction_type,
+        Transaction.recipient_id,
+        Transaction.created_at,
+        Transaction.is_flagged
+    ).where(
+        Transaction.created_at >= since,
+        Transaction.status == TransactionStatus.COMPLETED
+    )
+    if until is not None:
+        query = query.where(Transaction.created_at < until)
+    rows = db.execute(query).all()
+    if not rows:
+        return ScanWindow(*([] for _ in ScanWindow._fields))
+    return ScanWindow(*map(list, zip(*rows)))
+
+def _rapid_counts(columns: ScanWindow, candidates: list, window: timedelta) -> list:
+    """Count each candidate's completed transactions in the window ending at its own time"""
+    times_by_user = defaultdict(list)
+    for user_id, created_at in zip(columns.user_ids, columns.created_ats):
+        times_by_user[user_id].append(created_at)
+    for times in times_by_user.values():
+        times.sort()
+
+    counts = []
+    for i in candidates:
+        times = times_by_user[columns.user_ids[i]]
+        created_at = columns.created_ats[i]
+        counts.append(bisect_right(times, created_at) - bisect_left(times, created_at - window))
+    return counts
+
+def _flagged_recipients(db: Session, since: datetime) -> set:
+    """Recipients of the window's transfers that appear in any flagged transaction"""
+    window_recipients = select(Transaction.recipient_id).where(
+        Transaction.created_at >= since,
+        Transaction.transaction_type == TransactionType.TRANSFER
+    )
+    return set(db.scalars(
+        select(Transaction.recipient_id).where(
+            Transaction.is_flagged == True,
+            Transaction.recipient_id.in_(window_recipients)
+        ).distinct()
+    ))
+
+def _score(
+    columns: ScanWindow, candidates: list, rapid_counts: list, flagged_recipients: set, threshold: float
+) -> list:
+    """Return (index, score) for every candidate above the threshold"""
+    flagged = []
+    for i, recent_count in zip(candidates, rapid_counts):
+        fraud_score = FraudDetectionService.score(
+            columns.amounts[i],
+            columns.types[i],
+            recent_count,
+            columns.recipient_ids[i] in flagged_recipients
+        )
+        if fraud_score > threshold:  # High risk threshold
+            flagged.append((i, fraud_score))
+    return flagged
+
+def _send_alerts(db: Session, flags: list) -> None:
+    if not flags:
+        return
+    user_ids = {user_id for _, user_id, _, _, _ in flags}
+    emails = dict(db.execute(
+        select(User.id, User.email).where(User.id.in_(user_ids))
+    ).all())
+
+    for _, user_id, amount, currency, _ in flags:
+        alerts.add(emails.get(user_id), "High fraud score detected", f"{amount} {currency}")
+    # One digest per user for the whole scan
+    alerts.flush(emails.values())
@@ -1,39 +1,59 @@
-from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
+from datetime import date, datetime, timedelta
+from typing import Optional
+from sqlalchemy.orm import Session, selectinload
 from sqlalchemy import func
 from app.models.transaction import Transaction, TransactionStatus
 from app.models.wallet import Wallet
 from app.models.user import User
-from app.utils.email import send_email_alert
+from app.core.models import TransactionType
+from app.config import REPORT_FLAGGED_LIMIT
+from app.utils.notifications import notifications
+from app.tasks.rollups import aggregate_range, backfill_rollups, day_bounds, save_rollup, summarize_rollups
 import logging
 
 logger = logging.getLogger(__name__)
 
+TYPE_KEYS = {
+    TransactionType.DEPOSIT: "deposit",
+    TransactionType.WITHDRAWAL: "withdrawal",
+    TransactionType.TRANSFER: "transfer",
+}
+
 class ReportingService:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, write_db: Optional[Session] = None):
+        # Reports read on db, which may be a read-only session; rollup rows are
+        # written in short transactions on write_db (default db)
         self.db = db
+        self.write_db = write_db or db
 
     def generate_daily_report(self) -> dict:
-        """Generate daily transaction report"""
+        """Generate daily transaction report and persist the day's rollup"""
         yesterday = datetime.utcnow() - timedelta(days=1)
         yesterday_start = yesterday.replace(hour=0, minute=0, second=0, microsecond=0)
         yesterday_end = yesterday.replace(hour=23, minute=59, second=59, microsecond=999999)
 
+        # Aggregate the day once, grouped by type and currency, and keep it
+        # for the weekly and monthly reports
+        totals = self._get_type_currency_totals(*day_bounds(yesterday.date()))
+        save_rollup(self.write_db, yesterday.date(), totals)
+
         # Get transaction statistics
-        transaction_stats = self._get_transaction_stats(yesterday_start, yesterday_end)
+        transaction_stats = self._get_transaction_stats(totals)
         
         # Get flagged transactions
+        flagged_count = sum(row.flagged_count for row in totals)
         flagged_transactions = self._get_flagged_transactions(yesterday_start, yesterday_end)
         
         # Get top users by transaction volume
         top_users = self._get_top_users(yesterday_start, yesterday_end)
         
         # Get currency distribution
-        currency_stats = self._get_currency_stats(yesterday_start, yesterday_end)
+        currency_stats = self._get_currency_stats(totals)
 
         report = {
             "date": yesterday.date().isoformat(),
             "transaction_stats": transaction_stats,
+            "flagged_count": flagged_count,
             "flagged_transactions": flagged_transactions,
             "top_users": top_users,
             "currency_stats": currency_stats
@@ -44,62 +64,99 @@ class ReportingService:
 
         return report
 
-    def _get_transaction_stats(self, start_date: datetime, end_date: datetime) -> dict:
-        """Get transaction statistics for the period"""
-        transactions = self.db.query(Transaction).filter(
-            Transaction.created_at.between(start_date, end_date)
-        ).all()
+    def generate_weekly_report(self) -> dict:
+        """Generate the report for the 7 days ending yesterday from daily rollups"""
+        end = datetime.utcnow().date() - timedelta(days=1)
+        return self.generate_period_report("Weekly", end - timedelta(days=6), end)
+
+    def generate_monthly_report(self) -> dict:
+        """Generate the report for the calendar month containing yesterday from daily rollups"""
+        end = datetime.utcnow().date() - timedelta(days=1)
+        return self.generate_period_report("Monthly", end.replace(day=1), end)
+
+    def generate_period_report(self, title: str, start: date, end: date) -> dict:
+        """
+        Build a report for start..end inclusive by summing daily rollup rows,
+        so the cost grows with the number of days, not transactions. Days
+        without rollups are rolled up first.
+        """
+        backfilled = backfill_rollups(self.db, start, end, only_missing=True, write_db=self.write_db)
+        totals = summarize_rollups(self.db, start, end)
+        amounts = [row for row in totals if row.txn_count]
+
+        report = {
+            "title": title,
+            "start_date": start.isoformat(),
+            "end_date": end.isoformat(),
+            "days": (end - start).days + 1,
+            "backfilled_days": backfilled,
+            "transaction_stats": self._get_transaction_stats(totals),
+            "min_amount": min((row.min_amount for row in amounts), default=None),
+            "max_amount": max((row.max_amount for row in amounts), default=None),
+            "flagged_count": sum(row.flagged_count for row in totals),
+            "currency_stats": self._get_currency_stats(totals)
+        }
+
+        self._send_period_report(report)
+        return report
+
+    def _get_type_currency_totals(self, start_date: datetime, end_date: datetime) -> list:
+        """Count, sum, min/max and count flagged for [start_date, end_date) per (transaction_type, currency)"""
+        return aggregate_range(self.db, start_date, end_date)
 
-        total_amount = sum(t.amount for t in transactions)
-        total_count = len(transactions)
+    def _get_transaction_stats(self, totals: list) -> dict:
+        """Get transaction statistics for the period"""
+        total_count = sum(row.txn_count for row in totals)
+        total_amount = sum(row.total_amount for row in totals)
         avg_amount = total_amount / total_count if total_count > 0 else 0
 
+        type_counts = {"deposit": 0, "withdrawal": 0, "transfer": 0}
+        for row in totals:
+            key = TYPE_KEYS.get(row.transaction_type)
+            if key:
+                type_counts[key] += row.txn_count
+
         return {
             "total_transactions": total_count,
             "total_amount": total_amount,
             "average_amount": avg_amount,
-            "transaction_types": {
-                "deposit": len([t for t in transactions if t.transaction_type == "DEPOSIT"]),
-                "withdrawal": len([t for t in transactions if t.transaction_type == "WITHDRAWAL"]),
-                "transfer": len([t for t in transactions if t.transaction_type == "TRANSFER"])
-            }
+            "transaction_types": type_counts
         }
 
     def _get_flagged_transactions(self, start_date: datetime, end_date: datetime) -> list:
-        """Get flagged transactions for the period"""
-        return self.db.query(Transaction).filter(
+        """Get the most recent flagged transactions for the period, capped at REPORT_FLAGGED_LIMIT"""
+        rows = self.db.query(
+            Transaction.id,
+            Transaction.user_id,
+            Transaction.amount,
+            Transaction.currency,
+            Transaction.flag_reason,
+            Transaction.created_at
+        ).filter(
             Transaction.created_at.between(start_date, end_date),
             Transaction.is_flagged == True
-        ).all()
+        ).order_by(Transaction.created_at.desc()).limit(REPORT_FLAGGED_LIMIT).all()
+        return [row._asdict() for row in rows]
 
     def _get_top_users(self, start_date: datetime, end_date: datetime, limit: int = 10) -> list:
         """Get top users by transaction volume"""
+        # Wallets (for the currency) load in one query rather than one per user
         return self.db.query(
             User,
             func.sum(Transaction.amount).label('total_volume')
-        ).join(Transaction).filter(
+        ).options(selectinload(User.wallet)).join(Transaction, Transaction.user_id == User.id).filter(
             Transaction.created_at.between(start_date, end_date)
         ).group_by(User.id).order_by(
             func.sum(Transaction.amount).desc()
         ).limit(limit).all()
 
-    def _get_currency_stats(self, start_date: datetime, end_date: datetime) -> dict:
+    def _get_currency_stats(self, totals: list) -> dict:
         """Get currency distribution statistics"""
         currency_stats = {}
-        transactions = self.db.query(Transaction).filter(
-            Transaction.created_at.between(start_date, end_date)
-        ).all()
-
-        for transaction in transactions:
-            currency = transaction.currency
-            if currency not in currency_stats:
-                currency_stats[currency] = {
-                    "count": 0,
-                    "total_amount": 0
-                }
-            currency_stats[currency]["count"] += 1
-            currency_stats[currency]["total_amount"] += transaction.amount
-
+        for row in totals:
+            stats = currency_stats.setdefault(row.currency, {"count": 0, "total_amount": 0})
+            stats["count"] += row.txn_count
+            stats["total_amount"] += row.total_amount
         return currency_stats
 
     def _send_admin_report(self, report: dict) -> None:
@@ -111,7 +168,7 @@ class ReportingService:
             # Get admin email
             admin = self.db.query(User).filter(User.is_admin == True).first()
             if admin:
-                send_email_alert(
+                notifications.enqueue(
                     to_email=admin.email,
                     subject=f"Daily Transaction Report - {report['date']}",
                     body=email_body
@@ -119,6 +176,41 @@ class ReportingService:
         except Exception as e:
             logger.error(f"Failed to send admin report: {str(e)}")
 
+    def _send_period_report(self, report: dict) -> None:
+        """Send a weekly or monthly report to admin"""
+        try:
+            admin = self.db.query(User).filter(User.is_admin == True).first()
+            if admin:
+                notifications.enqueue(
+                    to_email=admin.email,
+                    subject=f"{report['title']} Transaction Report - {report['start_date']} to {report['end_date']}",
+                    body=self._format_period_email(report)
+                )
+        except Exception as e:
+            logger.error(f"Failed to send {report['title'].lower()} report: {str(e)}")
+
+    def _format_period_email(self, report: dict) -> str:
+        """Format a weekly or monthly report for email"""
+        return f"""
+{report['title']} Transaction Report - {report['start_date']} to {report['end_date']}
+
+Transaction Statistics:
+- Total Transactions: {report['transaction_stats']['total_transactions']}
+- Total Amount: {report['transaction_stats']['total_amount']}
+- Average Amount: {report['transaction_stats']['average_amount']}
+- Smallest / Largest: {report['min_amount']} / {report['max_amount']}
+
+Transaction Types:
+- Deposits: {report['transaction_stats']['transaction_types']['deposit']}
+- Withdrawals: {report['transaction_stats']['transaction_types']['withdrawal']}
+- Transfers: {report['transaction_stats']['transaction_types']['transfer']}
+
+Flagged Transactions: {report['flagged_count']}
+
+Currency Distribution:
+{self._format_currency_stats(report['currency_stats'])}
+"""
+
     def _format_report_email(self, report: dict) -> str:
         """Format report data for email"""
         return f"""
@@ -134,7 +226,7 @@ Transaction Types:
 - Withdrawals: {report['transaction_stats']['transaction_types']['withdrawal']}
 - Transfers: {report['transaction_stats']['transaction_types']['transfer']}
 
-Flagged Transactions: {len(report['flagged_transactions'])}
+Flagged Transactions: {report['flagged_count']}
 
 Top Users by Volume:
 {self._format_top_users(report['top_users'])}
@@ -0,0 +1,135 @@
+"""
+Daily transaction rollups and the reports summed from them.
+
+Backfill historical days with:
+
+    python -m app.tasks.rollups --start 2026-01-01 --end 2026-09-30
+"""
+import argparse
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, List, Optional
+from sqlalchemy import case, delete, func, insert, select
+from sqlalchemy.orm import Session
+from app.models.rollup import DailyTransactionRollup
+from app.models.transaction import Transaction
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def day_bounds(day: date) -> tuple:
+    """Half-open [start, end) datetime range of a day"""
+    start = datetime.combine(day, time.min)
+    return start, start + timedelta(days=1)
+
+
+def aggregate_range(db: Session, start: datetime, end: datetime) -> list:
+    """Count, sum, min, max and count flagged per (transaction_type, currency) for [start, end)"""
+    return db.query(
+        Transaction.transaction_type,
+        Transaction.currency,
+        func.count(Transaction.id).label("txn_count"),
+        func.coalesce(func.sum(Transaction.amount), 0).label("total_amount"),
+        func.min(Transaction.amount).label("min_amount"),
+        func.max(Transaction.amount).label("max_amount"),
+        func.count(case((Transaction.is_flagged == True, 1))).label("flagged_count")
+    ).filter(
+        Transaction.created_at >= start,
+        Transaction.created_at < end
+    ).group_by(Transaction.transaction_type, Transaction.currency).all()
+
+
+def aggregate_day(db: Session, day: date) -> list:
+    return aggregate_range(db, *day_bounds(day))
+
+
+def save_rollup(db: Session, day: date, totals: Iterable) -> int:
+    """Replace the rollup rows of a day with the given aggregates and commit"""
+    now = datetime.utcnow()
+    rows = [
+        {
+            "day": day,
+            "currency": row.currency,
+            "transaction_type": row.transaction_type,
+            "txn_count": row.txn_count,
+            "total_amount": row.total_amount,
+            "min_amount": row.min_amount,
+            "max_amount": row.max_amount,
+            "flagged_count": row.flagged_count,
+            "updated_at": now,
+        }
+        for row in totals
+    ]
+    db.execute(delete(DailyTransactionRollup).where(DailyTransactionRollup.day == day))
+    if rows:
+        db.execute(insert(DailyTransactionRollup), rows)
+    db.commit()
+    return len(rows)
+
+
+def rollup_day(db: Session, day: date, write_db: Optional[Session] = None) -> int:
+    """Aggregate one day of transactions on db into daily_transaction_rollups on write_db (default db)"""
+    return save_rollup(write_db or db, day, aggregate_day(db, day))
+
+
+def backfill_rollups(
+    db: Session, start: date, end: date, only_missing: bool = False, write_db: Optional[Session] = None
+) -> int:
+    """
+    Roll up every day from start to end inclusive, one indexed range scan and
+    one commit per day. With only_missing, days that already have rows are skipped.
+    Reads go to db; with write_db, each day's rows are written in a short
+    transaction of their own there. Returns the number of days rolled up.
+    """
+    existing = set()
+    if only_missing:
+        existing = set(db.scalars(
+            select(DailyTransactionRollup.day).where(
+                DailyTransactionRollup.day.between(start, end)
+            ).distinct()
+        ))
+    days = 0
+    day = start
+    while day <= end:
+        if day not in existing:
+            rollup_day(db, day, write_db)
+            days += 1
+        day += timedelta(days=1)
+    return days
+
+
+def summarize_rollups(db: Session, start: date, end: date) -> List:
+    """Sum the rollup rows of start..end inclusive per (transaction_type, currency)"""
+    return db.query(
+        DailyTransactionRollup.transaction_type,
+        DailyTransactionRollup.currency,
+        func.sum(DailyTransactionRollup.txn_count).label("txn_count"),
+        func.sum(DailyTransactionRollup.total_amount).label("total_amount"),
+        func.min(DailyTransactionRollup.min_amount).label("min_amount"),
+        func.max(DailyTransactionRollup.max_amount).label("max_amount"),
+        func.sum(DailyTransactionRollup.flagged_count).label("flagged_count")
+    ).filter(
+        DailyTransactionRollup.day.between(start, end)
+    ).group_by(DailyTransactionRollup.transaction_type, DailyTransactionRollup.currency).all()
+
+
+def main():
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Backfill daily transaction rollups")
+    parser.add_argument("--start", type=date.fromisoformat, required=True, help="first day, YYYY-MM-DD")
+    parser.add_argument("--end", type=date.fromisoformat,
+                        default=datetime.utcnow().date() - timedelta(days=1), help="last day, default yesterday")
+    parser.add_argument("--only-missing", action="store_true", help="skip days that already have rollups")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        days = backfill_rollups(db, args.start, args.end, only_missing=args.only_missing)
+        print(f"Rolled up {days} days from {args.start} to {args.end}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import time
+from collections import Counter
+from threading import Condition, Thread
+from typing import Callable, Iterable, Optional
+from app.utils.notifications import notifications
+from app.config import ALERT_DIGEST_WINDOW, ALERT_DIGEST_MAX_ITEMS
+
+
+class _Digest:
+    __slots__ = ("deadline", "reasons", "details")
+
+    def __init__(self, deadline: float):
+        self.deadline = deadline
+        self.reasons: Counter = Counter()
+        self.details: list = []
+
+
+class AlertDigester:
+    """
+    Coalesce fraud alerts into one digest email per recipient per window.
+
+    The first alert for a recipient opens a digest that is sent when the
+    window closes; alerts arriving meanwhile are folded into it and repeated
+    reasons are counted rather than repeated. Batch jobs call flush() to send
+    their digests straight away. A window of 0 sends every alert on its own.
+    """
+
+    def __init__(
+        self,
+        window: float = ALERT_DIGEST_WINDOW,
+        max_items: int = ALERT_DIGEST_MAX_ITEMS,
+        send: Optional[Callable[..., bool]] = None,
+    ):
+        self.window = window
+        self.max_items = max_items
+        self.send = send
+        self._digests: dict = {}
+        self._condition = Condition()
+        self._thread: Optional[Thread] = None
+
+    def add(self, to_email: Optional[str], reason: str, detail: str) -> None:
+        """Record an alert about `detail` (e.g. "120.0 USD") flagged for `reason`"""
+        if not to_email:
+            return
+        with self._condition:
+            digest = self._digests.get(to_email)
+            if digest is None:
+                digest = self._digests[to_email] = _Digest(time.monotonic() + self.window)
+            digest.reasons[reason or "Suspicious activity"] += 1
+            digest.details.append(detail)
+            self._ensure_flusher()
+            self._condition.notify()
+        if self.window <= 0:
+            self.flush([to_email])
+
+    def flush(self, to_emails: Optional[Iterable[str]] = None) -> int:
+        """Send pending digests now, for the given recipients or for everyone"""
+        with self._condition:
+            emails = list(self._digests) if to_emails is None else list(to_emails)
+            due = [(email, self._digests.pop(email)) for email in emails if email in self._digests]
+        for email, digest in due:
+            self._send(email, digest)
+        return len(due)
+
+    def stop(self) -> None:
+        """Send everything pending and stop the flusher"""
+        with self._condition:
+            thread, self._thread = self._thread, None
+            self._condition.notify()
+        if thread is not None:
+            thread.join()
+        self.flush()
+
+    @property
+    def pending(self) -> int:
+        return len(self._digests)
+
+    def _ensure_flusher(self) -> None:
+        if self._thread is None and self.window > 0:
+            self._thread = Thread(target=self._run, name="alert-digests", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        current = self._thread
+        while True:
+            with self._condition:
+                while self._thread is current:
+                    now = time.monotonic()
+                    # Digests share one window, so the oldest is always due first
+                    oldest = next(iter(self._digests.values()), None)
+                    if oldest is not None and oldest.deadline <= now:
+                        break
+                    self._condition.wait(None if oldest is None else oldest.deadline - now)
+                if self._thread is not current:
+                    return
+                now = time.monotonic()
+                due = [email for email, digest in self._digests.items() if digest.deadline <= now]
+            self.flush(due)
+
+    def _send(self, to_email: str, digest: _Digest) -> None:
+        send = self.send or notifications.enqueue
+        count = len(digest.details)
+        if count == 1:
+            reason = next(iter(digest.reasons))
+            send(
+                to_email=to_email,
+                subject="Suspicious Transaction Alert",
+                body=f"A transaction of {digest.details[0]} has been flagged as suspicious. Reason: {reason}"
+            )
+            return
+
+        lines = [f"{count} transactions on your account have been flagged as suspicious.", "", "Reasons:"]
+        lines += [f"- {reason} ({times}x)" for reason, times in digest.reasons.most_common()]
+        lines += ["", "Transactions:"]
+        lines += [f"- {detail}" for detail in digest.details[:self.max_items]]
+        if count > self.max_items:
+            lines.append(f"... and {count - self.max_items} more")
+        send(
+            to_email=to_email,
+            subject=f"Suspicious Activity Alert: {count} transactions flagged",
+            body="\n".join(lines)
+        )
+
+
+alerts = AlertDigester()
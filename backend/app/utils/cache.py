@@ -0,0 +1,115 @@
+import time
+from collections import OrderedDict, defaultdict
+from itertools import chain
+from threading import Lock
+from typing import Any, Callable, Hashable
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Thread-safe in-process cache with per-entry expiry and LRU eviction.
+    Entries are local to the worker process; other workers rely on the TTL.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_set(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            self.set(key, value)
+        return value
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        return {"size": len(self), "hits": self.hits, "misses": self.misses, "hit_rate": self.hit_rate}
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_commit_watchers: dict = defaultdict(list)
+
+
+def on_model_commit(model: type, callback: Callable[[], None]) -> None:
+    """
+    Call callback after any session commits inserts, updates or deletes of model,
+    including bulk statements executed through the session.
+    """
+    if not _commit_watchers:
+        event.listen(Session, "after_flush", _track_flush)
+        event.listen(Session, "do_orm_execute", _track_orm_execute)
+        event.listen(Session, "after_commit", _run_watchers)
+        event.listen(Session, "after_rollback", _reset_tracking)
+    _commit_watchers[model].append(callback)
+
+
+def _mark_changed(session: Session, model: type) -> None:
+    session.info.setdefault("changed_models", set()).add(model)
+
+
+def _track_flush(session: Session, flush_context) -> None:
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if type(obj) in _commit_watchers:
+            _mark_changed(session, type(obj))
+
+
+def _track_orm_execute(orm_execute_state) -> None:
+    state = orm_execute_state
+    if not (state.is_insert or state.is_update or state.is_delete):
+        return
+    mapper = state.bind_mapper
+    if mapper is not None and mapper.class_ in _commit_watchers:
+        _mark_changed(state.session, mapper.class_)
+
+
+def _run_watchers(session: Session) -> None:
+    for model in session.info.pop("changed_models", ()):
+        for callback in _commit_watchers[model]:
+            callback()
+
+
+def _reset_tracking(session: Session) -> None:
+    session.info.pop("changed_models", None)
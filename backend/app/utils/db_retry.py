@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import random
+import time
+from threading import Lock
+from typing import Awaitable, Callable, Optional, TypeVar
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.config import (
+    TRANSACTION_RETRY_ATTEMPTS,
+    TRANSACTION_RETRY_BACKOFF,
+    TRANSACTION_RETRY_MAX_BACKOFF,
+    WALLET_LOCK_WAIT_WARN,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# SQLSTATEs that mean "run the whole transaction again"
+RETRYABLE_SQLSTATES = {
+    "40001",  # serialization_failure
+    "40P01",  # deadlock_detected
+}
+# Driver messages for the same conditions where no SQLSTATE is exposed
+RETRYABLE_MESSAGES = (
+    "deadlock detected",
+    "could not serialize access",
+    "database is locked",
+    "database table is locked",
+)
+
+
+class ContentionStats:
+    """Lock wait and retry counters for wallet transactions"""
+
+    def __init__(self):
+        self.lock_waits = 0
+        self.lock_wait_seconds_total = 0.0
+        self.lock_wait_seconds_max = 0.0
+        self.retries = 0
+        self.exhausted = 0
+        self._lock = Lock()
+
+    def record_lock_wait(self, seconds: float, what: str) -> None:
+        with self._lock:
+            self.lock_waits += 1
+            self.lock_wait_seconds_total += seconds
+            self.lock_wait_seconds_max = max(self.lock_wait_seconds_max, seconds)
+        if seconds > WALLET_LOCK_WAIT_WARN:
+            logger.warning(f"Waited {seconds:.3f}s for locks on {what}")
+
+    def record_retry(self) -> None:
+        with self._lock:
+            self.retries += 1
+
+    def record_exhausted(self) -> None:
+        with self._lock:
+            self.exhausted += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "lock_waits": self.lock_waits,
+                "lock_wait_seconds_total": round(self.lock_wait_seconds_total, 6),
+                "lock_wait_seconds_max": round(self.lock_wait_seconds_max, 6),
+                "retries": self.retries,
+                "retries_exhausted": self.exhausted,
+            }
+
+
+contention = ContentionStats()
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """Whether a database error is a deadlock or serialization failure worth retrying"""
+    if not isinstance(error, DBAPIError):
+        return False
+    orig = error.orig
+    sqlstate = getattr(orig, "sqlstate", None) or getattr(orig, "pgcode", None)
+    if sqlstate in RETRYABLE_SQLSTATES:
+        return True
+    message = str(orig).lower()
+    return any(text in message for text in RETRYABLE_MESSAGES)
+
+
+def retry_transaction(
+    db: Session,
+    work: Callable[[], T],
+    attempts: int = TRANSACTION_RETRY_ATTEMPTS,
+    backoff: float = TRANSACTION_RETRY_BACKOFF,
+    max_backoff: float = TRANSACTION_RETRY_MAX_BACKOFF,
+) -> T:
+    """
+    Run work() and retry it on deadlocks and serialization failures.
+
+    work must perform the whole transaction, commit included, so that a retry
+    starts from a clean session. Between attempts the session is rolled back
+    and the caller sleeps for a random time up to an exponentially growing
+    cap (full jitter), which keeps colliding transactions from retrying in
+    lockstep. Other errors, and the last failed attempt, propagate.
+    """
+    for attempt in range(1, attempts + 1):
+        try:
+            return work()
+        except DBAPIError as e:
+            if not is_retryable_error(e):
+                raise
+            db.rollback()
+            delay = _retry_delay(e, attempt, attempts, backoff, max_backoff)
+            if delay is None:
+                raise
+            time.sleep(delay)
+
+
+async def retry_transaction_async(
+    db: AsyncSession,
+    work: Callable[[], Awaitable[T]],
+    attempts: int = TRANSACTION_RETRY_ATTEMPTS,
+    backoff: float = TRANSACTION_RETRY_BACKOFF,
+    max_backoff: float = TRANSACTION_RETRY_MAX_BACKOFF,
+) -> T:
+    """retry_transaction() for async sessions; the backoff awaits instead of blocking the event loop"""
+    for attempt in range(1, attempts + 1):
+        try:
+            return await work()
+        except DBAPIError as e:
+            if not is_retryable_error(e):
+                raise
+            await db.rollback()
+            delay = _retry_delay(e, attempt, attempts, backoff, max_backoff)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+
+
+def _retry_delay(error: DBAPIError, attempt: int, attempts: int, backoff: float, max_backoff: float) -> Optional[float]:
+    """Seconds to wait before the next attempt, or None once the attempts are used up"""
+    if attempt == attempts:
+        contention.record_exhausted()
+        return None
+    contention.record_retry()
+    delay = random.uniform(0, min(max_backoff, backoff * 2 ** (attempt - 1)))
+    logger.info(f"Retrying transaction after {error.orig!r} (attempt {attempt}, sleeping {delay:.3f}s)")
+    return delay
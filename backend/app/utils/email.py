@@ -1,30 +1,44 @@
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from app.config import SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASSWORD
+from app.config import SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASSWORD, SMTP_FROM, SMTP_STARTTLS, SMTP_TIMEOUT
+
+def build_message(to_email: str, subject: str, body: str) -> MIMEMultipart:
+    """Build a plain-text alert message"""
+    msg = MIMEMultipart()
+    msg['From'] = SMTP_FROM
+    msg['To'] = to_email
+    msg['Subject'] = subject
+    msg.attach(MIMEText(body, 'plain'))
+    return msg
+
+def open_smtp_connection() -> smtplib.SMTP:
+    """Open an SMTP connection, upgraded to TLS and logged in when configured"""
+    server = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+    try:
+        if SMTP_STARTTLS:
+            server.starttls()
+        if SMTP_USER:
+            server.login(SMTP_USER, SMTP_PASSWORD)
+    except Exception:
+        server.close()
+        raise
+    return server
 
 def send_email_alert(to_email: str, subject: str, body: str) -> bool:
     """
-    Send an email alert
+    Send an email alert over a one-off connection
     Returns True if email was sent successfully, False otherwise
+
+    Request handlers should use app.utils.notifications.notifications.enqueue,
+    which reuses connections and keeps SMTP off the request path.
     """
     try:
-        # Create message
-        msg = MIMEMultipart()
-        msg['From'] = SMTP_USER
-        msg['To'] = to_email
-        msg['Subject'] = subject
-
-        # Add body
-        msg.attach(MIMEText(body, 'plain'))
-
         # Create SMTP session
-        server = smtplib.SMTP(SMTP_HOST, SMTP_PORT)
-        server.starttls()
-        server.login(SMTP_USER, SMTP_PASSWORD)
+        server = open_smtp_connection()
 
         # Send email
-        server.send_message(msg)
+        server.send_message(build_message(to_email, subject, body))
         server.quit()
 
         return True
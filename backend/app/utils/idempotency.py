@@ -0,0 +1,291 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from threading import Event, Lock
+from typing import Any, Awaitable, Callable, NamedTuple, Optional
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete, event, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.config import (
+    IDEMPOTENCY_KEY_TTL,
+    IDEMPOTENCY_WAIT_TIMEOUT,
+    IDEMPOTENCY_POLL_INTERVAL,
+    IDEMPOTENCY_IN_FLIGHT_TIMEOUT,
+)
+from app.database import SessionLocal
+from app.models.idempotency import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+MAX_KEY_LENGTH = 255
+REPLAY_HEADER = "Idempotent-Replayed"
+
+
+class StoredResponse(NamedTuple):
+    status_code: int
+    body: Any
+
+
+# Outcomes of a claim other than a stored response
+IN_FLIGHT = StoredResponse(0, None)
+RECLAIM = StoredResponse(-1, None)
+# Answer for a key whose work committed but whose response was lost
+COMMITTED_WITHOUT_RESPONSE = StoredResponse(500, {
+    "detail": "The request was processed but its response could not be recorded; do not retry it"
+})
+
+# response_body of an in-flight row once the work's transaction has committed
+WORK_COMMITTED = "committed"
+# session.info entry naming the key a session's work runs under
+OWNED_KEY = "idempotency_key"
+
+
+def request_fingerprint(endpoint: str, payload: Any) -> str:
+    """Hash of what a request asked for, so a key cannot be reused for a different request"""
+    canonical = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{endpoint}\n{canonical}".encode()).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    Run a request at most once per (user, Idempotency-Key).
+
+    The first request claims the key with a committed in-flight row, does the
+    work and stores the serialized response; retries with the same key get the
+    stored response back without touching the wallet. A duplicate that arrives
+    while the first is still running waits for it, on an in-process event when
+    both landed on this worker and by polling the row otherwise.
+
+    All bookkeeping runs on the request's own session, so it never waits for a
+    second connection from a single-connection writer pool. When the work
+    commits, the row is marked committed in that same transaction: a request
+    that fails before its commit releases the key, while one that fails (or
+    dies) after it leaves an error response behind instead of letting a retry
+    run the work a second time.
+    """
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        ttl: float = IDEMPOTENCY_KEY_TTL,
+        wait_timeout: float = IDEMPOTENCY_WAIT_TIMEOUT,
+        poll_interval: float = IDEMPOTENCY_POLL_INTERVAL,
+        in_flight_timeout: float = IDEMPOTENCY_IN_FLIGHT_TIMEOUT,
+    ):
+        # Only purge_expired opens sessions of its own
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self.in_flight_timeout = in_flight_timeout
+        self._in_flight = {}
+        self._lock = Lock()
+
+    def run(
+        self, db: Session, user_id: int, key: str, request_hash: str, work: Callable[[], Any], status_code: int = 200
+    ) -> JSONResponse:
+        """Run work() once for this key; work uses db and returns the JSON-compatible response body"""
+        self._check_key(key)
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            stored = self._claim(db, user_id, key, request_hash)
+            if stored is None:
+                break
+            if stored is RECLAIM:
+                continue
+            if stored is not IN_FLIGHT:
+                return self._replay(stored)
+            self._wait(user_id, key, deadline)
+        db.info[OWNED_KEY] = (user_id, key)
+        try:
+            body = work()
+        except BaseException:
+            self._fail(db, user_id, key)
+            raise
+        self._complete(db, user_id, key, status_code, body)
+        return JSONResponse(content=body, status_code=status_code)
+
+    async def run_async(
+        self, db: AsyncSession, user_id: int, key: str, request_hash: str,
+        work: Callable[[], Awaitable[Any]], status_code: int = 200
+    ) -> JSONResponse:
+        """run() for async endpoints; the bookkeeping runs on the async session's connection"""
+        self._check_key(key)
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            stored = await db.run_sync(self._claim, user_id, key, request_hash)
+            if stored is None:
+                break
+            if stored is RECLAIM:
+                continue
+            if stored is not IN_FLIGHT:
+                return self._replay(stored)
+            if time.monotonic() >= deadline:
+                self._raise_in_progress()
+            await asyncio.sleep(self.poll_interval)
+        db.info[OWNED_KEY] = (user_id, key)
+        try:
+            body = await work()
+        except BaseException:
+            await db.run_sync(self._fail, user_id, key)
+            raise
+        await db.run_sync(self._complete, user_id, key, status_code, body)
+        return JSONResponse(content=body, status_code=status_code)
+
+    def purge_expired(self) -> int:
+        """Delete every expired key with one statement; returns the number removed"""
+        db = self.session_factory()
+        try:
+            result = db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at < datetime.utcnow()))
+            db.commit()
+            return result.rowcount
+        finally:
+            db.close()
+
+    def _check_key(self, key: str) -> None:
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters"
+            )
+
+    def _claim(self, db: Session, user_id: int, key: str, request_hash: str) -> Optional[StoredResponse]:
+        """
+        Insert the in-flight row. Returns None when this request now owns the key,
+        IN_FLIGHT while another request holds it, RECLAIM when the row went away
+        and the claim should be retried, or the stored response. The session's
+        transaction is always finished, so nothing is held while waiting.
+        """
+        now = datetime.utcnow()
+        db.add(IdempotencyKey(
+            user_id=user_id, key=key, request_hash=request_hash,
+            created_at=now, expires_at=now + timedelta(seconds=self.ttl)
+        ))
+        try:
+            db.commit()
+            with self._lock:
+                self._in_flight[(user_id, key)] = Event()
+            return None
+        except IntegrityError:
+            db.rollback()
+
+        try:
+            row = db.get(IdempotencyKey, (user_id, key), populate_existing=True)
+            if row is None:
+                # Released or purged in the meantime
+                return RECLAIM
+            abandoned = row.status_code is None and row.created_at < now - timedelta(seconds=self.in_flight_timeout)
+            if row.expires_at < now or (abandoned and row.response_body != WORK_COMMITTED):
+                # Take the key over, unless someone else already did
+                db.execute(delete(IdempotencyKey).where(
+                    IdempotencyKey.user_id == user_id,
+                    IdempotencyKey.key == key,
+                    IdempotencyKey.created_at == row.created_at
+                ))
+                db.commit()
+                return RECLAIM
+            if row.request_hash != request_hash:
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail="Idempotency-Key was already used for a different request"
+                )
+            if abandoned:
+                # The work committed but its response was never stored
+                return COMMITTED_WITHOUT_RESPONSE
+            if row.status_code is None:
+                return IN_FLIGHT
+            return StoredResponse(row.status_code, json.loads(row.response_body))
+        finally:
+            db.rollback()
+
+    def _complete(self, db: Session, user_id: int, key: str, status_code: int, body: Any) -> None:
+        db.info.pop(OWNED_KEY, None)
+        try:
+            self._store(db, user_id, key, status_code, json.dumps(body))
+            db.commit()
+        except Exception as e:
+            # The row stays marked committed, so retries get an error rather than a second run
+            db.rollback()
+            logger.error(f"Failed to store response for idempotency key {key!r}: {str(e)}")
+        finally:
+            self._wake(user_id, key)
+
+    def _fail(self, db: Session, user_id: int, key: str) -> None:
+        """Release the key if the work rolled back; keep it, with an error response, if the work committed"""
+        db.info.pop(OWNED_KEY, None)
+        try:
+            db.rollback()
+            released = db.execute(delete(IdempotencyKey).where(
+                IdempotencyKey.user_id == user_id,
+                IdempotencyKey.key == key,
+                IdempotencyKey.status_code.is_(None),
+                IdempotencyKey.response_body.is_(None)
+            )).rowcount
+            if not released:
+                logger.error(f"Request with idempotency key {key!r} failed after its work was committed")
+                self._store(
+                    db, user_id, key,
+                    COMMITTED_WITHOUT_RESPONSE.status_code, json.dumps(COMMITTED_WITHOUT_RESPONSE.body)
+                )
+            db.commit()
+        finally:
+            self._wake(user_id, key)
+
+    def _store(self, db: Session, user_id: int, key: str, status_code: int, body: str) -> None:
+        db.execute(update(IdempotencyKey).where(
+            IdempotencyKey.user_id == user_id,
+            IdempotencyKey.key == key,
+            IdempotencyKey.status_code.is_(None)
+        ).values(status_code=status_code, response_body=body))
+
+    def _wake(self, user_id: int, key: str) -> None:
+        with self._lock:
+            event = self._in_flight.pop((user_id, key), None)
+        if event is not None:
+            event.set()
+
+    def _wait(self, user_id: int, key: str, deadline: float) -> None:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            self._raise_in_progress()
+        with self._lock:
+            event = self._in_flight.get((user_id, key))
+        if event is not None:
+            event.wait(min(remaining, self.poll_interval * 20))
+        else:
+            time.sleep(min(remaining, self.poll_interval))
+
+    def _raise_in_progress(self) -> None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A request with this Idempotency-Key is still in progress",
+            headers={"Retry-After": "1"}
+        )
+
+    def _replay(self, stored: StoredResponse) -> JSONResponse:
+        return JSONResponse(content=stored.body, status_code=stored.status_code, headers={REPLAY_HEADER: "true"})
+
+
+def _mark_work_committed(session: Session) -> None:
+    """Flag the owned key as committed inside the work's own transaction"""
+    owned = session.info.get(OWNED_KEY)
+    if owned is None:
+        return
+    user_id, key = owned
+    session.execute(update(IdempotencyKey).where(
+        IdempotencyKey.user_id == user_id,
+        IdempotencyKey.key == key,
+        IdempotencyKey.status_code.is_(None)
+    ).values(response_body=WORK_COMMITTED))
+
+
+event.listen(Session, "before_commit", _mark_work_committed)
+
+idempotency = IdempotencyStore()
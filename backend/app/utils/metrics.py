@@ -0,0 +1,283 @@
+"""
+In-process metrics rendered in the Prometheus text exposition format.
+
+Request, job and domain metrics are updated where they happen; pool and email
+queue figures are read from their existing stats() at scrape time. Every
+metric caps its number of label sets, so an unexpected label value cannot
+grow memory or the scrape without bound.
+"""
+import math
+from bisect import bisect_left
+from itertools import chain
+from threading import Lock
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.config import METRICS_MAX_SERIES
+
+OVERFLOW_LABEL = "other"
+# Prometheus client defaults, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+JOB_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+
+# Starlette appends "; charset=utf-8" to text types
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (), max_series: int = METRICS_MAX_SERIES):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.max_series = max_series
+        self._series: dict = {}
+        self._lock = Lock()
+
+    def _key(self, values: tuple) -> tuple:
+        """Label values for a sample; new label sets past the cap share one overflow series"""
+        if len(values) != len(self.labels):
+            raise ValueError(f"{self.name} takes labels {self.labels}, got {values}")
+        if values in self._series or len(self._series) < self.max_series:
+            return values
+        return (OVERFLOW_LABEL,) * len(values)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = sorted(self._series.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labels, values)} {_format_value(value)}" for values, value in series
+        ]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            key = self._key(labels)
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._series.get(labels, 0)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._series[self._key(labels)] = value
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            key = self._key(labels)
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def value(self, *labels: str) -> float:
+        return self._series.get(labels, 0)
+
+
+class Histogram(_Metric):
+    """Cumulative buckets are computed at render time; observe() bumps a single slot"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, max_series: int = METRICS_MAX_SERIES):
+        super().__init__(name, documentation, labels, max_series)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str) -> None:
+        slot = bisect_left(self.buckets, value)
+        with self._lock:
+            key = self._key(labels)
+            series = self._series.get(key)
+            if series is None:
+                # One count per bucket plus +Inf, then the sum
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[slot] += 1
+            series[-1] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return sum(series[:-1]) if series else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = sorted((values, list(counts)) for values, counts in self._series.items())
+        lines = self.header()
+        bounds = [_format_value(float(b)) for b in self.buckets] + ["+Inf"]
+        for values, counts in series:
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                labels = _format_labels(self.labels + ("le",), values + (bound,))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(counts[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+# A scrape-time collector returns (name, kind, help, label names, [(label values, value)])
+Collected = Tuple[str, str, str, Sequence[str], Iterable[Tuple[tuple, float]]]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Collected]]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def add_collector(self, collector: Callable[[], Iterable[Collected]]) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = list(chain.from_iterable(metric.render() for metric in self._metrics.values()))
+        for collector in self._collectors:
+            for name, kind, documentation, label_names, samples in collector():
+                lines += [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+                lines += [
+                    f"{name}{_format_labels(label_names, values)} {_format_value(value)}"
+                    for values, value in samples
+                ]
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "http_requests_total", "HTTP requests by route template and status code", ("method", "route", "status")
+))
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route")
+))
+http_requests_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "HTTP requests being served"
+))
+job_duration = registry.register(Histogram(
+    "scheduler_job_duration_seconds", "Scheduled job run time by job and outcome", ("job", "outcome"),
+    buckets=JOB_BUCKETS
+))
+transactions_committed = registry.register(Counter(
+    "wallet_transactions_total", "Committed transactions by type and status", ("type", "status")
+))
+fraud_flags = registry.register(Counter(
+    "fraud_flags_total", "Transactions flagged by the fraud rules, by rule", ("rule",)
+))
+
+
+def _pool_metrics() -> Iterable[Collected]:
+    from app.core.engine import pool_stats
+
+    pools = pool_stats()
+    yield ("db_pool_connections", "gauge", "Pooled database connections by state", ("pool", "state"), [
+        ((name, state), stats[state]) for name, stats in pools.items() for state in ("in_use", "idle", "overflow")
+    ])
+    yield ("db_pool_checkouts_total", "counter", "Connection checkouts", ("pool",),
+           [((name,), stats["checkouts"]) for name, stats in pools.items()])
+    yield ("db_pool_checkout_wait_seconds_total", "counter", "Time spent waiting for a connection", ("pool",),
+           [((name,), stats["wait_seconds_total"]) for name, stats in pools.items()])
+    yield ("db_pool_exhausted_total", "counter", "Checkouts that found the pool exhausted", ("pool",),
+           [((name,), stats["exhausted"]) for name, stats in pools.items()])
+
+
+def _email_metrics() -> Iterable[Collected]:
+    from app.utils.notifications import notifications
+
+    stats = notifications.stats()
+    yield ("emails_total", "counter", "Notification emails by outcome", ("outcome",), [
+        ((outcome,), stats[outcome]) for outcome in ("sent", "failed", "retried", "dropped")
+    ])
+    yield ("email_queue_depth", "gauge", "Notification emails waiting to be sent", (), [((), stats["queue_depth"])])
+
+
+registry.add_collector(_pool_metrics)
+registry.add_collector(_email_metrics)
+
+
+def track_committed_transactions() -> None:
+    """
+    Count transactions by type and status as sessions commit them, covering
+    ORM inserts and bulk inserts alike. Rolled back work is not counted.
+    """
+    from app.models.transaction import Transaction
+
+    if event.contains(Session, "after_commit", _count_committed):
+        return
+
+    def track_flush(session: Session, flush_context) -> None:
+        pending = session.info.setdefault("metrics_transactions", {})
+        for obj in chain(session.new, session.dirty):
+            if isinstance(obj, Transaction) and (obj in session.new or obj in pending):
+                pending[obj] = (obj.transaction_type, obj.status)
+
+    def track_bulk_insert(orm_execute_state) -> None:
+        state = orm_execute_state
+        if not state.is_insert or state.bind_mapper is None or state.bind_mapper.class_ is not Transaction:
+            return
+        params = state.parameters
+        rows = params if isinstance(params, list) else [params or {}]
+        bulk = state.session.info.setdefault("metrics_bulk_transactions", [])
+        bulk.extend((row.get("transaction_type"), row.get("status")) for row in rows)
+
+    event.listen(Session, "after_flush", track_flush)
+    event.listen(Session, "do_orm_execute", track_bulk_insert)
+    event.listen(Session, "after_commit", _count_committed)
+    event.listen(Session, "after_rollback", _forget_pending)
+
+
+def _label(value) -> str:
+    return getattr(value, "value", None) or str(value)
+
+
+def _count_committed(session: Session) -> None:
+    pending = session.info.pop("metrics_transactions", {})
+    bulk = session.info.pop("metrics_bulk_transactions", [])
+    for transaction_type, status in chain(pending.values(), bulk):
+        transactions_committed.inc(_label(transaction_type), _label(status))
+
+
+def _forget_pending(session: Session) -> None:
+    session.info.pop("metrics_transactions", None)
+    session.info.pop("metrics_bulk_transactions", None)
+
+
+def observe_job(job_id: str, outcome: str, seconds: float) -> None:
+    job_duration.observe(seconds, job_id, outcome)
+
+
+def render() -> str:
+    return registry.render()
@@ -0,0 +1,192 @@
+import logging
+import queue
+import random
+import smtplib
+import time
+from threading import Lock, Thread
+from typing import Callable, NamedTuple, Optional
+from app.utils.email import build_message, open_smtp_connection
+from app.config import (
+    NOTIFICATION_QUEUE_SIZE,
+    NOTIFICATION_WORKERS,
+    NOTIFICATION_MAX_RETRIES,
+    NOTIFICATION_RETRY_BACKOFF,
+    NOTIFICATION_IDLE_CHECK,
+)
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class Notification(NamedTuple):
+    to_email: str
+    subject: str
+    body: str
+
+
+class NotificationDispatcher:
+    """
+    Bounded in-process email queue drained by background worker threads.
+
+    Each worker keeps its own authenticated SMTP connection open across
+    messages, checks it with NOOP after an idle period and reconnects on
+    failure. Failed sends are retried with exponential backoff and jitter.
+    Callers only enqueue; a full queue drops the message rather than block.
+    """
+
+    def __init__(
+        self,
+        workers: int = NOTIFICATION_WORKERS,
+        maxsize: int = NOTIFICATION_QUEUE_SIZE,
+        max_retries: int = NOTIFICATION_MAX_RETRIES,
+        backoff: float = NOTIFICATION_RETRY_BACKOFF,
+        idle_check: float = NOTIFICATION_IDLE_CHECK,
+        connect: Callable[[], smtplib.SMTP] = open_smtp_connection,
+    ):
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.idle_check = idle_check
+        self.connect = connect
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.dropped = 0
+        self.connections_opened = 0
+        self._queue: queue.Queue = queue.Queue(maxsize)
+        self._threads: list = []
+        self._lock = Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if any(thread.is_alive() for thread in self._threads):
+                return
+            self._threads = [
+                Thread(target=self._run, name=f"notifications-{i}", daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def enqueue(self, to_email: Optional[str], subject: str, body: str) -> bool:
+        """Queue an email for delivery; returns False if it was dropped"""
+        if not to_email:
+            return False
+        self.start()
+        try:
+            self._queue.put_nowait(Notification(to_email, subject, body))
+            return True
+        except queue.Full:
+            self._count("dropped")
+            logger.warning(f"Notification queue full, dropped email to {to_email}")
+            return False
+
+    def join(self) -> None:
+        """Block until every queued email has been sent or given up on"""
+        self._queue.join()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Deliver what is queued, then close connections and stop the workers"""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        deadline = time.monotonic() + timeout
+        for _ in threads:
+            try:
+                self._queue.put(_STOP, timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Full:
+                # The workers are daemon threads and die with the process
+                logger.warning(f"Notification queue still full after {timeout}s, not waiting for workers")
+                return
+        for thread in threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth,
+            "queue_capacity": self._queue.maxsize,
+            "workers": sum(thread.is_alive() for thread in self._threads),
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "dropped": self.dropped,
+            "connections_opened": self.connections_opened,
+        }
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _run(self) -> None:
+        connection = None
+        last_used = 0.0
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    break
+                connection = self._deliver(item, connection, last_used)
+                last_used = time.monotonic()
+            finally:
+                self._queue.task_done()
+        if connection is not None:
+            self._close(connection, quit=True)
+
+    def _deliver(self, item: Notification, connection, last_used: float):
+        """Send one message, returning the connection to reuse for the next"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                if connection is not None and time.monotonic() - last_used > self.idle_check:
+                    if connection.noop()[0] != 250:
+                        self._close(connection)
+                        connection = None
+                if connection is None:
+                    connection = self.connect()
+                    self._count("connections_opened")
+                connection.send_message(build_message(*item))
+                self._count("sent")
+                return connection
+            except Exception as e:
+                if not _is_transient(e):
+                    # The server answered, so the connection is still good
+                    self._count("failed")
+                    logger.error(f"Email to {item.to_email} rejected: {str(e)}")
+                    return connection
+                if connection is not None:
+                    self._close(connection)
+                    connection = None
+                if attempt == self.max_retries:
+                    self._count("failed")
+                    logger.error(f"Failed to send email to {item.to_email}: {str(e)}")
+                    return None
+                self._count("retried")
+                time.sleep(self.backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+        return connection
+
+    @staticmethod
+    def _close(connection, quit: bool = False) -> None:
+        try:
+            if quit:
+                connection.quit()
+            else:
+                connection.close()
+        except Exception:
+            pass
+
+
+def _is_transient(error: Exception) -> bool:
+    """Connection failures and 4xx replies are worth retrying; 5xx replies are final"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return any(code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code < 500
+    if isinstance(error, smtplib.SMTPNotSupportedError):
+        return False
+    return isinstance(error, OSError)
+
+
+notifications = NotificationDispatcher()
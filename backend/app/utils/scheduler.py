@@ -1,20 +1,200 @@
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+from apscheduler.executors.pool import ThreadPoolExecutor
+from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
-from sqlalchemy.orm import Session
-from app.database import SessionLocal
+from apscheduler.triggers.interval import IntervalTrigger
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError
+from app.config import (
+    SCHEDULER_ENABLED,
+    SCHEDULER_THREADS,
+    SCHEDULER_LEASE_TTL,
+    SCHEDULER_HEARTBEAT_INTERVAL,
+)
+from app.database import LeaseSessionLocal, ReadSessionLocal, SessionLocal
+from app.models.scheduler import JobRun, SchedulerLease
 from app.tasks.fraud_scan import run_daily_fraud_scan
 from app.tasks.reporting import ReportingService
+from app.utils.idempotency import idempotency
+from app.utils.metrics import observe_job
 import logging
 
 logger = logging.getLogger(__name__)
 
-def start_scheduler(app):
-    """Initialize and start the scheduler"""
-    scheduler = AsyncIOScheduler()
+
+class SchedulerLeader:
+    """
+    Elect one process across all workers and hosts to run scheduled jobs.
+
+    Every process heartbeats the scheduler_leases row. The holder extends its
+    lease; anyone else takes the row over only once it has expired, so a
+    crashed leader is replaced after at most one lease TTL. A process treats
+    itself as leader until its own lease would have expired, measured on the
+    local monotonic clock from before the renewal was sent. The lease is kept
+    on a connection of its own, so renewals never wait for the shared writer.
+    """
+
+    def __init__(self, session_factory=LeaseSessionLocal, name: str = "scheduler", ttl: float = SCHEDULER_LEASE_TTL):
+        self.session_factory = session_factory
+        self.name = name
+        self.ttl = ttl
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._deadline: Optional[float] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._deadline is not None and time.monotonic() < self._deadline
+
+    def heartbeat(self) -> bool:
+        """Acquire or renew the lease; returns whether this process is the leader"""
+        sent = time.monotonic()
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.ttl)
+        db = self.session_factory()
+        try:
+            result = db.execute(
+                update(SchedulerLease)
+                .where(
+                    SchedulerLease.name == self.name,
+                    or_(SchedulerLease.owner == self.owner, SchedulerLease.expires_at < now)
+                )
+                .values(owner=self.owner, expires_at=expires_at, heartbeat_at=now)
+            )
+            acquired = result.rowcount == 1
+            if not acquired and db.get(SchedulerLease, self.name) is None:
+                db.add(SchedulerLease(name=self.name, owner=self.owner, expires_at=expires_at, heartbeat_at=now))
+                acquired = True
+            db.commit()
+        except IntegrityError:
+            # Another process created the row first
+            db.rollback()
+            acquired = False
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Scheduler heartbeat failed: {str(e)}")
+            acquired = False
+        finally:
+            db.close()
+
+        if acquired:
+            if not self.is_leader:
+                logger.info(f"Scheduler leadership acquired by {self.owner}")
+            self._deadline = sent + self.ttl
+        elif self._deadline is not None:
+            logger.warning(f"Scheduler leadership lost by {self.owner}")
+            self._deadline = None
+        return acquired
+
+    def release(self) -> None:
+        """Give the lease up so another process can take over at its next heartbeat"""
+        if self._deadline is None:
+            return
+        self._deadline = None
+        db = self.session_factory()
+        try:
+            db.execute(
+                update(SchedulerLease)
+                .where(SchedulerLease.name == self.name, SchedulerLease.owner == self.owner)
+                .values(expires_at=datetime.utcnow())
+            )
+            db.commit()
+        except Exception as e:
+            logger.error(f"Failed to release scheduler lease: {str(e)}")
+        finally:
+            db.close()
+
+
+leader = SchedulerLeader()
+scheduler: Optional[BackgroundScheduler] = None
+
+
+def run_job(
+    job_id: str,
+    func: Callable[[], Optional[int]],
+    job_leader: SchedulerLeader = None,
+    session_factory=SessionLocal
+) -> Optional[JobRun]:
+    """
+    Run a job if this process is the leader and record the run in job_runs.
+    func returns the number of rows it scanned, or None.
+    """
+    job_leader = job_leader or leader
+    if not job_leader.is_leader:
+        return None
+
+    started_at = datetime.utcnow()
+    start = time.perf_counter()
+    rows, outcome, error = None, "success", None
+    try:
+        rows = func()
+    except Exception as e:
+        outcome, error = "failed", str(e)
+        logger.error(f"Scheduled job {job_id} failed: {str(e)}")
+
+    duration = time.perf_counter() - start
+    observe_job(job_id, outcome, duration)
+    run = JobRun(
+        job_id=job_id,
+        owner=job_leader.owner,
+        started_at=started_at,
+        finished_at=datetime.utcnow(),
+        duration_seconds=round(duration, 6),
+        rows_scanned=rows,
+        outcome=outcome,
+        error=error
+    )
+    db = session_factory()
+    try:
+        db.add(run)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Failed to record run of {job_id}: {str(e)}")
+    finally:
+        db.close()
+    return run
+
+
+def start_scheduler(app=None) -> Optional[BackgroundScheduler]:
+    """
+    Initialize and start the scheduler.
+
+    Jobs run on the scheduler's own thread pool, never on the request event
+    loop. Every process runs the heartbeat, but only the lease holder runs jobs.
+    """
+    global scheduler
+    if not SCHEDULER_ENABLED or scheduler is not None:
+        return scheduler
+
+    scheduler = BackgroundScheduler(
+        executors={
+            "default": ThreadPoolExecutor(SCHEDULER_THREADS),
+            # Long jobs must not delay lease renewal; the heartbeat also has its own connection
+            "heartbeat": ThreadPoolExecutor(1),
+        },
+        job_defaults={"coalesce": True, "max_instances": 1, "misfire_grace_time": 300},
+        timezone="UTC"
+    )
+
+    scheduler.add_job(
+        func=leader.heartbeat,
+        trigger=IntervalTrigger(seconds=SCHEDULER_HEARTBEAT_INTERVAL),
+        id='leader_heartbeat',
+        name='Scheduler Leader Heartbeat',
+        executor='heartbeat',
+        next_run_time=datetime.utcnow(),
+        replace_existing=True
+    )
 
     # Schedule daily fraud scan at 1 AM UTC
     scheduler.add_job(
-        func=run_scheduled_fraud_scan,
+        func=run_job,
+        args=['fraud_scan', run_scheduled_fraud_scan],
         trigger=CronTrigger(hour=1, minute=0),
         id='fraud_scan',
         name='Daily Fraud Scan',
@@ -23,7 +203,8 @@ def start_scheduler(app):
 
     # Schedule daily report generation at 2 AM UTC
     scheduler.add_job(
-        func=run_scheduled_report,
+        func=run_job,
+        args=['daily_report', run_scheduled_report],
         trigger=CronTrigger(hour=2, minute=0),
         id='daily_report',
         name='Daily Transaction Report',
@@ -32,7 +213,8 @@ def start_scheduler(app):
 
     # Schedule weekly report at 3 AM UTC on Mondays
     scheduler.add_job(
-        func=run_scheduled_weekly_report,
+        func=run_job,
+        args=['weekly_report', run_scheduled_weekly_report],
         trigger=CronTrigger(day_of_week='mon', hour=3, minute=0),
         id='weekly_report',
         name='Weekly Transaction Report',
@@ -41,62 +223,99 @@ def start_scheduler(app):
 
     # Schedule monthly report at 4 AM UTC on the 1st of each month
     scheduler.add_job(
-        func=run_scheduled_monthly_report,
+        func=run_job,
+        args=['monthly_report', run_scheduled_monthly_report],
         trigger=CronTrigger(day=1, hour=4, minute=0),
         id='monthly_report',
         name='Monthly Transaction Report',
         replace_existing=True
     )
 
+    # Purge expired idempotency keys every hour
+    scheduler.add_job(
+        func=run_job,
+        args=['idempotency_cleanup', run_idempotency_cleanup],
+        trigger=CronTrigger(minute=30),
+        id='idempotency_cleanup',
+        name='Idempotency Key Cleanup',
+        replace_existing=True
+    )
+
     try:
         scheduler.start()
-        logger.info("Scheduler started successfully")
+        logger.info(f"Scheduler started as {leader.owner}")
     except Exception as e:
         logger.error(f"Failed to start scheduler: {str(e)}")
+    return scheduler
 
-def run_scheduled_fraud_scan():
-    """Run scheduled fraud scan with proper error handling"""
+def stop_scheduler() -> None:
+    """Wait for running jobs, then hand the lease to another worker"""
+    global scheduler
+    if scheduler is None:
+        return
+    scheduler.shutdown(wait=True)
+    scheduler = None
+    leader.release()
+
+def run_scheduled_fraud_scan() -> int:
+    """Run the daily fraud scan; returns the number of transactions scanned"""
+    # Scan on the read engine; only the flag UPDATE takes the writer, briefly
+    db, write_db = ReadSessionLocal(), SessionLocal()
     try:
-        db = SessionLocal()
-        run_daily_fraud_scan(db)
-        logger.info("Daily fraud scan completed successfully")
-    except Exception as e:
-        logger.error(f"Failed to run daily fraud scan: {str(e)}")
+        result = run_daily_fraud_scan(db, write_db=write_db)
+        logger.info(
+            f"Daily fraud scan completed successfully: {result['scanned_transactions']} scanned, "
+            f"{result['flagged_transactions']} flagged"
+        )
+        for shard in result["shards"]:
+            logger.info(
+                f"Fraud scan shard {shard['shard']}: {shard['scanned_transactions']} scanned, "
+                f"{shard['flagged_transactions']} flagged in {shard['seconds']}s"
+            )
+        return result['scanned_transactions']
     finally:
         db.close()
+        write_db.close()
 
-def run_scheduled_report():
-    """Run scheduled daily report with proper error handling"""
+def run_idempotency_cleanup() -> int:
+    """Delete expired idempotency keys in one statement"""
+    removed = idempotency.purge_expired()
+    logger.info(f"Purged {removed} expired idempotency keys")
+    return removed
+
+def run_scheduled_report() -> int:
+    """Run the scheduled daily report and store its rollup; returns the number of transactions covered"""
+    # Reports read on the read engine; rollup rows are written in short transactions
+    db, write_db = ReadSessionLocal(), SessionLocal()
     try:
-        db = SessionLocal()
-        reporting_service = ReportingService(db)
+        reporting_service = ReportingService(db, write_db=write_db)
         report = reporting_service.generate_daily_report()
         logger.info(f"Daily report generated successfully: {report['date']}")
-    except Exception as e:
-        logger.error(f"Failed to generate daily report: {str(e)}")
+        return report['transaction_stats']['total_transactions']
     finally:
         db.close()
+        write_db.close()
 
-def run_scheduled_weekly_report():
-    """Run scheduled weekly report with proper error handling"""
+def run_scheduled_weekly_report() -> int:
+    """Run the weekly report from daily rollups; returns the number of transactions covered"""
+    # Reports read on the read engine; rollup rows are written in short transactions
+    db, write_db = ReadSessionLocal(), SessionLocal()
     try:
-        db = SessionLocal()
-        reporting_service = ReportingService(db)
-        # Generate weekly report (implementation similar to daily report but for 7 days)
-        logger.info("Weekly report generated successfully")
-    except Exception as e:
-        logger.error(f"Failed to generate weekly report: {str(e)}")
+        report = ReportingService(db, write_db=write_db).generate_weekly_report()
+        logger.info(f"Weekly report generated successfully: {report['start_date']} to {report['end_date']}")
+        return report['transaction_stats']['total_transactions']
     finally:
         db.close()
+        write_db.close()
 
-def run_scheduled_monthly_report():
-    """Run scheduled monthly report with proper error handling"""
+def run_scheduled_monthly_report() -> int:
+    """Run the monthly report from daily rollups; returns the number of transactions covered"""
+    # Reports read on the read engine; rollup rows are written in short transactions
+    db, write_db = ReadSessionLocal(), SessionLocal()
     try:
-        db = SessionLocal()
-        reporting_service = ReportingService(db)
-        # Generate monthly report (implementation similar to daily report but for 30 days)
-        logger.info("Monthly report generated successfully")
-    except Exception as e:
-        logger.error(f"Failed to generate monthly report: {str(e)}")
+        report = ReportingService(db, write_db=write_db).generate_monthly_report()
+        logger.info(f"Monthly report generated successfully: {report['start_date']} to {report['end_date']}")
+        return report['transaction_stats']['total_transactions']
     finally:
         db.close()
+        write_db.close()
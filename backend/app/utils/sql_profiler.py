@@ -0,0 +1,104 @@
+"""
+Per-request SQL profiling on SQLAlchemy engine events.
+
+Engines instrumented with instrument_engine() time every statement. While a
+request is being profiled (see SQLProfilerMiddleware) statements are counted
+per normalized form, which exposes N+1 access patterns; statements slower
+than the threshold go to the "app.utils.sql_profiler.slow" logger whether or
+not a request is profiled. Only the shape of bound parameters is logged,
+never their values.
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, List, Optional
+from sqlalchemy import event
+from app.core.config import settings
+from app.middlewares.request_context import current_endpoint
+
+slow_query_logger = logging.getLogger(f"{__name__}.slow")
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.$])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|\$\d+|:\w+|%s|\?")
+# "IN (?, ?, ?)" and multi-row VALUES differ only in length
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def normalize_statement(statement: str) -> str:
+    """Statement with literals and placeholders replaced by ?, so repeats of one query compare equal"""
+    text = _STRING_LITERAL.sub("?", statement)
+    text = _PLACEHOLDER.sub("?", text)
+    text = _NUMBER_LITERAL.sub("?", text)
+    text = _PLACEHOLDER_LIST.sub("(?, ...)", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def parameter_shape(parameters: Any, executemany: bool = False) -> str:
+    """Types of the bound parameters, e.g. (int, str) or 50 x {amount: float}"""
+    if executemany and isinstance(parameters, (list, tuple)):
+        first = parameters[0] if parameters else ()
+        return f"{len(parameters)} x {parameter_shape(first)}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(type(value).__name__ for value in parameters) + ")"
+    return type(parameters).__name__
+
+
+class RequestProfile:
+    """Statements run while serving one request"""
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.repeats: Counter = Counter()
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.statements += 1
+        self.db_seconds += seconds
+        self.repeats[normalize_statement(statement)] += 1
+
+    def repeated(self, threshold: int = None) -> List[tuple]:
+        """(statement, count) for every normalized statement run more than threshold times"""
+        threshold = settings.SQL_REPEAT_THRESHOLD if threshold is None else threshold
+        return [(statement, count) for statement, count in self.repeats.most_common() if count > threshold]
+
+
+current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("current_profile", default=None)
+
+
+# The start time rides on the execution context, which is cheaper than
+# conn.info; the few internal statements run without a context are skipped
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_query_start", None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    profile = current_profile.get()
+    if profile is not None:
+        profile.record(statement, elapsed)
+    if elapsed * 1000 >= settings.SQL_SLOW_QUERY_MS:
+        slow_query_logger.warning(
+            f"Slow query ({elapsed * 1000:.1f} ms) in {current_endpoint.get()}: "
+            f"{normalize_statement(statement)} params={parameter_shape(parameters, executemany)}"
+        )
+
+
+def instrument_engine(engine) -> None:
+    """Time every statement on a sync engine (pass engine.sync_engine for async engines)"""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
@@ -0,0 +1,130 @@
+"""
+Concurrency of /wallet/balance: sync Session inside `async def` vs the async path.
+
+Local SQLite answers in microseconds, so every statement is delayed by
+--db-latency-ms inside the connection's own thread to stand in for a network
+round-trip. With the sync Session that thread is the event loop.
+
+    python -m benchmarks.async_endpoints --requests 400 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import time
+from fastapi import Depends, FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from app.api import wallet as wallet_api
+from app.core.database import get_async_read_db
+from app.core.security import get_current_user_async
+from app.models.user import User
+from app.models.wallet import Wallet
+from benchmarks.common import make_engine, percentile, print_table
+
+
+def add_latency(engine, seconds: float, is_async: bool) -> None:
+    def trace(_statement):
+        time.sleep(seconds)
+
+    @event.listens_for(engine.sync_engine if is_async else engine, "connect")
+    def on_connect(dbapi_connection, _record):
+        if is_async:
+            dbapi_connection.run_async(lambda conn: conn.set_trace_callback(trace))
+        else:
+            dbapi_connection.set_trace_callback(trace)
+
+
+def build_blocking_app(SessionLocal, user) -> FastAPI:
+    """The previous implementation: sync Session calls inside async endpoints"""
+    app = FastAPI()
+
+    def get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @app.get("/wallet/balance")
+    async def get_balance(db: Session = Depends(get_db)):
+        wallet = db.query(Wallet).filter(Wallet.user_id == user.id).first()
+        return {"balance": wallet.balance, "currency": wallet.currency.value}
+
+    return app
+
+
+def build_async_app(path: str, latency: float, user, pool_size: int) -> FastAPI:
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{path}", poolclass=AsyncAdaptedQueuePool, pool_size=pool_size
+    )
+    add_latency(engine, latency, is_async=True)
+    AsyncSessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    async def get_db():
+        async with AsyncSessionLocal() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(wallet_api.router, prefix="/wallet")
+    app.dependency_overrides[get_async_read_db] = get_db
+    app.dependency_overrides[get_current_user_async] = lambda: user
+    return app
+
+
+async def load(app: FastAPI, requests: int, concurrency: int) -> list:
+    samples = []
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        async def worker(count: int):
+            for _ in range(count):
+                start = time.perf_counter()
+                response = await client.get("/wallet/balance")
+                response.raise_for_status()
+                samples.append((time.perf_counter() - start) * 1000)
+
+        # Warm up: open every pooled connection before measuring
+        await asyncio.gather(*(worker(1) for _ in range(concurrency)))
+        samples.clear()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(requests // concurrency) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return [f"{len(samples) / elapsed:.0f}", f"{percentile(samples, 50):.1f}", f"{percentile(samples, 99):.1f}"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--db-latency-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    engine, SessionLocal, path = make_engine(pool_size=args.concurrency)
+    try:
+        db = SessionLocal()
+        user = User(username="bench", email="bench@example.com")
+        db.add(user)
+        db.flush()
+        db.add(Wallet(user_id=user.id, balance=100.0))
+        db.commit()
+        db.refresh(user)
+        db.expunge(user)
+        db.close()
+
+        latency = args.db_latency_ms / 1000
+        add_latency(engine, latency, is_async=False)
+        rows = [
+            ["blocking sync Session", *asyncio.run(load(build_blocking_app(SessionLocal, user), args.requests, args.concurrency))],
+            ["async session", *asyncio.run(load(build_async_app(path, latency, user, args.concurrency), args.requests, args.concurrency))],
+        ]
+        print(f"{args.requests} requests, concurrency {args.concurrency}, {args.db_latency_ms} ms per statement")
+        print_table(["path", "req/s", "p50 ms", "p99 ms"], rows)
+    finally:
+        engine.dispose()
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Authentication overhead per request: token decode plus principal lookup.
+
+    python -m benchmarks.auth_overhead --users 1000 --requests 20000
+"""
+import argparse
+import os
+import random
+import time
+from app.core import security
+from app.core.database import Base as CoreBase
+from app.core.models import User
+from app.utils.cache import TTLCache
+from benchmarks.common import make_engine, QueryCounter, percentile, print_table
+
+
+def seed(SessionLocal, users: int) -> list:
+    db = SessionLocal()
+    db.bulk_insert_mappings(User, [
+        {"email": f"user{i}@example.com", "is_active": True, "is_admin": False} for i in range(users)
+    ])
+    db.commit()
+    tokens = [security.create_access_token(user_id) for (user_id,) in db.query(User.id)]
+    db.close()
+    return tokens
+
+
+def run(SessionLocal, counter, name: str, ttl: int, tokens: list, requests: int) -> list:
+    security.token_cache = TTLCache(ttl=ttl, maxsize=len(tokens))
+    security.principal_cache = TTLCache(ttl=ttl, maxsize=len(tokens))
+    rng = random.Random(7)
+    db = SessionLocal()
+    counter.reset()
+    samples = []
+    for _ in range(requests):
+        token = rng.choice(tokens)
+        start = time.perf_counter()
+        security.authenticate_token(db, token)
+        samples.append((time.perf_counter() - start) * 1e6)
+        db.expunge_all()
+    db.close()
+    return [
+        name,
+        f"{counter.count / requests:.3f}",
+        f"{sum(samples) / requests:.1f}",
+        f"{percentile(samples, 99):.1f}",
+        f"{security.principal_cache.hit_rate:.1%}",
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    engine, SessionLocal, path = make_engine()
+    CoreBase.metadata.drop_all(bind=engine)
+    CoreBase.metadata.create_all(bind=engine)
+    try:
+        tokens = seed(SessionLocal, args.users)
+        counter = QueryCounter(engine)
+        rows = [
+            run(SessionLocal, counter, "uncached (decode + SELECT)", 0, tokens, args.requests),
+            run(SessionLocal, counter, "principal cache", 60, tokens, args.requests),
+        ]
+        print(f"{args.requests} authenticated requests across {args.users} users")
+        print_table(["mode", "queries/request", "mean us", "p99 us", "hit rate"], rows)
+    finally:
+        engine.dispose()
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
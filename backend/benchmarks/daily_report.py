@@ -0,0 +1,119 @@
+"""
+Daily report generation: runtime and peak RSS, legacy row loading vs grouped aggregates.
+
+Each mode runs in its own process so peak RSS is measured independently.
+
+    python -m benchmarks.daily_report --transactions 1000000
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from app.models.user import User
+from app.models.wallet import Wallet
+from app.models.transaction import Transaction, TransactionStatus, TransactionType
+from app.tasks.reporting import ReportingService
+from benchmarks.common import make_engine, print_table
+
+TYPES = [TransactionType.DEPOSIT, TransactionType.WITHDRAWAL, TransactionType.TRANSFER]
+CURRENCIES = ["USD", "EUR", "GBP"]
+USERS = 1000
+
+
+def seed(SessionLocal, count: int, chunk: int = 50000) -> None:
+    db = SessionLocal()
+    db.add_all([User(username=f"user{i}", email=f"user{i}@example.com") for i in range(USERS)])
+    db.flush()
+    db.add_all([Wallet(user_id=i + 1) for i in range(USERS)])
+    db.commit()
+
+    day_start = (datetime.utcnow() - timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    for offset in range(0, count, chunk):
+        db.execute(insert(Transaction), [
+            {
+                "user_id": i % USERS + 1,
+                "wallet_id": i % USERS + 1,
+                "transaction_type": TYPES[i % 3],
+                "amount": float(i % 500) + 0.5,
+                "currency": CURRENCIES[i % 3],
+                "status": TransactionStatus.COMPLETED,
+                "is_flagged": i % 1000 == 0,
+                "created_at": day_start + timedelta(seconds=86399 * i / count),
+            }
+            for i in range(offset, min(offset + chunk, count))
+        ])
+        db.commit()
+    db.close()
+
+
+def legacy_report(db, start: datetime, end: datetime) -> None:
+    """The row-loading implementation this benchmark replaces"""
+    transactions = db.query(Transaction).filter(Transaction.created_at.between(start, end)).all()
+    sum(t.amount for t in transactions)
+    for kind in ("DEPOSIT", "WITHDRAWAL", "TRANSFER"):
+        len([t for t in transactions if t.transaction_type == kind])
+    db.query(Transaction).filter(
+        Transaction.created_at.between(start, end), Transaction.is_flagged == True
+    ).all()
+    currency_stats = {}
+    for t in db.query(Transaction).filter(Transaction.created_at.between(start, end)).all():
+        stats = currency_stats.setdefault(t.currency, {"count": 0, "total_amount": 0})
+        stats["count"] += 1
+        stats["total_amount"] += t.amount
+
+
+def run_mode(path: str, mode: str) -> None:
+    _, SessionLocal, _ = make_engine(path)
+    db = SessionLocal()
+    yesterday = datetime.utcnow() - timedelta(days=1)
+    start = yesterday.replace(hour=0, minute=0, second=0, microsecond=0)
+    end = yesterday.replace(hour=23, minute=59, second=59, microsecond=999999)
+
+    began = time.perf_counter()
+    if mode == "legacy":
+        legacy_report(db, start, end)
+    else:
+        service = ReportingService(db)
+        totals = service._get_type_currency_totals(start, end)
+        service._get_transaction_stats(totals)
+        service._get_currency_stats(totals)
+        service._get_flagged_transactions(start, end)
+    elapsed = time.perf_counter() - began
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{elapsed:.2f} {peak_mb:.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--transactions", type=int, default=1000000)
+    parser.add_argument("--mode", choices=["legacy", "aggregate"])
+    parser.add_argument("--db")
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.db, args.mode)
+        return
+
+    engine, SessionLocal, path = make_engine()
+    try:
+        seed(SessionLocal, args.transactions)
+        engine.dispose()
+        rows = []
+        for mode in ("legacy", "aggregate"):
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.daily_report", "--mode", mode, "--db", path],
+                check=True, capture_output=True, text=True
+            ).stdout.split()
+            rows.append([mode, output[0], output[1]])
+        print(f"{args.transactions} transactions in one day")
+        print_table(["mode", "seconds", "peak RSS MB"], rows)
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Bulk export throughput in rows/sec, and peak memory, for each export format.
+
+    python -m benchmarks.export_throughput --transactions 10000000
+
+Each format runs in its own process so peak RSS reflects that export alone.
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from app.models.transaction import Transaction, TransactionStatus, TransactionType
+from app.schemas.transaction import ExportFormat, TransactionExportFilter
+from app.tasks.export import export_to_file
+from benchmarks.common import make_engine, print_table
+
+TYPES = [TransactionType.DEPOSIT, TransactionType.WITHDRAWAL, TransactionType.TRANSFER]
+CURRENCIES = ["USD", "EUR", "GBP"]
+START = datetime(2026, 1, 1)
+DAYS = 90
+
+
+def seed(SessionLocal, count: int, chunk: int = 50000) -> None:
+    db = SessionLocal()
+    for offset in range(0, count, chunk):
+        db.execute(insert(Transaction), [
+            {
+                "user_id": i % 1000 + 1,
+                "wallet_id": i % 1000 + 1,
+                "transaction_type": TYPES[i % 3],
+                "amount": float(i % 500) + 0.5,
+                "currency": CURRENCIES[i % 3],
+                "status": TransactionStatus.COMPLETED,
+                "description": f"payment {i}" if i % 4 == 0 else None,
+                "is_flagged": i % 1000 == 0,
+                "fraud_score": 0.0,
+                "created_at": START + timedelta(seconds=DAYS * 86400 * i / count),
+            }
+            for i in range(offset, min(offset + chunk, count))
+        ])
+        db.commit()
+    db.close()
+
+
+def run_format(path: str, fmt: ExportFormat) -> None:
+    _, SessionLocal, _ = make_engine(path)
+    db = SessionLocal()
+    filters = TransactionExportFilter(start_date=START, end_date=START + timedelta(days=DAYS))
+    fd, output = tempfile.mkstemp(suffix=f".{fmt.value}", prefix="export_")
+    os.close(fd)
+    try:
+        began = time.perf_counter()
+        rows = export_to_file(db, filters, fmt, output)
+        elapsed = time.perf_counter() - began
+        size_mb = os.path.getsize(output) / 1024 / 1024
+    finally:
+        db.close()
+        os.remove(output)
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{rows} {elapsed:.2f} {peak_mb:.0f} {size_mb:.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--transactions", type=int, default=10000000)
+    parser.add_argument("--format", choices=[f.value for f in ExportFormat])
+    parser.add_argument("--db")
+    args = parser.parse_args()
+
+    if args.format:
+        run_format(args.db, ExportFormat(args.format))
+        return
+
+    engine, SessionLocal, path = make_engine()
+    try:
+        seed(SessionLocal, args.transactions)
+        engine.dispose()
+        rows = []
+        for fmt in ExportFormat:
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.export_throughput", "--format", fmt.value, "--db", path],
+                check=True, capture_output=True, text=True
+            ).stdout.split()
+            count, seconds = int(output[0]), float(output[1])
+            rows.append([fmt.value, count, f"{seconds:.2f}", f"{count / seconds:,.0f}", output[2], output[3]])
+        print(f"{args.transactions} transactions exported")
+        print_table(["format", "rows", "seconds", "rows/sec", "peak RSS MB", "file MB"], rows)
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
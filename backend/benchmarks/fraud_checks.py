@@ -0,0 +1,115 @@
+"""
+Fraud check cost for a heavy user: queries per check and latency.
+
+    python -m benchmarks.fraud_checks --transactions 10000 --checks 200
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+from app.models.user import User
+from app.models.wallet import Wallet
+from app.models.transaction import Transaction, TransactionStatus, TransactionType
+from app.services.fraud_detection import FraudDetectionService
+from app.services.velocity import VelocityStore
+from app.config import RAPID_TRANSACTION_WINDOW
+from benchmarks.common import make_engine, QueryCounter, percentile, print_table
+
+
+def seed(SessionLocal, count: int) -> int:
+    db = SessionLocal()
+    sender = User(username="heavy", email="heavy@example.com")
+    recipient = User(username="merchant", email="merchant@example.com")
+    db.add_all([sender, recipient])
+    db.flush()
+    sender_id = sender.id
+    wallet = Wallet(user_id=sender.id, balance=0.0)
+    db.add(wallet)
+    db.flush()
+
+    today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    span = max((datetime.utcnow() - today_start).total_seconds(), 1)
+    db.bulk_insert_mappings(Transaction, [
+        {
+            "user_id": sender.id,
+            "wallet_id": wallet.id,
+            "transaction_type": TransactionType.TRANSFER,
+            "amount": 1.0,
+            "currency": "USD",
+            "status": TransactionStatus.COMPLETED,
+            "recipient_id": recipient.id,
+            "is_flagged": i % 100 == 0,
+            "created_at": today_start + timedelta(seconds=span * i / count),
+        }
+        for i in range(count)
+    ])
+    db.commit()
+    db.close()
+    return sender_id
+
+
+def legacy_check(db, user_id: int, amount: float) -> None:
+    """The row-loading implementation this benchmark replaces"""
+    window_start = datetime.utcnow() - timedelta(seconds=RAPID_TRANSACTION_WINDOW)
+    len(db.query(Transaction).filter(
+        Transaction.user_id == user_id,
+        Transaction.created_at >= window_start,
+        Transaction.status == TransactionStatus.COMPLETED
+    ).all())
+    today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    sum(t.amount for t in db.query(Transaction).filter(
+        Transaction.user_id == user_id,
+        Transaction.created_at >= today_start,
+        Transaction.status == TransactionStatus.COMPLETED
+    ).all())
+
+
+def run(SessionLocal, counter, name: str, check, checks: int) -> list:
+    db = SessionLocal()
+    check(db)  # warm up caches and cold-start loading
+    counter.reset()
+    samples = []
+    for _ in range(checks):
+        start = time.perf_counter()
+        check(db)
+        samples.append((time.perf_counter() - start) * 1000)
+        db.expunge_all()
+    db.close()
+    return [
+        name,
+        f"{counter.count / checks:.1f}",
+        f"{sum(samples) / checks:.3f}",
+        f"{percentile(samples, 99):.3f}",
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--transactions", type=int, default=10000)
+    parser.add_argument("--checks", type=int, default=200)
+    args = parser.parse_args()
+
+    engine, SessionLocal, path = make_engine()
+    try:
+        user_id = seed(SessionLocal, args.transactions)
+        counter = QueryCounter(engine)
+        store = VelocityStore()
+        rows = [
+            run(SessionLocal, counter, "legacy (ORM rows)",
+                lambda db: legacy_check(db, user_id, 10.0), args.checks),
+            run(SessionLocal, counter, "sql aggregate",
+                lambda db: FraudDetectionService(db, feature_source="sql")
+                .check_transaction(user_id, 10.0, "TRANSFER"), args.checks),
+            run(SessionLocal, counter, "memory counters",
+                lambda db: FraudDetectionService(db, velocity=store, feature_source="memory")
+                .check_transaction(user_id, 10.0, "TRANSFER"), args.checks),
+        ]
+        print(f"{args.transactions} same-day transactions, {args.checks} checks")
+        print_table(["mode", "queries/check", "mean ms", "p99 ms"], rows)
+    finally:
+        engine.dispose()
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
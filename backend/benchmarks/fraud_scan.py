@@ -0,0 +1,86 @@
+"""
+Daily fraud scan wall time as the worker pool grows.
+
+    python -m benchmarks.fraud_scan --users 2000 --transactions 200000 --workers 1 2 4 8 16
+"""
+import argparse
+import os
+import random
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from app.models.user import User
+from app.models.wallet import Wallet
+from app.models.transaction import Transaction, TransactionStatus, TransactionType
+from app.tasks import fraud_scan
+from app.utils.notifications import notifications
+from benchmarks.common import make_engine, timer, print_table
+
+
+def seed(SessionLocal, users: int, count: int) -> None:
+    db = SessionLocal()
+    db.bulk_insert_mappings(User, [
+        {"username": f"user{i}", "email": f"user{i}@example.com"} for i in range(users)
+    ])
+    db.bulk_insert_mappings(Wallet, [
+        {"user_id": i + 1, "balance": 0.0} for i in range(users)
+    ])
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    db.bulk_insert_mappings(Transaction, [
+        {
+            "user_id": (user_id := rng.randint(1, users)),
+            "wallet_id": user_id,
+            "transaction_type": TransactionType.TRANSFER,
+            "amount": rng.choice((10.0, 250.0, 6000.0)),
+            "currency": "USD",
+            "status": TransactionStatus.COMPLETED,
+            "recipient_id": rng.randint(1, users),
+            "is_flagged": i % 500 == 0,
+            "created_at": now - timedelta(seconds=rng.uniform(0, 86000)),
+        }
+        for i in range(count)
+    ])
+    db.commit()
+    db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--transactions", type=int, default=200000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    engine, SessionLocal, path = make_engine()
+    # Score against a lower cut-off so the write-back path is exercised too
+    fraud_scan.HIGH_RISK_THRESHOLD = 0.4
+    notifications.enqueue = lambda **kwargs: True
+    try:
+        seed(SessionLocal, args.users, args.transactions)
+        rows = []
+        for workers in args.workers:
+            db = SessionLocal()
+            db.execute(update(Transaction).where(Transaction.fraud_score.isnot(None)).values(
+                is_flagged=False, fraud_score=None, flag_reason=None
+            ))
+            db.commit()
+            with timer() as elapsed:
+                result = fraud_scan.run_daily_fraud_scan(db, workers=workers)
+            db.close()
+            shard_seconds = [shard["seconds"] for shard in result["shards"]]
+            rows.append([
+                workers,
+                result["scanned_transactions"],
+                result["flagged_transactions"],
+                f"{elapsed['seconds']:.2f}",
+                f"{max(shard_seconds):.2f}",
+            ])
+        print(f"{args.transactions} transactions across {args.users} users")
+        print_table(["workers", "scanned", "flagged", "wall s", "slowest shard s"], rows)
+    finally:
+        engine.dispose()
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
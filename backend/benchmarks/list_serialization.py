@@ -0,0 +1,129 @@
+"""
+Per-row cost of a list endpoint: ORM objects through FastAPI's response_model
+serialization vs column rows through a TypeAdapter and orjson.
+
+    python -m benchmarks.list_serialization --rows 5000 --repeat 20
+"""
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy import insert, select
+from app.core.models import TransactionStatus, TransactionType
+from app.models.transaction import Transaction
+from app.utils.serialization import fast_response, schema_columns
+from benchmarks.common import make_engine, print_table
+
+
+class TransactionRow(BaseModel):
+    """The fields a transaction list returns"""
+    id: int
+    user_id: int
+    recipient_id: Optional[int]
+    transaction_type: TransactionType
+    amount: float
+    currency: str
+    status: TransactionStatus
+    description: Optional[str]
+    is_flagged: bool
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+def seed(SessionLocal, count: int) -> None:
+    db = SessionLocal()
+    start = datetime(2026, 1, 1)
+    db.execute(insert(Transaction), [
+        {
+            "user_id": 1,
+            "wallet_id": 1,
+            "recipient_id": 2 if i % 3 == 2 else None,
+            "transaction_type": list(TransactionType)[i % 3],
+            "amount": float(i % 500) + 0.5,
+            "currency": "USD",
+            "status": TransactionStatus.COMPLETED,
+            "description": f"payment {i}",
+            "is_flagged": i % 100 == 0,
+            "created_at": start + timedelta(seconds=i),
+        }
+        for i in range(count)
+    ])
+    db.commit()
+    db.close()
+
+
+# serialize_response is a coroutine; one loop for all runs keeps loop setup out of the timings
+loop = asyncio.new_event_loop()
+response_field = create_response_field(name="response", type_=List[TransactionRow])
+
+
+def load_orm(db, limit: int) -> list:
+    return db.query(Transaction).order_by(Transaction.id).limit(limit).all()
+
+
+def load_columns(db, limit: int) -> list:
+    stmt = select(*schema_columns(Transaction, TransactionRow)).order_by(Transaction.id).limit(limit)
+    return db.connection().execute(stmt).all()
+
+
+def render_orm(rows: list) -> bytes:
+    """What the endpoints did: FastAPI validates the response_model and walks it with jsonable_encoder"""
+    content = loop.run_until_complete(serialize_response(field=response_field, response_content=rows))
+    return JSONResponse(content).body
+
+
+def render_fast(rows: list) -> bytes:
+    return fast_response(List[TransactionRow], rows).body
+
+
+def measure(SessionLocal, load, render, limit: int, repeat: int) -> tuple:
+    """Best (total, serialization only) seconds over repeat runs, each in a fresh session"""
+    best_total = best_render = float("inf")
+    for _ in range(repeat):
+        db = SessionLocal()
+        start = time.perf_counter()
+        rows = load(db, limit)
+        loaded = time.perf_counter()
+        render(rows)
+        end = time.perf_counter()
+        best_total = min(best_total, end - start)
+        best_render = min(best_render, end - loaded)
+        db.close()
+    return best_total, best_render
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    engine, SessionLocal, path = make_engine()
+    try:
+        seed(SessionLocal, args.rows)
+        db = SessionLocal()
+        assert render_orm(load_orm(db, 10)) == render_fast(load_columns(db, 10)), "both paths must render the same JSON"
+        db.close()
+
+        rows = []
+        for limit in (100, 1000, args.rows):
+            before = measure(SessionLocal, load_orm, render_orm, limit, args.repeat)
+            after = measure(SessionLocal, load_columns, render_fast, limit, args.repeat)
+            for label, b, a in (("query + serialize", before[0], after[0]), ("serialize only", before[1], after[1])):
+                rows.append([limit, label, f"{b / limit * 1e6:.1f}", f"{a / limit * 1e6:.1f}", f"{b / a:.1f}x"])
+        print("us per row, best of", args.repeat)
+        print_table(["page size", "measured", "ORM + response_model", "columns + TypeAdapter + orjson", "speedup"], rows)
+    finally:
+        engine.dispose()
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Login throughput under bursts, and how badly a burst starves other sync endpoints.
+
+The previous login verified bcrypt on an anyio threadpool worker; the current
+one verifies on the dedicated password pool. While the burst runs, a probe
+keeps calling a trivial sync endpoint to measure threadpool starvation.
+
+    python -m benchmarks.login_throughput --concurrency 1 8 32 64 --requests 128
+"""
+import argparse
+import asyncio
+import os
+import time
+from fastapi import Depends, FastAPI, HTTPException
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.orm import Session
+from app.api import auth as auth_api
+from app.core.passwords import pwd_context
+from app.crud import user as crud_user
+from app.models.user import User
+from app.schemas.user import UserLogin
+from benchmarks.common import make_engine, percentile, print_table
+
+
+def build_app(SessionLocal, blocking: bool) -> FastAPI:
+    def get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+
+    @app.get("/ping")
+    def ping():
+        return {}
+
+    if blocking:
+        # The previous implementation: bcrypt on the request's threadpool worker
+        @app.post("/auth/login")
+        def login(user: UserLogin, db: Session = Depends(get_db)):
+            db_user = crud_user.get_user_by_username(db, user.username)
+            if not db_user or not crud_user.verify_password(user.password, db_user.hashed_password):
+                raise HTTPException(status_code=401, detail="Invalid credentials")
+            return {"access_token": "x"}
+    else:
+        app.include_router(auth_api.router, prefix="/auth")
+        app.dependency_overrides[auth_api.get_read_db] = get_db
+        # Rehashes and registrations open their own writer session
+        auth_api.SessionLocal = SessionLocal
+    return app
+
+
+async def burst(app: FastAPI, requests: int, concurrency: int) -> list:
+    login_samples, probe_samples = [], []
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        done = asyncio.Event()
+
+        async def worker(count: int):
+            for i in range(count):
+                start = time.perf_counter()
+                response = await client.post(
+                    "/auth/login", json={"username": f"user{i % 16}", "password": "password123"}
+                )
+                response.raise_for_status()
+                login_samples.append((time.perf_counter() - start) * 1000)
+
+        async def probe():
+            while not done.is_set():
+                start = time.perf_counter()
+                (await client.get("/ping")).raise_for_status()
+                probe_samples.append((time.perf_counter() - start) * 1000)
+                await asyncio.sleep(0.01)
+
+        probe_task = asyncio.create_task(probe())
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(requests // concurrency) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await probe_task
+    return [
+        f"{len(login_samples) / elapsed:.1f}",
+        f"{percentile(login_samples, 99):.0f}",
+        f"{percentile(probe_samples, 99):.1f}",
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--requests", type=int, default=128)
+    args = parser.parse_args()
+
+    engine, SessionLocal, path = make_engine(pool_size=max(args.concurrency))
+    try:
+        db = SessionLocal()
+        hashed = pwd_context.hash("password123")
+        db.add_all([
+            User(username=f"user{i}", email=f"user{i}@example.com", hashed_password=hashed)
+            for i in range(16)
+        ])
+        db.commit()
+        db.close()
+
+        rows = []
+        for concurrency in args.concurrency:
+            for name, blocking in (("threadpool bcrypt", True), ("password pool", False)):
+                app = build_app(SessionLocal, blocking)
+                rows.append([name, concurrency, *asyncio.run(burst(app, args.requests, concurrency))])
+        print(f"{args.requests} logins per run, bcrypt cost {hashed.split('$')[2]}")
+        print_table(["login path", "concurrency", "logins/s", "login p99 ms", "probe p99 ms"], rows)
+    finally:
+        engine.dispose()
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
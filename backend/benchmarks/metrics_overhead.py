@@ -0,0 +1,97 @@
+"""
+Per-request cost of MetricsMiddleware and the cost of a /metrics scrape.
+
+    python -m benchmarks.metrics_overhead --requests 20000 --routes 50
+
+Requests are sent straight into the ASGI app, without a server or HTTP
+client, so the difference between the two runs is the middleware alone.
+"""
+import argparse
+import asyncio
+import time
+from fastapi import FastAPI
+from app.middlewares.metrics import MetricsMiddleware
+from app.utils import metrics
+from benchmarks.common import print_table
+
+
+class _Route:
+    path_format = "/items/{item_id}"
+
+
+async def bare_app(scope, receive, send):
+    """Stands in for the router: matches a route and sends an empty response"""
+    scope["route"] = _Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+def make_app(instrumented: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"id": item_id}
+
+    if instrumented:
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+
+async def call(app, path: str) -> None:
+    scope = {
+        "type": "http", "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+        "headers": [], "client": ("127.0.0.1", 1234), "server": ("testserver", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    await app(scope, receive, send)
+
+
+async def run(app, requests: int) -> float:
+    start = time.perf_counter()
+    for i in range(requests):
+        await call(app, f"/items/{i}")
+    return (time.perf_counter() - start) / requests
+
+
+def best_of(app, requests: int, rounds: int = 3) -> float:
+    """Best mean seconds per request; rounds alternate with the other app's, which evens out noise"""
+    return min(asyncio.run(run(app, requests)) for _ in range(rounds))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--routes", type=int, default=50, help="route templates with samples when scraping")
+    args = parser.parse_args()
+
+    rows = []
+    for label, plain, instrumented in (
+        ("middleware alone", bare_app, MetricsMiddleware(bare_app)),
+        ("FastAPI route", make_app(False), make_app(True)),
+    ):
+        before, after = best_of(plain, args.requests), best_of(instrumented, args.requests)
+        rows.append([label, f"{before * 1e6:.1f}", f"{after * 1e6:.1f}", f"{(after - before) * 1e6:.1f}"])
+    print(f"{args.requests} requests, best mean us per request of 3 rounds")
+    print_table(["app", "without metrics", "with metrics", "overhead"], rows)
+
+    for i in range(args.routes):
+        for status in ("200", "404", "500"):
+            metrics.http_requests.inc("GET", f"/route/{i}", status)
+        metrics.http_request_duration.observe(0.01, "GET", f"/route/{i}")
+    metrics.render()  # the first scrape imports the pool and email collectors
+    start = time.perf_counter()
+    text = metrics.render()
+    elapsed = time.perf_counter() - start
+    print(f"scrape with {args.routes} routes: {len(text.splitlines())} lines in {elapsed * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
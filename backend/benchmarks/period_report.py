@@ -0,0 +1,80 @@
+"""
+Monthly report cost: aggregating 30 days of raw transactions vs summing daily rollups.
+
+    python -m benchmarks.period_report --transactions 1000000
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from app.models.rollup import DailyTransactionRollup  # noqa: F401  register the rollup table
+from app.models.transaction import Transaction, TransactionStatus, TransactionType
+from app.tasks.rollups import aggregate_range, backfill_rollups, day_bounds, summarize_rollups
+from benchmarks.common import make_engine, print_table
+
+TYPES = [TransactionType.DEPOSIT, TransactionType.WITHDRAWAL, TransactionType.TRANSFER]
+CURRENCIES = ["USD", "EUR", "GBP"]
+DAYS = 30
+
+
+def seed(SessionLocal, count: int, chunk: int = 50000) -> None:
+    db = SessionLocal()
+    first_day = datetime.combine(datetime.utcnow().date() - timedelta(days=DAYS), datetime.min.time())
+    for offset in range(0, count, chunk):
+        db.execute(insert(Transaction), [
+            {
+                "user_id": i % 1000 + 1,
+                "wallet_id": i % 1000 + 1,
+                "transaction_type": TYPES[i % 3],
+                "amount": float(i % 500) + 0.5,
+                "currency": CURRENCIES[i % 3],
+                "status": TransactionStatus.COMPLETED,
+                "is_flagged": i % 1000 == 0,
+                "created_at": first_day + timedelta(seconds=DAYS * 86399 * i / count),
+            }
+            for i in range(offset, min(offset + chunk, count))
+        ])
+        db.commit()
+    db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--transactions", type=int, default=1000000)
+    args = parser.parse_args()
+
+    engine, SessionLocal, path = make_engine()
+    try:
+        seed(SessionLocal, args.transactions)
+        end = datetime.utcnow().date() - timedelta(days=1)
+        start = end - timedelta(days=DAYS - 1)
+        db = SessionLocal()
+
+        began = time.perf_counter()
+        raw = aggregate_range(db, day_bounds(start)[0], day_bounds(end)[1])
+        raw_seconds = time.perf_counter() - began
+
+        began = time.perf_counter()
+        backfill_rollups(db, start, end)
+        backfill_seconds = time.perf_counter() - began
+
+        began = time.perf_counter()
+        rolled = summarize_rollups(db, start, end)
+        rollup_seconds = time.perf_counter() - began
+        db.close()
+
+        assert sum(r.txn_count for r in raw) == sum(r.txn_count for r in rolled)
+        print(f"{args.transactions} transactions over {DAYS} days")
+        print_table(["method", "seconds"], [
+            ["raw 30-day aggregate", f"{raw_seconds:.3f}"],
+            ["one-off backfill of 30 rollup days", f"{backfill_seconds:.3f}"],
+            ["sum of daily rollups", f"{rollup_seconds:.4f}"],
+        ])
+    finally:
+        engine.dispose()
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
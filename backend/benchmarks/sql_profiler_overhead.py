@@ -0,0 +1,55 @@
+"""
+Per-statement cost of the SQL profiler's engine hooks.
+
+    python -m benchmarks.sql_profiler_overhead --statements 20000
+
+Runs the same small SELECT on an in-memory SQLite engine without hooks, with
+hooks but no request being profiled, and inside a profiled request.
+"""
+import argparse
+import time
+from sqlalchemy import create_engine, text
+from app.utils.sql_profiler import RequestProfile, current_profile, instrument_engine
+from benchmarks.common import print_table
+
+
+def run(engine, statements: int) -> float:
+    query = text("SELECT :id")
+    with engine.connect() as conn:
+        start = time.perf_counter()
+        for i in range(statements):
+            conn.execute(query, {"id": i}).scalar()
+        return (time.perf_counter() - start) / statements
+
+
+def best_of(engine, statements: int, rounds: int = 3) -> float:
+    return min(run(engine, statements) for _ in range(rounds))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--statements", type=int, default=20000)
+    args = parser.parse_args()
+
+    plain = create_engine("sqlite://")
+    instrumented = create_engine("sqlite://")
+    instrument_engine(instrumented)
+
+    baseline = best_of(plain, args.statements)
+    idle = best_of(instrumented, args.statements)
+    token = current_profile.set(RequestProfile("benchmark"))
+    try:
+        profiled = best_of(instrumented, args.statements)
+    finally:
+        current_profile.reset(token)
+
+    rows = [
+        [label, f"{seconds * 1e6:.1f}", f"{(seconds - baseline) * 1e6:.1f}"]
+        for label, seconds in (("no hooks", baseline), ("hooks, no request", idle), ("profiled request", profiled))
+    ]
+    print(f"{args.statements} statements, best mean us per statement of 3 rounds")
+    print_table(["engine", "us per statement", "overhead"], rows)
+
+
+if __name__ == "__main__":
+    main()
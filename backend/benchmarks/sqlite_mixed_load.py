@@ -0,0 +1,123 @@
+"""
+Mixed read/write load on SQLite: one shared pool vs the production profile.
+
+Readers look up a wallet balance; writers run the read-modify-write of a
+deposit (read balance, insert transaction, update balance) in one transaction.
+
+    python -m benchmarks.sqlite_mixed_load --readers 8 --writers 4 --seconds 5
+"""
+import argparse
+import os
+import random
+import threading
+import time
+from sqlalchemy import select, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from app.core import engine as engine_module
+from app.core.config import settings
+from app.models.user import User
+from app.models.wallet import Wallet
+from app.models.transaction import Transaction, TransactionStatus, TransactionType
+from benchmarks.common import make_engine, percentile, print_table
+
+
+def seed(SessionLocal, users: int) -> None:
+    db = SessionLocal()
+    db.bulk_insert_mappings(User, [
+        {"username": f"user{i}", "email": f"user{i}@example.com"} for i in range(users)
+    ])
+    db.bulk_insert_mappings(Wallet, [{"user_id": i + 1, "balance": 0.0} for i in range(users)])
+    db.commit()
+    db.close()
+
+
+def read_balance(db, user_id: int) -> None:
+    db.execute(select(Wallet.balance).where(Wallet.user_id == user_id)).scalar()
+
+
+def deposit(db, user_id: int) -> None:
+    balance = db.execute(select(Wallet.balance).where(Wallet.user_id == user_id)).scalar()
+    db.add(Transaction(
+        user_id=user_id, wallet_id=user_id, transaction_type=TransactionType.DEPOSIT,
+        amount=1.0, currency="USD", status=TransactionStatus.COMPLETED,
+    ))
+    db.execute(update(Wallet).where(Wallet.user_id == user_id).values(balance=balance + 1.0))
+    db.commit()
+
+
+def run(ReadSession, WriteSession, args) -> dict:
+    stop = threading.Event()
+    results = {"reads": [], "writes": [], "errors": 0}
+    lock = threading.Lock()
+
+    def loop(Session, op, key):
+        rng = random.Random()
+        while not stop.is_set():
+            db = Session()
+            start = time.perf_counter()
+            try:
+                op(db, rng.randint(1, args.users))
+                elapsed = (time.perf_counter() - start) * 1000
+                with lock:
+                    results[key].append(elapsed)
+            except OperationalError:
+                db.rollback()
+                with lock:
+                    results["errors"] += 1
+            finally:
+                db.close()
+
+    threads = [threading.Thread(target=loop, args=(ReadSession, read_balance, "reads")) for _ in range(args.readers)]
+    threads += [threading.Thread(target=loop, args=(WriteSession, deposit, "writes")) for _ in range(args.writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    rows = []
+    for profile in ("shared pool", "production profile"):
+        setup_engine, SetupSession, path = make_engine()
+        seed(SetupSession, args.users)
+        setup_engine.dispose()
+        url = f"sqlite:///{path}"
+        # Same factory either way; the profile adds WAL, the read pool and the single writer
+        settings.SQLITE_PRODUCTION_PROFILE = profile == "production profile"
+        writer = engine_module._create_engine(url, False, "bench", role="primary")
+        reader = engine_module._create_engine(url, False, "bench_read", role="read")
+        engines = [writer, reader]
+        WriteSession, ReadSession = sessionmaker(bind=writer), sessionmaker(bind=reader)
+        try:
+            results = run(ReadSession, WriteSession, args)
+        finally:
+            for engine in engines:
+                engine.dispose()
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+        rows.append([
+            profile,
+            f"{len(results['reads']) / args.seconds:.0f}",
+            f"{percentile(results['reads'], 99):.1f}",
+            f"{len(results['writes']) / args.seconds:.0f}",
+            f"{percentile(results['writes'], 99):.1f}",
+            results["errors"],
+        ])
+    print(f"{args.readers} readers, {args.writers} writers, {args.seconds}s per run")
+    print_table(["engine", "reads/s", "read p99 ms", "writes/s", "write p99 ms", "locked errors"], rows)
+
+
+if __name__ == "__main__":
+    main()
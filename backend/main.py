@@ -1,9 +1,13 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from app.config import METRICS_ENABLED
 from app.core.config import settings
 from app.api.v1.api import api_router
 from app.core.database import engine
 from app.core.models import Base
+from app.middlewares.metrics import MetricsMiddleware
+from app.middlewares.sql_profiler import SQLProfilerMiddleware
+from app.utils import metrics
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
@@ -23,10 +27,20 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if settings.SQL_PROFILING:
+    app.add_middleware(SQLProfilerMiddleware)
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    metrics.track_committed_transactions()
 
 # Include API router
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    # Prometheus text format
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to Digital Wallet API"} 
\ No newline at end of file
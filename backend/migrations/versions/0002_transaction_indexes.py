@@ -0,0 +1,38 @@
+"""composite and partial indexes for hot transaction queries
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 17:32:05.104215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_transactions_user_created', 'transactions', ['user_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_transactions_user_status_created', 'transactions', ['user_id', 'status', 'created_at'], unique=False)
+    op.create_index('ix_transactions_recipient_flagged', 'transactions', ['recipient_id', 'is_flagged'], unique=False)
+    op.create_index('ix_transactions_created_at', 'transactions', ['created_at'], unique=False)
+    op.create_index(
+        'ix_transactions_flagged_created', 'transactions', ['created_at'], unique=False,
+        sqlite_where=sa.text('is_flagged = 1'),
+        postgresql_where=sa.text('is_flagged = true'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_transactions_flagged_created', table_name='transactions')
+    op.drop_index('ix_transactions_created_at', table_name='transactions')
+    op.drop_index('ix_transactions_recipient_flagged', table_name='transactions')
+    op.drop_index('ix_transactions_user_status_created', table_name='transactions')
+    op.drop_index('ix_transactions_user_created', table_name='transactions')
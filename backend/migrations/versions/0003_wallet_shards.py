@@ -0,0 +1,37 @@
+"""hot wallet shards
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 19:05:41.512377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('wallets') as batch_op:
+        batch_op.add_column(sa.Column('shard_count', sa.Integer(), server_default='0', nullable=False))
+    op.create_table('wallet_shards',
+    sa.Column('wallet_id', sa.Integer(), nullable=False),
+    sa.Column('shard', sa.Integer(), nullable=False),
+    sa.Column('balance', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['wallet_id'], ['wallets.id'], ),
+    sa.PrimaryKeyConstraint('wallet_id', 'shard')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('wallet_shards')
+    with op.batch_alter_table('wallets') as batch_op:
+        batch_op.drop_column('shard_count')
@@ -0,0 +1,43 @@
+"""daily transaction rollups
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 20:57:03.681245
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The enum type already exists from 0001
+transaction_type = sa.Enum('DEPOSIT', 'WITHDRAWAL', 'TRANSFER', name='transactiontype').with_variant(
+    postgresql.ENUM('DEPOSIT', 'WITHDRAWAL', 'TRANSFER', name='transactiontype', create_type=False), 'postgresql'
+)
+
+
+def upgrade() -> None:
+    op.create_table('daily_transaction_rollups',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('currency', sa.String(), nullable=False),
+    sa.Column('transaction_type', transaction_type, nullable=False),
+    sa.Column('txn_count', sa.Integer(), nullable=False),
+    sa.Column('total_amount', sa.Float(), nullable=False),
+    sa.Column('min_amount', sa.Float(), nullable=True),
+    sa.Column('max_amount', sa.Float(), nullable=True),
+    sa.Column('flagged_count', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('day', 'currency', 'transaction_type')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('daily_transaction_rollups')
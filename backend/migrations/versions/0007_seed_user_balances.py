@@ -0,0 +1,34 @@
+"""seed user balances from wallets
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 22:41:37.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Wallets are the source of truth; rows derived from the ledger alone miss opening balances
+    op.execute("DELETE FROM user_balances")
+    op.execute(sa.text(
+        "INSERT INTO user_balances (user_id, currency, balance, version, updated_at) "
+        "SELECT w.user_id, COALESCE(CAST(w.currency AS VARCHAR), 'USD'), "
+        "w.balance + COALESCE((SELECT SUM(s.balance) FROM wallet_shards s WHERE s.wallet_id = w.id), 0), "
+        "1, CURRENT_TIMESTAMP "
+        "FROM wallets w WHERE w.user_id IS NOT NULL"
+    ))
+
+
+def downgrade() -> None:
+    pass
@@ -0,0 +1,15 @@
+# One-off backfill/rebuild of the materialized user_balances table
+from app.database import SessionLocal, engine
+from app.models import user, wallet  # <-- ensure referenced tables are registered
+from app.models.balance import UserBalance
+from app.crud.balance import rebuild_user_balances
+
+UserBalance.__table__.create(bind=engine, checkfirst=True)
+
+db = SessionLocal()
+try:
+    count = rebuild_user_balances(db)
+finally:
+    db.close()
+
+print(f"✅ Rebuilt {count} user balances.")
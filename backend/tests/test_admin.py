@@ -1 +1,77 @@
- 
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.main import app
+from app.api import admin
+from app.database import Base
+from app.models.user import User
+from app.models.wallet import Wallet
+from app.models.transaction import Transaction, TransactionStatus, TransactionType
+
+engine = create_engine(
+    "sqlite://",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def override_get_db():
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+client = TestClient(app)
+
+def setup_module():
+    Base.metadata.create_all(bind=engine)
+    app.dependency_overrides[admin.get_db] = override_get_db
+    app.dependency_overrides[admin.get_read_db] = override_get_db
+    db = TestingSessionLocal()
+    alice = User(username="alice", email="alice@example.com")
+    bob = User(username="bob", email="bob@example.com")
+    db.add_all([alice, bob])
+    db.flush()
+    wallet = Wallet(user_id=alice.id)
+    db.add(wallet)
+    db.flush()
+    db.add_all([
+        Transaction(user_id=alice.id, wallet_id=wallet.id, transaction_type=TransactionType.DEPOSIT,
+                    amount=100.0, currency="USD", status=TransactionStatus.COMPLETED),
+        Transaction(user_id=alice.id, wallet_id=wallet.id, transaction_type=TransactionType.TRANSFER,
+                    amount=40.0, currency="USD", recipient_id=bob.id, status=TransactionStatus.COMPLETED),
+        Transaction(user_id=alice.id, wallet_id=wallet.id, transaction_type=TransactionType.WITHDRAWAL,
+                    amount=10.0, currency="USD", status=TransactionStatus.COMPLETED),
+    ])
+    db.commit()
+    db.close()
+    admin.analytics_cache.clear()
+
+def teardown_module():
+    app.dependency_overrides.pop(admin.get_db, None)
+    app.dependency_overrides.pop(admin.get_read_db, None)
+    Base.metadata.drop_all(bind=engine)
+
+def test_admin_analytics():
+    assert client.get("/admin/total-balances").json() == {"total_balance": 90.0}
+    assert client.get("/admin/top-users").json() == [
+        {"user": "alice", "transaction_volume": 150.0},
+        {"user": "bob", "transaction_volume": 40.0},
+    ]
+
+def test_admin_analytics_cache_invalidated_on_commit():
+    client.get("/admin/total-balances")
+    hits = admin.analytics_cache.hits
+    client.get("/admin/total-balances")
+    assert admin.analytics_cache.hits == hits + 1
+
+    db = TestingSessionLocal()
+    alice = db.query(User).filter(User.username == "alice").first()
+    db.add(Transaction(user_id=alice.id, wallet_id=alice.wallet.id, transaction_type=TransactionType.DEPOSIT,
+                       amount=5.0, currency="USD", status=TransactionStatus.COMPLETED))
+    db.commit()
+    db.close()
+
+    assert client.get("/admin/total-balances").json() == {"total_balance": 95.0}
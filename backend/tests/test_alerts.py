@@ -0,0 +1,48 @@
+import time
+from app.utils.alerts import AlertDigester
+
+
+def test_alerts_coalesce_per_recipient():
+    sent = []
+    digester = AlertDigester(window=60, max_items=2, send=lambda **kwargs: sent.append(kwargs))
+    for amount in (10, 20, 30):
+        digester.add("a@example.com", "Multiple rapid transfers", f"{amount} USD")
+    digester.add("a@example.com", "Large withdrawal", "40 USD")
+    digester.add("b@example.com", "Large withdrawal", "50 USD")
+    assert sent == []
+
+    assert digester.flush(["a@example.com"]) == 1
+    assert len(sent) == 1
+    body = sent[0]["body"]
+    assert sent[0]["subject"] == "Suspicious Activity Alert: 4 transactions flagged"
+    assert body.count("Multiple rapid transfers") == 1
+    assert "Multiple rapid transfers (3x)" in body
+    assert "... and 2 more" in body
+
+    digester.stop()
+    assert len(sent) == 2
+    assert sent[1]["to_email"] == "b@example.com"
+    assert sent[1]["subject"] == "Suspicious Transaction Alert"
+    assert digester.pending == 0
+
+
+def test_window_expiry_sends_digest():
+    sent = []
+    digester = AlertDigester(window=0.05, send=lambda **kwargs: sent.append(kwargs))
+    digester.add("a@example.com", "Large withdrawal", "10 USD")
+    digester.add("a@example.com", "Large withdrawal", "20 USD")
+
+    deadline = time.monotonic() + 2
+    while not sent and time.monotonic() < deadline:
+        time.sleep(0.01)
+    digester.stop()
+    assert len(sent) == 1
+    assert "Large withdrawal (2x)" in sent[0]["body"]
+
+
+def test_zero_window_sends_immediately():
+    sent = []
+    digester = AlertDigester(window=0, send=lambda **kwargs: sent.append(kwargs))
+    digester.add("a@example.com", "Large withdrawal", "10 USD")
+    assert len(sent) == 1
+    assert digester.pending == 0
@@ -0,0 +1,83 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.core.database import Base
+from app.core.models import User
+from app.core.security import (
+    authenticate_token,
+    create_access_token,
+    create_refresh_token,
+    invalidate_principal,
+    principal_cache,
+    token_cache,
+)
+from app.schemas.user import CurrentUser
+
+engine = create_engine(
+    "sqlite://",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+statements = []
+
+def count_statement(conn, cursor, statement, *args):
+    statements.append(statement)
+
+def setup_module():
+    Base.metadata.create_all(bind=engine)
+    event.listen(engine, "before_cursor_execute", count_statement)
+    token_cache.clear()
+    principal_cache.clear()
+
+def teardown_module():
+    event.remove(engine, "before_cursor_execute", count_statement)
+    Base.metadata.drop_all(bind=engine)
+
+def test_cached_principal_skips_user_query():
+    db = TestingSessionLocal()
+    user = User(email="cached@example.com", is_active=True, is_admin=False)
+    db.add(user)
+    db.commit()
+    token = create_access_token(user.id)
+
+    statements.clear()
+    principal = authenticate_token(db, token)
+    assert len(statements) == 1
+    assert (principal.id, principal.email, principal.is_active) == (user.id, "cached@example.com", True)
+
+    statements.clear()
+    assert authenticate_token(db, token) == principal
+    assert statements == []
+    assert principal_cache.hits >= 1 and token_cache.hits >= 1
+    # /users/me renders the snapshot without going back to the row
+    assert CurrentUser.model_validate(principal).model_dump() == {
+        "id": user.id, "email": "cached@example.com", "username": None, "is_active": True, "is_admin": False
+    }
+    db.close()
+
+def test_invalidation_picks_up_deactivation():
+    db = TestingSessionLocal()
+    user = User(email="deactivated@example.com", is_active=True)
+    db.add(user)
+    db.commit()
+    token = create_access_token(user.id)
+    authenticate_token(db, token)
+
+    user.is_active = False
+    db.commit()
+    invalidate_principal(user.id)
+    with pytest.raises(HTTPException) as exc:
+        authenticate_token(db, token)
+    assert exc.value.status_code == 400
+    db.close()
+
+def test_rejects_refresh_and_garbage_tokens():
+    db = TestingSessionLocal()
+    for token in (create_refresh_token(1), "not-a-token"):
+        with pytest.raises(HTTPException) as exc:
+            authenticate_token(db, token)
+        assert exc.value.status_code == 401
+    db.close()
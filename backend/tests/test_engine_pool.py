@@ -0,0 +1,119 @@
+import logging
+import threading
+import time
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
+from app.core import engine as engine_module
+from app.core.config import settings
+from app.middlewares.request_context import current_endpoint
+from app.utils.db_retry import is_retryable_error
+
+def test_pool_metrics_and_exhaustion_warning(tmp_path, monkeypatch, caplog):
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 1)
+    monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 0)
+    monkeypatch.setattr(settings, "DB_POOL_TIMEOUT", 0.1)
+    monkeypatch.setattr(engine_module, "_engines", {})
+    engine = engine_module.get_engine(f"sqlite:///{tmp_path / 'pool.db'}", name="test")
+    assert engine_module.get_engine(f"sqlite:///{tmp_path / 'pool.db'}") is engine
+
+    held = engine.connect()
+    held.execute(text("SELECT 1"))
+    token = current_endpoint.set("GET /wallet/balance")
+    try:
+        with caplog.at_level(logging.WARNING, logger="app.core.engine"):
+            with pytest.raises(PoolTimeoutError):
+                engine.connect()
+    finally:
+        current_endpoint.reset(token)
+
+    stats = engine_module.pool_stats()["test"]
+    assert stats["in_use"] == 1
+    assert stats["exhausted"] == 1
+    assert stats["checkouts"] == 1
+    assert "GET /wallet/balance waiting" in caplog.text
+
+    held.close()
+    assert engine_module.pool_stats()["test"]["in_use"] == 0
+    engine.dispose()
+
+def test_memory_database_uses_single_shared_connection(monkeypatch):
+    monkeypatch.setattr(engine_module, "_engines", {})
+    engine = engine_module.get_engine("sqlite://")
+    assert engine_module.is_memory_database(engine.url)
+    assert engine_module.pool_stats() == {}
+
+def test_sqlite_profile_uses_wal_and_read_only_reader(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "SQLITE_PRODUCTION_PROFILE", True)
+    monkeypatch.setattr(engine_module, "_engines", {})
+    url = f"sqlite:///{tmp_path / 'profile.db'}"
+    writer = engine_module.get_engine(url, name="writer")
+    reader = engine_module.get_engine(url, name="reader", role="read")
+    assert reader is not writer
+    assert engine_module.pool_stats()["writer"]["size"] == 1
+
+    with writer.begin() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY)"))
+        conn.execute(text("INSERT INTO items (id) VALUES (1)"))
+    with reader.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM items")).scalar() == 1
+        with pytest.raises(OperationalError):
+            conn.execute(text("INSERT INTO items (id) VALUES (2)"))
+    writer.dispose()
+    reader.dispose()
+
+def test_writer_transactions_do_not_interleave(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "SQLITE_PRODUCTION_PROFILE", True)
+    monkeypatch.setattr(settings, "SQLITE_BUSY_TIMEOUT_MS", 100)
+    monkeypatch.setattr(engine_module, "_engines", {})
+    url = f"sqlite:///{tmp_path / 'immediate.db'}"
+    writer = engine_module.get_engine(url, name="writer")
+    # A writer in another process, which has a pool of its own
+    other = engine_module._create_engine(url, False, "other")
+    with writer.begin() as conn:
+        conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, qty INTEGER)"))
+        conn.execute(text("INSERT INTO items VALUES (1, 0)"))
+
+    # BEGIN IMMEDIATE holds the write lock from the first read, so the other
+    # writer waits instead of invalidating the snapshot being written back
+    reading = writer.connect()
+    reading.begin()
+    qty = reading.execute(text("SELECT qty FROM items")).scalar()
+    with pytest.raises(OperationalError) as exc:
+        with other.begin() as conn:
+            conn.execute(text("UPDATE items SET qty = 1"))
+    assert is_retryable_error(exc.value)
+    reading.execute(text("UPDATE items SET qty = :qty"), {"qty": qty + 10})
+    reading.commit()
+    reading.close()
+    with other.connect() as conn:
+        assert conn.execute(text("SELECT qty FROM items")).scalar() == 10
+    writer.dispose()
+    other.dispose()
+
+def test_writer_pool_hands_connection_to_oldest_waiter(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "SQLITE_PRODUCTION_PROFILE", True)
+    monkeypatch.setattr(engine_module, "_engines", {})
+    writer = engine_module.get_engine(f"sqlite:///{tmp_path / 'fair.db'}", name="writer")
+    order = []
+    held = writer.connect()
+
+    def write(label):
+        with writer.connect() as conn:
+            order.append(label)
+            conn.execute(text("SELECT 1"))
+
+    threads = []
+    for label in ("first", "second"):
+        thread = threading.Thread(target=write, args=(label,))
+        thread.start()
+        threads.append(thread)
+        time.sleep(0.05)
+    held.close()
+    # The releasing thread cannot jump the queue ahead of the waiters
+    write("releaser")
+    for thread in threads:
+        thread.join()
+    assert order == ["first", "second", "releaser"]
+    writer.dispose()
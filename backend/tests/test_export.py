@@ -0,0 +1,150 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.main import app
+from app.api import admin
+from app.core.security import Principal
+from app.database import Base
+from app.middlewares.auth_middleware import get_current_user
+from app.models.user import User
+from app.models.wallet import Wallet
+from app.models.transaction import Transaction, TransactionStatus, TransactionType
+from app.schemas.transaction import ExportFormat, TransactionExportFilter
+from app.tasks.export import (
+    EXPORT_COLUMNS, build_parser, csv_chunks, export_to_file, iter_rows, ndjson_chunks, write_parquet
+)
+
+engine = create_engine(
+    "sqlite://",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+START = datetime(2026, 3, 1)
+END = START + timedelta(days=1)
+TYPES = [TransactionType.DEPOSIT, TransactionType.WITHDRAWAL, TransactionType.TRANSFER]
+
+client = TestClient(app)
+auditor = Principal(id=1, email="auditor@example.com", is_active=True, is_admin=True)
+
+def setup_module():
+    Base.metadata.create_all(bind=engine)
+    app.dependency_overrides[admin.get_read_session_factory] = lambda: TestingSessionLocal
+    app.dependency_overrides[get_current_user] = lambda: auditor
+    db = TestingSessionLocal()
+    user = User(username="exporter", email="exporter@example.com")
+    db.add(user)
+    db.flush()
+    wallet = Wallet(user_id=user.id)
+    db.add(wallet)
+    db.flush()
+    # 25 rows inside the day, one before and one after it
+    db.add_all([
+        Transaction(user_id=user.id, wallet_id=wallet.id, transaction_type=TYPES[i % 3],
+                    amount=float(i), currency="USD", status=TransactionStatus.COMPLETED,
+                    description='note, with "quotes"' if i == 0 else None,
+                    is_flagged=i % 5 == 0, created_at=START + timedelta(minutes=i))
+        for i in range(25)
+    ] + [
+        Transaction(user_id=user.id, wallet_id=wallet.id, transaction_type=TransactionType.DEPOSIT,
+                    amount=1.0, currency="USD", status=TransactionStatus.COMPLETED, created_at=created_at)
+        for created_at in (START - timedelta(seconds=1), END)
+    ])
+    db.commit()
+    db.close()
+
+def teardown_module():
+    app.dependency_overrides.pop(admin.get_read_session_factory, None)
+    app.dependency_overrides.pop(get_current_user, None)
+    Base.metadata.drop_all(bind=engine)
+
+def day_filter(**kwargs):
+    return TransactionExportFilter(start_date=START, end_date=END, **kwargs)
+
+def test_rows_stream_in_chunks():
+    db = TestingSessionLocal()
+    chunks = list(iter_rows(db, day_filter(), chunk_size=10))
+    assert [len(rows) for rows in chunks] == [10, 10, 5]
+    assert [row.amount for rows in chunks for row in rows] == [float(i) for i in range(25)]
+    assert sum(len(rows) for rows in iter_rows(db, day_filter(is_flagged=True, transaction_type="DEPOSIT"))) == 2
+    db.close()
+
+def test_csv_and_ndjson_encoding():
+    db = TestingSessionLocal()
+    records = list(csv.DictReader(io.StringIO("".join(csv_chunks(iter_rows(db, day_filter(), chunk_size=7))))))
+    assert len(records) == 25
+    assert records[0]["description"] == 'note, with "quotes"'
+    assert records[0]["transaction_type"] == "DEPOSIT"
+    assert records[0]["created_at"] == START.isoformat()
+    assert records[1]["description"] == ""
+
+    lines = "".join(ndjson_chunks(iter_rows(db, day_filter(min_amount=20)))).splitlines()
+    assert [json.loads(line)["amount"] for line in lines] == [20.0, 21.0, 22.0, 23.0, 24.0]
+    assert list(json.loads(lines[0])) == list(EXPORT_COLUMNS)
+
+    # An empty export still has its header
+    empty = "".join(csv_chunks(iter_rows(db, day_filter(currency="EUR"))))
+    assert empty.strip() == ",".join(EXPORT_COLUMNS)
+    db.close()
+
+def test_cli_flag_filter_has_three_states():
+    parser = build_parser()
+    day = ["--start", START.isoformat(), "--end", END.isoformat()]
+    assert [parser.parse_args(day + extra).is_flagged for extra in ([], ["--flagged"], ["--unflagged"])] == [
+        None, True, False
+    ]
+    with pytest.raises(SystemExit):
+        parser.parse_args(day + ["--flagged", "--unflagged"])
+
+    db = TestingSessionLocal()
+    unflagged = parser.parse_args(day + ["--unflagged"]).is_flagged
+    assert sum(len(rows) for rows in iter_rows(db, day_filter(is_flagged=unflagged))) == 20
+    db.close()
+
+def test_parquet_written_in_row_groups(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    db = TestingSessionLocal()
+    path = tmp_path / "export.parquet"
+    assert write_parquet(iter_rows(db, day_filter(), chunk_size=5), str(path), row_group_size=10) == 25
+    parquet = pq.ParquetFile(path)
+    assert [parquet.metadata.row_group(i).num_rows for i in range(parquet.num_row_groups)] == [10, 10, 5]
+    table = parquet.read()
+    assert table.column("transaction_type").to_pylist()[:3] == ["DEPOSIT", "WITHDRAWAL", "TRANSFER"]
+    assert table.column("created_at").to_pylist()[0] == START
+
+    assert export_to_file(db, day_filter(), ExportFormat.NDJSON, str(tmp_path / "export.ndjson")) == 25
+    db.close()
+
+def test_export_endpoint():
+    params = {"start_date": START.isoformat(), "end_date": END.isoformat()}
+    response = client.get("/admin/transactions/export", params={**params, "format": "ndjson", "is_flagged": True})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert len(response.text.splitlines()) == 5
+
+    response = client.get("/admin/transactions/export", params=params)
+    assert response.headers["content-disposition"] == 'attachment; filename="transactions_20260301_20260302.csv"'
+    assert len(response.text.splitlines()) == 26
+
+    response = client.get("/admin/transactions/export", params={"start_date": END.isoformat(), "end_date": START.isoformat()})
+    assert response.status_code == 400
+
+    app.dependency_overrides[get_current_user] = lambda: Principal(id=2, email="u@example.com", is_active=True, is_admin=False)
+    try:
+        assert client.get("/admin/transactions/export", params=params).status_code == 403
+    finally:
+        app.dependency_overrides[get_current_user] = lambda: auditor
+
+def test_parquet_export_endpoint():
+    pq = pytest.importorskip("pyarrow.parquet")
+    params = {"start_date": START.isoformat(), "end_date": END.isoformat(), "format": "parquet"}
+    response = client.get("/admin/transactions/export", params=params)
+    assert response.status_code == 200
+    assert pq.read_table(io.BytesIO(response.content)).num_rows == 25
@@ -0,0 +1,202 @@
+import importlib
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app import config
+from app.database import Base
+from app.models.user import User
+from app.models.wallet import Wallet
+from app.models.transaction import Transaction, TransactionStatus, TransactionType
+from app.services.velocity import VelocityStore
+from app.services.fraud_detection import FraudDetectionService
+from app.services.fraud_features import get_fraud_features
+
+engine = create_engine(
+    "sqlite://",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def setup_module():
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    user = User(username="fraudtest", email="fraudtest@example.com")
+    db.add(user)
+    db.flush()
+    db.add(Wallet(user_id=user.id, balance=1000))
+    db.commit()
+    db.close()
+
+def teardown_module():
+    Base.metadata.drop_all(bind=engine)
+
+def test_velocity_store_window_and_daily_total():
+    store = VelocityStore(window_seconds=60)
+    now = datetime.utcnow().replace(hour=12)
+    store.record(1, 10.0, now - timedelta(seconds=120))
+    store.record(1, 20.0, now - timedelta(seconds=30))
+    store.record(1, 5.0, now)
+
+    assert store.recent_count(1, now) == 2
+    assert store.daily_total(1, now) == 35.0
+    assert store.daily_total(1, now + timedelta(days=1)) == 0.0
+    assert store.recent_count(2, now) == 0
+
+def test_velocity_store_rebuilds_from_db():
+    db = TestingSessionLocal()
+    user = db.query(User).filter(User.username == "fraudtest").first()
+    for amount in (100.0, 200.0):
+        db.add(Transaction(
+            user_id=user.id,
+            wallet_id=user.wallet.id,
+            transaction_type=TransactionType.DEPOSIT,
+            amount=amount,
+            currency="USD",
+            status=TransactionStatus.COMPLETED,
+        ))
+    db.commit()
+
+    store = VelocityStore()
+    service = FraudDetectionService(db, velocity=store, feature_source="memory")
+    assert store.is_loaded
+    features = service._get_features(user.id)
+    assert features.recent_count == 2
+    assert features.daily_total == 300.0
+    db.close()
+
+def test_sql_features_match_velocity_store():
+    db = TestingSessionLocal()
+    user = db.query(User).filter(User.username == "fraudtest").first()
+    memory = FraudDetectionService(db, velocity=VelocityStore(), feature_source="memory")
+    sql = FraudDetectionService(db, feature_source="sql")
+
+    assert sql._get_features(user.id) == memory._get_features(user.id)
+    assert get_fraud_features(db, user.id, recipient_id=user.id).recipient_flagged == 0
+    db.close()
+
+def test_memory_features_are_an_explicit_opt_in(monkeypatch):
+    monkeypatch.delenv("FRAUD_FEATURE_SOURCE", raising=False)
+    try:
+        # Per-process counters would let every worker allow the full limits
+        assert importlib.reload(config).FRAUD_FEATURE_SOURCE == "sql"
+        monkeypatch.setenv("FRAUD_FEATURE_SOURCE", "Memory")
+        assert importlib.reload(config).FRAUD_FEATURE_SOURCE == "memory"
+    finally:
+        monkeypatch.undo()
+        importlib.reload(config)
+
+    store = VelocityStore()
+    db = TestingSessionLocal()
+    user = db.query(User).filter(User.username == "fraudtest").first()
+    FraudDetectionService(db, velocity=store, feature_source="sql").record_transaction(Transaction(
+        user_id=user.id, amount=10.0, status=TransactionStatus.COMPLETED
+    ))
+    assert not store.is_loaded and store.recent_count(user.id) == 0
+    db.close()
+
+def test_velocity_store_evicts_idle_users():
+    store = VelocityStore(window_seconds=60)
+    start = datetime.utcnow().replace(hour=12)
+    store.record(1, 10.0, start)
+    store.record(2, 20.0, start + timedelta(seconds=30))
+    store.record(3, 5.0, start + timedelta(seconds=90))
+    # User 1 left the window, user 2 is still in it
+    assert set(store._recent) == {2, 3}
+    assert set(store._daily) == {1, 2, 3}
+
+    store.record(3, 5.0, start + timedelta(days=1))
+    assert set(store._recent) == {3}
+    assert store._daily == {3: ((start + timedelta(days=1)).date(), 5.0)}
+
+def test_daily_scan_flags_in_constant_queries(monkeypatch):
+    from sqlalchemy import event
+    from app.tasks import fraud_scan
+    from app.utils.notifications import notifications
+
+    db = TestingSessionLocal()
+    user = db.query(User).filter(User.username == "fraudtest").first()
+    recipient = User(username="fraudrecipient", email="fraudrecipient@example.com")
+    db.add(recipient)
+    db.flush()
+    db.add(Transaction(
+        user_id=user.id, wallet_id=user.wallet.id, recipient_id=recipient.id,
+        transaction_type=TransactionType.TRANSFER, amount=10.0, currency="USD",
+        status=TransactionStatus.COMPLETED, is_flagged=True,
+    ))
+    now = datetime.utcnow()
+    for seconds in range(5):
+        db.add(Transaction(
+            user_id=user.id, wallet_id=user.wallet.id, recipient_id=recipient.id,
+            transaction_type=TransactionType.TRANSFER, amount=6000.0, currency="USD",
+            status=TransactionStatus.COMPLETED, created_at=now - timedelta(seconds=seconds),
+        ))
+    db.commit()
+
+    alerts = []
+    # The three scoring rules together reach exactly 0.7, so lower the cut-off
+    monkeypatch.setattr(fraud_scan, "HIGH_RISK_THRESHOLD", 0.6)
+    monkeypatch.setattr(notifications, "enqueue", lambda **kwargs: alerts.append(kwargs))
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        result = fraud_scan.run_daily_fraud_scan(db)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    # The oldest transfers have too few predecessors in their own rapid window
+    assert result["flagged_transactions"] == 2
+    # Both flags reach the user as one digest
+    assert len(alerts) == 1
+    assert alerts[0]["to_email"] == "fraudtest@example.com"
+    assert "High fraud score detected (2x)" in alerts[0]["body"]
+    assert "6000.0 USD" in alerts[0]["body"]
+    assert len([s for s in statements if not s.startswith(("BEGIN", "COMMIT"))]) == 4
+    db.close()
+
+def test_scan_shards_partition_by_time():
+    from sqlalchemy import event
+    from app.tasks import fraud_scan
+
+    db = TestingSessionLocal()
+    now = datetime.utcnow()
+    user = db.query(User).filter(User.username == "fraudtest").first()
+    # A burst straddling every slice boundary still counts its earlier rows
+    burst = [
+        Transaction(user_id=user.id, wallet_id=user.wallet.id, transaction_type=TransactionType.WITHDRAWAL,
+                    amount=6000.0, currency="USD", status=TransactionStatus.COMPLETED,
+                    created_at=now - timedelta(hours=16, seconds=i * 10))
+        for i in range(6)
+    ]
+    db.add_all(burst)
+    db.commit()
+
+    since = now - timedelta(days=1)
+    recipients = fraud_scan._flagged_recipients(db, since)
+    whole = fraud_scan._scan_shard(db, 0, since, None, recipients, 0.4)
+    slices = fraud_scan._time_slices(since, now, 3)
+    assert slices[0][0] == since and slices[-1][1] is None
+
+    statements = []
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        parts = [
+            fraud_scan._scan_shard(db, shard, start, until, recipients, 0.4)
+            for shard, (start, until) in enumerate(slices)
+        ]
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert sum(part.scanned for part in parts) == whole.scanned
+    assert sorted(flag for part in parts for flag in part.flags) == sorted(whole.flags)
+    assert {flag[0] for flag in whole.flags} >= {t.id for t in burst[:3]}
+    # Each slice reads its own created_at range, not the whole window
+    assert ["transactions.created_at < ?" in statement for statement in statements] == [True, True, False]
+    for transaction in burst:
+        db.delete(transaction)
+    db.commit()
+    db.close()
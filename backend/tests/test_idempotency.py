@@ -0,0 +1,183 @@
+import asyncio
+import threading
+import time
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from app.core.config import settings
+from app.core import engine as engine_module
+from app.database import Base
+from app.models import user, wallet, transaction  # noqa: F401  register models
+from app.models.idempotency import IdempotencyKey
+from app.models.transaction import Transaction, TransactionType
+from app.models.user import User
+from app.models.wallet import Wallet
+from app.services.transaction import TransactionService
+from app.utils.idempotency import IdempotencyStore, REPLAY_HEADER, request_fingerprint
+
+@pytest.fixture
+def sessions(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'idempotency.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+@pytest.fixture
+def store(sessions):
+    return IdempotencyStore(sessions, poll_interval=0.01)
+
+def test_concurrent_duplicates_run_once(store, sessions):
+    calls = []
+    def work():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"id": len(calls)}
+
+    request_hash = request_fingerprint("POST /transactions/deposit", {"amount": 10})
+    responses = []
+    threads = [
+        threading.Thread(target=lambda: responses.append(store.run(sessions(), 1, "retry-me", request_hash, work)))
+        for _ in range(2)
+    ]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.05)
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert [r.body for r in responses] == [b'{"id":1}', b'{"id":1}']
+    assert [REPLAY_HEADER.lower() in r.headers for r in responses] == [False, True]
+    # A later retry is answered from the table as well
+    assert store.run(sessions(), 1, "retry-me", request_hash, work).headers[REPLAY_HEADER] == "true"
+    assert len(calls) == 1
+
+def test_key_reuse_with_other_request_is_rejected(store, sessions):
+    db = sessions()
+    store.run(db, 1, "key", request_fingerprint("POST /transactions/deposit", {"amount": 10}), lambda: {})
+    with pytest.raises(HTTPException) as exc:
+        store.run(db, 1, "key", request_fingerprint("POST /transactions/deposit", {"amount": 99}), lambda: {})
+    assert exc.value.status_code == 422
+    # Keys are scoped per user
+    assert store.run(db, 2, "key", request_fingerprint("POST /transactions/deposit", {"amount": 99}), lambda: {}).status_code == 200
+
+def test_failed_request_releases_key(store, sessions):
+    db = sessions()
+    request_hash = request_fingerprint("POST /transactions/withdraw", {"amount": 10})
+    def fail():
+        raise HTTPException(status_code=400, detail="Insufficient funds")
+    with pytest.raises(HTTPException):
+        store.run(db, 1, "key", request_hash, fail)
+    assert store.run(db, 1, "key", request_hash, lambda: {"ok": True}).body == b'{"ok":true}'
+
+def test_expired_keys_purged_in_bulk(store, sessions):
+    db = sessions()
+    store.ttl = -1
+    for i in range(3):
+        store.run(db, 1, f"key-{i}", "hash", lambda: {})
+    store.ttl = 60
+    store.run(db, 1, "fresh", "hash", lambda: {})
+    assert store.purge_expired() == 3
+
+def test_failure_after_commit_keeps_key(store, sessions):
+    db = sessions()
+    calls = []
+    def commit_then_fail():
+        calls.append(1)
+        db.add(User(email="committed@example.com", username="committed", hashed_password="x"))
+        db.commit()
+        raise ValueError("serializing the response failed")
+
+    request_hash = request_fingerprint("POST /transactions/deposit", {"amount": 10})
+    with pytest.raises(ValueError):
+        store.run(db, 1, "key", request_hash, commit_then_fail)
+    # The retry gets an error back instead of running the work a second time
+    retry = store.run(sessions(), 1, "key", request_hash, commit_then_fail)
+    assert retry.status_code == 500
+    assert retry.headers[REPLAY_HEADER] == "true"
+    assert len(calls) == 1
+
+def test_work_committed_before_a_crash_is_not_rerun(store, sessions):
+    db = sessions()
+    request_hash = request_fingerprint("POST /transactions/deposit", {"amount": 10})
+    store.in_flight_timeout = 0
+    assert store._claim(db, 1, "key", request_hash) is None
+    db.info["idempotency_key"] = (1, "key")
+    db.add(User(email="crashed@example.com", username="crashed", hashed_password="x"))
+    db.commit()
+    # The worker died here, before storing its response
+    db.info.clear()
+    time.sleep(0.01)
+    assert store.run(sessions(), 1, "key", request_hash, lambda: {"ran": "again"}).status_code == 500
+
+def test_async_run_stores_response_on_request_session(tmp_path, sessions, store):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'idempotency.db'}")
+    AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+    calls = []
+
+    async def request():
+        async with AsyncSessionLocal() as db:
+            async def work():
+                calls.append(1)
+                db.add(User(email="async@example.com", username="async", hashed_password="x"))
+                await db.commit()
+                return {"created": True}
+            return await store.run_async(db, 1, "key", "hash", work, status_code=201)
+
+    async def both():
+        first = await request()
+        retry = await request()
+        await engine.dispose()
+        return first, retry
+
+    first, retry = asyncio.run(both())
+    assert (first.status_code, retry.status_code) == (201, 201)
+    assert retry.headers[REPLAY_HEADER] == "true"
+    assert len(calls) == 1
+    assert sessions().get(IdempotencyKey, (1, "key")).response_body == '{"created": true}'
+
+def test_process_transaction_on_shared_file_db(tmp_path, monkeypatch):
+    # The production layout: a file database behind the single-connection writer pool
+    monkeypatch.setattr(settings, "DB_POOL_TIMEOUT", 2)
+    monkeypatch.setattr(engine_module, "_engines", {})
+    engine = engine_module.get_engine(f"sqlite:///{tmp_path / 'wallet.db'}", name="idempotency_test")
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = SessionLocal()
+    owner = User(email="owner@example.com", username="owner", hashed_password="x")
+    db.add(owner)
+    db.flush()
+    owner_id = owner.id
+    db.add(Wallet(user_id=owner_id, balance=0.0))
+    db.commit()
+    db.close()
+    store = IdempotencyStore(SessionLocal, poll_interval=0.01)
+    request_hash = request_fingerprint("POST /transactions/deposit", {"amount": 25.0, "currency": "USD"})
+
+    def request():
+        db = SessionLocal()
+        def work():
+            created, _ = TransactionService(db).process_transaction(
+                user_id=owner_id, amount=25.0, currency="USD", transaction_type=TransactionType.DEPOSIT
+            )
+            return {"id": created.id, "amount": created.amount}
+        try:
+            return store.run(db, owner_id, "deposit-1", request_hash, work)
+        finally:
+            db.close()
+
+    start = time.monotonic()
+    first = request()
+    assert time.monotonic() - start < settings.DB_POOL_TIMEOUT
+    retry = request()
+
+    assert first.status_code == 200
+    assert retry.headers[REPLAY_HEADER] == "true"
+    assert retry.body == first.body
+    db = SessionLocal()
+    assert db.scalar(select(func.count()).select_from(Transaction)) == 1
+    assert db.get(IdempotencyKey, (owner_id, "deposit-1")).status_code == 200
+    db.close()
+    engine.dispose()
@@ -0,0 +1,97 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.main import app
+from app.database import Base
+from app.models.transaction import Transaction, TransactionStatus, TransactionType
+from app.services.fraud_detection import FraudDetectionService
+from app.utils import metrics
+from app.utils.metrics import Counter, Histogram, Registry
+
+engine = create_engine(
+    "sqlite://",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+client = TestClient(app)
+
+def setup_module():
+    Base.metadata.create_all(bind=engine)
+
+def teardown_module():
+    Base.metadata.drop_all(bind=engine)
+
+def test_text_format_and_series_cap():
+    registry = Registry()
+    requests = registry.register(Counter("requests_total", "Requests", ("route",), max_series=2))
+    latency = registry.register(Histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0)))
+    for route in ("/a", "/b", "/c", "/d"):
+        requests.inc(route)
+    requests.inc("/a", amount=2)
+    latency.observe(0.1, "/a")
+    latency.observe(0.5, "/a")
+    latency.observe(5.0, "/a")
+
+    assert registry.render().splitlines() == [
+        "# HELP requests_total Requests",
+        "# TYPE requests_total counter",
+        'requests_total{route="/a"} 3',
+        'requests_total{route="/b"} 1',
+        'requests_total{route="other"} 2',
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{route="/a",le="0.1"} 1',
+        'latency_seconds_bucket{route="/a",le="1"} 2',
+        'latency_seconds_bucket{route="/a",le="+Inf"} 3',
+        'latency_seconds_sum{route="/a"} 5.6',
+        'latency_seconds_count{route="/a"} 3',
+    ]
+
+def test_requests_labelled_by_route_template():
+    route = "/admin/wallets/{user_id}/shards"
+    before = metrics.http_requests.value("PUT", route, "401")
+    client.put("/admin/wallets/7/shards")
+    client.put("/admin/wallets/8/shards")
+    client.get("/no/such/path")
+
+    assert metrics.http_requests.value("PUT", route, "401") == before + 2
+    assert metrics.http_request_duration.count("PUT", route) >= 2
+    assert metrics.http_requests.value("GET", "unmatched", "404") >= 1
+    assert metrics.http_requests_in_flight.value() == 0
+
+    body = client.get("/metrics")
+    assert body.headers["content-type"] == "text/plain; version=0.0.4; charset=utf-8"
+    assert f'http_requests_total{{method="PUT",route="{route}",status="401"}}' in body.text
+    assert "/admin/wallets/7/shards" not in body.text
+    assert 'emails_total{outcome="sent"}' in body.text
+
+def test_committed_transactions_and_fraud_flags_counted():
+    completed = metrics.transactions_committed.value("DEPOSIT", "COMPLETED")
+    db = TestingSessionLocal()
+    transaction = Transaction(user_id=1, wallet_id=1, transaction_type=TransactionType.DEPOSIT,
+                              amount=5.0, currency="USD", status=TransactionStatus.PENDING)
+    db.add(transaction)
+    db.flush()
+    transaction.status = TransactionStatus.COMPLETED
+    db.commit()
+    db.execute(insert(Transaction), [
+        {"user_id": 1, "wallet_id": 1, "transaction_type": TransactionType.DEPOSIT,
+         "amount": 1.0, "currency": "USD", "status": TransactionStatus.COMPLETED}
+    ] * 2)
+    db.commit()
+    # Rolled back work is not counted
+    db.add(Transaction(user_id=1, wallet_id=1, transaction_type=TransactionType.DEPOSIT,
+                       amount=5.0, currency="USD", status=TransactionStatus.COMPLETED))
+    db.flush()
+    db.rollback()
+    assert metrics.transactions_committed.value("DEPOSIT", "COMPLETED") == completed + 3
+    assert metrics.transactions_committed.value("DEPOSIT", "PENDING") == 0
+
+    flagged = metrics.fraud_flags.value("max_amount")
+    service = FraudDetectionService(db, feature_source="sql")
+    assert service.check_transaction(1, 10 ** 9, "DEPOSIT")[0]
+    assert metrics.fraud_flags.value("max_amount") == flagged + 1
+    db.close()
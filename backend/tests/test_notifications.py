@@ -0,0 +1,137 @@
+import email
+import smtplib
+import socket
+import threading
+import pytest
+from app.utils.notifications import NotificationDispatcher
+
+
+class Inbox:
+    """aiosmtpd handler keeping every received message"""
+
+    def __init__(self):
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(email.message_from_bytes(envelope.content))
+        return "250 OK"
+
+
+class FakeConnection:
+    """SMTP connection whose sends fail with the given errors, then succeed"""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.sent = []
+
+    def noop(self):
+        return (250, b"OK")
+
+    def send_message(self, message):
+        if self.errors:
+            raise self.errors.pop(0)
+        self.sent.append(message)
+
+    def close(self):
+        pass
+
+    quit = close
+
+
+@pytest.fixture
+def smtp_server():
+    Controller = pytest.importorskip("aiosmtpd.controller").Controller
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    inbox = Inbox()
+    controller = Controller(inbox, hostname="127.0.0.1", port=port)
+    controller.start()
+    yield controller, inbox
+    controller.stop()
+
+
+def test_dispatcher_reuses_connections(smtp_server):
+    controller, inbox = smtp_server
+    dispatcher = NotificationDispatcher(
+        workers=2,
+        backoff=0.01,
+        connect=lambda: smtplib.SMTP(controller.hostname, controller.port),
+    )
+    for i in range(20):
+        assert dispatcher.enqueue(f"user{i}@example.com", "Alert", f"message {i}")
+    dispatcher.join()
+    dispatcher.stop()
+
+    assert len(inbox.messages) == 20
+    assert {m["To"] for m in inbox.messages} == {f"user{i}@example.com" for i in range(20)}
+    stats = dispatcher.stats()
+    assert stats["sent"] == 20
+    assert stats["queue_depth"] == 0
+    assert stats["connections_opened"] <= 2
+
+
+def test_dispatcher_retries_then_gives_up():
+    attempts = []
+
+    def refuse():
+        attempts.append(1)
+        raise ConnectionRefusedError("no server")
+
+    dispatcher = NotificationDispatcher(workers=1, max_retries=2, backoff=0.001, connect=refuse)
+    dispatcher.enqueue("user@example.com", "Alert", "body")
+    dispatcher.join()
+    dispatcher.stop()
+
+    assert len(attempts) == 3
+    assert dispatcher.stats()["retried"] == 2
+    assert dispatcher.stats()["failed"] == 1
+
+
+def test_full_queue_drops_instead_of_blocking():
+    dispatcher = NotificationDispatcher(workers=0, maxsize=1)
+    assert dispatcher.enqueue("a@example.com", "Alert", "body")
+    assert not dispatcher.enqueue("b@example.com", "Alert", "body")
+    assert dispatcher.stats()["dropped"] == 1
+
+
+def test_permanent_rejections_are_not_retried():
+    connections = []
+    errors = [
+        smtplib.SMTPRecipientsRefused({"gone@example.com": (550, b"No such user")}),
+        smtplib.SMTPDataError(554, b"Message rejected"),
+        smtplib.SMTPDataError(451, b"Try again later"),
+    ]
+
+    def connect():
+        connections.append(FakeConnection(*errors))
+        errors.clear()
+        return connections[-1]
+
+    dispatcher = NotificationDispatcher(workers=1, max_retries=3, backoff=0.001, connect=connect)
+    for to_email in ("gone@example.com", "spam@example.com", "busy@example.com"):
+        dispatcher.enqueue(to_email, "Alert", "body")
+    dispatcher.join()
+    dispatcher.stop()
+
+    stats = dispatcher.stats()
+    assert (stats["failed"], stats["retried"], stats["sent"]) == (2, 1, 1)
+    # Rejections keep the connection; only the 4xx reply reconnects for its retry
+    assert len(connections) == 2
+    assert connections[1].sent[0]["To"] == "busy@example.com"
+
+
+def test_stop_with_a_full_queue_does_not_raise():
+    release = threading.Event()
+
+    def stalled_connect():
+        release.wait(5)
+        return FakeConnection()
+
+    dispatcher = NotificationDispatcher(workers=1, maxsize=1, connect=stalled_connect)
+    assert dispatcher.enqueue("a@example.com", "Alert", "body")
+    while dispatcher.queue_depth:
+        pass
+    assert dispatcher.enqueue("b@example.com", "Alert", "body")
+    dispatcher.stop(timeout=0.05)
+    release.set()
@@ -0,0 +1,79 @@
+import asyncio
+from threading import BoundedSemaphore
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from passlib.context import CryptContext
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+from app.api import auth
+from app.core import engine as engine_module
+from app.core import passwords
+from app.core.config import settings
+from app.database import Base, get_read_db
+from app.models import user, wallet, transaction  # noqa: F401  register models
+from app.models.user import User
+
+def test_stale_hash_is_upgraded_on_verify():
+    stale = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("secret")
+    verified, new_hash = asyncio.run(passwords.verify_and_update_password("secret", stale))
+    assert verified
+    assert new_hash is not None and passwords.pwd_context.verify("secret", new_hash)
+    assert not passwords.pwd_context.needs_update(new_hash)
+
+    verified, new_hash = asyncio.run(passwords.verify_and_update_password("wrong", stale))
+    assert (verified, new_hash) == (False, None)
+
+def test_saturated_pool_refuses_work(monkeypatch):
+    monkeypatch.setattr(passwords, "_slots", BoundedSemaphore(1))
+    passwords._slots.acquire()
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(passwords.hash_password("secret"))
+    assert exc.value.status_code == 503
+
+def test_login_does_not_wait_for_the_writer(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "SQLITE_PRODUCTION_PROFILE", True)
+    monkeypatch.setattr(settings, "DB_POOL_TIMEOUT", 1)
+    monkeypatch.setattr(engine_module, "_engines", {})
+    url = f"sqlite:///{tmp_path / 'auth.db'}"
+    writer = engine_module.get_engine(url, name="writer")
+    reader = engine_module.get_engine(url, name="reader", role="read")
+    Base.metadata.create_all(bind=writer)
+    WriterSession = sessionmaker(bind=writer)
+    ReaderSession = sessionmaker(bind=reader)
+    stale = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("secret")
+    with WriterSession() as db:
+        db.add_all([
+            User(username="current", email="current@example.com", hashed_password=passwords.pwd_context.hash("secret")),
+            User(username="stale", email="stale@example.com", hashed_password=stale),
+        ])
+        db.commit()
+
+    def read_db():
+        db = ReaderSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    monkeypatch.setattr(auth, "SessionLocal", WriterSession)
+    app = FastAPI()
+    app.include_router(auth.router, prefix="/auth")
+    app.dependency_overrides[get_read_db] = read_db
+    client = TestClient(app)
+
+    # Another request holds the only writer connection, mid-write
+    held = writer.connect()
+    held.begin()
+    held.execute(text("UPDATE users SET is_active = 1"))
+    assert client.post("/auth/login", json={"username": "current", "password": "secret"}).status_code == 200
+    held.rollback()
+    held.close()
+
+    # An outdated hash is replaced through a writer session of its own
+    assert client.post("/auth/login", json={"username": "stale", "password": "secret"}).status_code == 200
+    with ReaderSession() as db:
+        new_hash = db.query(User).filter(User.username == "stale").one().hashed_password
+    assert new_hash != stale and not passwords.pwd_context.needs_update(new_hash)
+    writer.dispose()
+    reader.dispose()
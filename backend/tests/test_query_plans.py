@@ -0,0 +1,143 @@
+import os
+import re
+import tempfile
+from datetime import datetime, timedelta
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, event, insert, select
+from sqlalchemy.orm import sessionmaker
+from app.models.user import User
+from app.models.wallet import Wallet
+from app.models.transaction import Transaction, TransactionStatus, TransactionType
+from app.services.fraud_detection import FraudDetectionService
+from app.services.fraud_features import get_fraud_features
+from app.services.velocity import VelocityStore
+from app.tasks.fraud_scan import _load_window, _time_slices
+from app.tasks.reporting import ReportingService
+from app.utils.pagination import apply_keyset, build_page
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FULL_SCAN = re.compile(r"^SCAN (TABLE )?transactions\b(?!.*USING (COVERING )?INDEX)")
+
+db_path = None
+engine = None
+SessionLocal = None
+
+def setup_module():
+    global db_path, engine, SessionLocal
+    fd, db_path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    url = f"sqlite:///{db_path}"
+
+    # Build the schema from the migrations, not from the models
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    config.set_main_option("sqlalchemy.url", url)
+    config.attributes["configure_logger"] = False
+    command.upgrade(config, "head")
+
+    engine = create_engine(url)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = SessionLocal()
+    db.add_all([User(username=f"plan{i}", email=f"plan{i}@example.com") for i in range(20)])
+    db.flush()
+    db.add_all([Wallet(user_id=i + 1) for i in range(20)])
+    now = datetime.utcnow()
+    db.execute(insert(Transaction), [
+        {
+            "user_id": i % 20 + 1,
+            "wallet_id": i % 20 + 1,
+            "transaction_type": TransactionType.TRANSFER,
+            "amount": 10.0,
+            "currency": "USD",
+            "status": TransactionStatus.COMPLETED,
+            "recipient_id": (i + 1) % 20 + 1,
+            "is_flagged": i % 50 == 0,
+            "created_at": now - timedelta(minutes=i),
+        }
+        for i in range(2000)
+    ])
+    db.commit()
+    db.close()
+
+def teardown_module():
+    engine.dispose()
+    os.remove(db_path)
+
+def capture_statements(run):
+    """Run a callable against a session and return the SELECTs it issued on transactions"""
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "transactions" in statement:
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", on_execute)
+    db = SessionLocal()
+    try:
+        run(db)
+    finally:
+        db.close()
+        event.remove(engine, "before_cursor_execute", on_execute)
+    assert statements, "no transaction queries captured"
+    return statements
+
+def assert_no_full_scan(run):
+    with engine.connect() as conn:
+        for statement, parameters in capture_statements(run):
+            plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+            details = [row[-1] for row in plan]
+            scans = [d for d in details if FULL_SCAN.search(d)]
+            assert not scans, f"full scan in plan {details} for:\n{statement}"
+
+def yesterday_range():
+    yesterday = datetime.utcnow() - timedelta(days=1)
+    return (
+        yesterday.replace(hour=0, minute=0, second=0, microsecond=0),
+        yesterday.replace(hour=23, minute=59, second=59, microsecond=999999),
+    )
+
+def test_fraud_feature_queries_use_indexes():
+    assert_no_full_scan(lambda db: get_fraud_features(db, 1, recipient_id=2))
+    assert_no_full_scan(
+        lambda db: FraudDetectionService(db, velocity=VelocityStore(), feature_source="memory")._get_features(1, recipient_id=2)
+    )
+
+def test_velocity_rebuild_uses_indexes():
+    assert_no_full_scan(lambda db: VelocityStore().rebuild(db))
+
+def test_fraud_scan_slices_use_indexes():
+    now = datetime.utcnow()
+
+    def run(db):
+        for since, until in _time_slices(now - timedelta(days=1), now, 4):
+            _load_window(db, since, until)
+
+    assert_no_full_scan(run)
+
+def test_reporting_queries_use_indexes():
+    start, end = yesterday_range()
+
+    def run(db):
+        service = ReportingService(db)
+        service._get_type_currency_totals(start, end)
+        service._get_flagged_transactions(start, end)
+        service._get_top_users(start, end)
+
+    assert_no_full_scan(run)
+
+def test_history_pages_use_indexes():
+    def run(db):
+        query = db.query(Transaction).filter(Transaction.user_id == 1)
+        page = build_page(apply_keyset(query, Transaction, None, 10).all(), 10)
+        apply_keyset(query, Transaction, page["next_cursor"], 10).all()
+
+        stmt = select(Transaction).where(Transaction.user_id == 1, Transaction.is_flagged == True)
+        db.execute(apply_keyset(stmt, Transaction, page["next_cursor"], 10)).all()
+
+    assert_no_full_scan(run)
+
+def test_flagged_list_uses_partial_index():
+    assert_no_full_scan(
+        lambda db: db.query(Transaction).filter(Transaction.is_flagged == True).all()
+    )
@@ -0,0 +1,120 @@
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.database import Base
+from app.models.user import User
+from app.models.wallet import Wallet
+from app.models.rollup import DailyTransactionRollup
+from app.models.transaction import Transaction, TransactionStatus, TransactionType
+from app.tasks.reporting import ReportingService
+from app.tasks.rollups import aggregate_range, backfill_rollups, day_bounds
+
+engine = create_engine(
+    "sqlite://",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+TYPES = [TransactionType.DEPOSIT, TransactionType.WITHDRAWAL, TransactionType.TRANSFER]
+today = datetime.utcnow().date()
+
+def setup_module():
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    db.add(User(username="rollup", email="rollup@example.com"))
+    db.flush()
+    db.add(Wallet(user_id=1))
+    # Ten transactions a day for the last 40 days
+    db.execute(insert(Transaction), [
+        {
+            "user_id": 1,
+            "wallet_id": 1,
+            "transaction_type": TYPES[i % 3],
+            "amount": float(i % 7 + 1),
+            "currency": "USD" if i % 2 else "EUR",
+            "status": TransactionStatus.COMPLETED,
+            "is_flagged": i % 9 == 0,
+            "created_at": datetime.combine(today, datetime.min.time()) - timedelta(days=day, hours=-(i % 24)),
+        }
+        for day in range(1, 41) for i in range(10)
+    ])
+    db.commit()
+    db.close()
+
+def teardown_module():
+    Base.metadata.drop_all(bind=engine)
+
+def test_daily_report_persists_rollup():
+    db = TestingSessionLocal()
+    report = ReportingService(db).generate_daily_report()
+    rows = db.query(DailyTransactionRollup).filter(DailyTransactionRollup.day == today - timedelta(days=1)).all()
+    assert sum(r.txn_count for r in rows) == report["transaction_stats"]["total_transactions"] == 10
+    assert sum(r.flagged_count for r in rows) == report["flagged_count"]
+    db.close()
+
+def test_grouped_totals_match_per_row_computation():
+    db = TestingSessionLocal()
+    start, end = day_bounds(today - timedelta(days=3))
+    expected = {}
+    for t in db.query(Transaction).filter(Transaction.created_at >= start, Transaction.created_at < end):
+        row = expected.setdefault((t.transaction_type, t.currency), [0, 0.0, t.amount, t.amount, 0])
+        row[0] += 1
+        row[1] += t.amount
+        row[2] = min(row[2], t.amount)
+        row[3] = max(row[3], t.amount)
+        row[4] += bool(t.is_flagged)
+
+    service = ReportingService(db)
+    totals = service._get_type_currency_totals(start, end)
+    assert {
+        (r.transaction_type, r.currency): [r.txn_count, r.total_amount, r.min_amount, r.max_amount, r.flagged_count]
+        for r in totals
+    } == expected
+
+    stats = service._get_transaction_stats(totals)
+    assert stats["total_transactions"] == sum(row[0] for row in expected.values()) == 10
+    assert stats["total_amount"] == sum(row[1] for row in expected.values())
+    assert stats["transaction_types"] == {
+        key: sum(row[0] for (kind, _), row in expected.items() if kind == transaction_type)
+        for key, transaction_type in zip(("deposit", "withdrawal", "transfer"), TYPES)
+    }
+    currencies = service._get_currency_stats(totals)
+    assert {currency: entry["count"] for currency, entry in currencies.items()} == {
+        currency: sum(row[0] for (_, c), row in expected.items() if c == currency)
+        for currency in ("USD", "EUR")
+    }
+    db.close()
+
+def test_period_reports_sum_rollups_without_scanning_transactions():
+    db = TestingSessionLocal()
+    start, end = today - timedelta(days=7), today - timedelta(days=1)
+    assert backfill_rollups(db, start, end) == 7
+
+    statements = []
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        report = ReportingService(db).generate_weekly_report()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert report["backfilled_days"] == 0
+    assert not any("FROM transactions" in s for s in statements)
+
+    raw = aggregate_range(db, day_bounds(start)[0], day_bounds(end)[1])
+    assert report["transaction_stats"]["total_transactions"] == sum(r.txn_count for r in raw) == 70
+    assert report["transaction_stats"]["total_amount"] == sum(r.total_amount for r in raw)
+    assert report["flagged_count"] == sum(r.flagged_count for r in raw)
+    assert (report["min_amount"], report["max_amount"]) == (
+        min(r.min_amount for r in raw), max(r.max_amount for r in raw)
+    )
+    db.close()
+
+def test_monthly_report_backfills_missing_days():
+    db = TestingSessionLocal()
+    report = ReportingService(db).generate_monthly_report()
+    assert report["start_date"] == (today - timedelta(days=1)).replace(day=1).isoformat()
+    assert report["transaction_stats"]["total_transactions"] == 10 * report["days"]
+    assert backfill_rollups(db, today - timedelta(days=report["days"]), today - timedelta(days=1), only_missing=True) == 0
+    db.close()
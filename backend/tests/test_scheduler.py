@@ -0,0 +1,110 @@
+import time
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from app.core import engine as engine_module
+from app.core.config import settings
+from app.database import Base, LeaseSessionLocal
+from app.models import user, wallet, transaction  # noqa: F401  register models
+from app.models.rollup import DailyTransactionRollup
+from app.models.scheduler import JobRun, SchedulerLease
+from app.models.transaction import Transaction, TransactionStatus, TransactionType
+from app.tasks import fraud_scan
+from app.utils import scheduler
+from app.utils.scheduler import SchedulerLeader, run_job
+
+@pytest.fixture
+def SessionLocal(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'scheduler.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+def test_single_leader_with_takeover(SessionLocal):
+    first = SchedulerLeader(SessionLocal, ttl=30)
+    second = SchedulerLeader(SessionLocal, ttl=30)
+    assert first.heartbeat() and first.is_leader
+    assert not second.heartbeat() and not second.is_leader
+    # Renewal keeps the lease with the holder
+    assert first.heartbeat() and not second.heartbeat()
+
+    first.release()
+    assert not first.is_leader
+    assert second.heartbeat() and second.is_leader
+    assert not first.heartbeat()
+
+def test_expired_lease_is_taken_over(SessionLocal):
+    crashed = SchedulerLeader(SessionLocal, ttl=-1)
+    assert crashed.heartbeat()
+    standby = SchedulerLeader(SessionLocal, ttl=30)
+    assert standby.heartbeat()
+    db = SessionLocal()
+    assert db.get(SchedulerLease, "scheduler").owner == standby.owner
+    db.close()
+
+def test_job_runs_recorded_only_on_leader(SessionLocal):
+    job_leader = SchedulerLeader(SessionLocal)
+    assert run_job("scan", lambda: 5, job_leader, SessionLocal) is None
+
+    job_leader.heartbeat()
+    run_job("scan", lambda: 5, job_leader, SessionLocal)
+    def broken():
+        raise RuntimeError("boom")
+    run_job("report", broken, job_leader, SessionLocal)
+
+    db = SessionLocal()
+    runs = db.query(JobRun).order_by(JobRun.id).all()
+    assert [(r.job_id, r.outcome, r.rows_scanned, r.error) for r in runs] == [
+        ("scan", "success", 5, None),
+        ("report", "failed", None, "boom"),
+    ]
+    assert all(r.duration_seconds >= 0 and r.owner == job_leader.owner for r in runs)
+    db.close()
+
+def test_heartbeat_and_jobs_leave_the_writer_free(tmp_path, monkeypatch):
+    # The default SQLite profile: one writer connection, a query_only reader pool
+    monkeypatch.setattr(settings, "SQLITE_PRODUCTION_PROFILE", True)
+    monkeypatch.setattr(settings, "DB_POOL_TIMEOUT", 1)
+    monkeypatch.setattr(engine_module, "_engines", {})
+    url = f"sqlite:///{tmp_path / 'jobs.db'}"
+    writer = engine_module.get_engine(url, name="writer")
+    reader = engine_module.get_engine(url, name="reader", role="read")
+    lease = engine_module.get_engine(url, name="lease", role="lease")
+    Base.metadata.create_all(bind=writer)
+    WriterSession = sessionmaker(bind=writer)
+    ReaderSession = sessionmaker(bind=reader)
+
+    # A job has the only writer connection checked out between its transactions
+    job = writer.connect()
+    # The process-wide leader renews through the lease engine the same way
+    assert scheduler.leader.session_factory is LeaseSessionLocal
+    job_leader = SchedulerLeader(sessionmaker(bind=lease), ttl=30)
+    start = time.monotonic()
+    assert job_leader.heartbeat()
+    assert time.monotonic() - start < settings.DB_POOL_TIMEOUT
+    job.close()
+
+    now = datetime.utcnow()
+    yesterday = datetime.combine(now.date() - timedelta(days=1), datetime.min.time())
+    with WriterSession() as db:
+        # One transaction in the scan's last 24 hours, one in the report's day
+        for created_at in (now, yesterday):
+            db.add(Transaction(
+                user_id=1, wallet_id=1, transaction_type=TransactionType.DEPOSIT, amount=6000.0,
+                currency="USD", status=TransactionStatus.COMPLETED, created_at=created_at
+            ))
+        db.commit()
+
+    # Jobs read on the query_only reader and write through short writer sessions
+    monkeypatch.setattr(scheduler, "ReadSessionLocal", ReaderSession)
+    monkeypatch.setattr(scheduler, "SessionLocal", WriterSession)
+    monkeypatch.setattr(fraud_scan, "HIGH_RISK_THRESHOLD", 0.2)
+    assert scheduler.run_scheduled_fraud_scan() == 1
+    assert scheduler.run_scheduled_report() == 1
+    with ReaderSession() as db:
+        assert db.scalars(select(Transaction.is_flagged).order_by(Transaction.id)).all() == [True, False]
+        assert db.scalar(select(DailyTransactionRollup.txn_count)) == 1
+    writer.dispose()
+    reader.dispose()
+    lease.dispose()
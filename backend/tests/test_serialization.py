@@ -0,0 +1,92 @@
+import json
+from datetime import datetime, timedelta
+from typing import List
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from app.main import app
+from app.api.wallet import TRANSACTION_OUT_SOURCES
+from app.core.database import get_async_read_db
+from app.core.security import Principal, get_current_user_async
+from app.database import Base
+from app.models.user import User
+from app.models.wallet import Wallet
+from app.models.transaction import Transaction, TransactionStatus, TransactionType
+from app.schemas.transaction import TransactionOut
+from app.utils.serialization import fast_response, schema_columns
+
+START = datetime(2026, 5, 1)
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "serialization.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    user = User(username="lister", email="lister@example.com")
+    db.add(user)
+    db.flush()
+    wallet = Wallet(user_id=user.id)
+    db.add(wallet)
+    db.flush()
+    db.add_all([
+        Transaction(user_id=user.id, wallet_id=wallet.id, transaction_type=TransactionType.TRANSFER,
+                    amount=float(i), currency="USD", recipient_id=user.id if i % 2 else None,
+                    status=TransactionStatus.COMPLETED, created_at=START + timedelta(minutes=i))
+        for i in range(5)
+    ])
+    db.commit()
+    db.close()
+    engine.dispose()
+    return path
+
+def test_column_rows_render_like_orm_objects(db_path):
+    engine = create_engine(f"sqlite:///{db_path}")
+    db = sessionmaker(bind=engine)()
+    rows = db.execute(
+        select(*schema_columns(Transaction, TransactionOut, TRANSACTION_OUT_SOURCES)).order_by(Transaction.id)
+    ).all()
+    fast = fast_response(List[TransactionOut], rows)
+
+    expected = [
+        jsonable_encoder(TransactionOut(
+            id=t.id, type=t.transaction_type.value, amount=t.amount, currency=t.currency,
+            timestamp=t.created_at, sender_id=t.user_id, receiver_id=t.recipient_id
+        ))
+        for t in db.query(Transaction).order_by(Transaction.id)
+    ]
+    assert fast.media_type == "application/json"
+    assert json.loads(fast.body) == expected
+
+    with pytest.raises(AttributeError):
+        schema_columns(Transaction, TransactionOut)
+    db.close()
+    engine.dispose()
+
+def test_wallet_transactions_pages(db_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def override_db():
+        async with AsyncSessionLocal() as session:
+            yield session
+
+    app.dependency_overrides[get_async_read_db] = override_db
+    app.dependency_overrides[get_current_user_async] = lambda: Principal(
+        id=1, email="lister@example.com", is_active=True, is_admin=False
+    )
+    try:
+        client = TestClient(app)
+        first = client.get("/wallet/transactions", params={"limit": 3}).json()
+        assert [item["amount"] for item in first["items"]] == [4.0, 3.0, 2.0]
+        assert first["items"][0]["type"] == "TRANSFER"
+        assert first["items"][1]["receiver_id"] == 1
+        second = client.get("/wallet/transactions", params={"limit": 3, "cursor": first["next_cursor"]}).json()
+        assert [item["amount"] for item in second["items"]] == [1.0, 0.0]
+        assert second["next_cursor"] is None
+    finally:
+        app.dependency_overrides.pop(get_async_read_db, None)
+        app.dependency_overrides.pop(get_current_user_async, None)
@@ -0,0 +1,123 @@
+import logging
+from datetime import datetime, timedelta
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.core.config import settings
+from app.database import Base
+from app.middlewares.sql_profiler import SQLProfilerMiddleware
+from app.models.transaction import Transaction, TransactionStatus, TransactionType
+from app.models.user import User
+from app.models.wallet import CurrencyType, Wallet
+from app.tasks.reporting import ReportingService
+from app.utils.sql_profiler import (
+    RequestProfile, current_profile, instrument_engine, normalize_statement, parameter_shape
+)
+
+engine = create_engine(
+    "sqlite://",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+instrument_engine(engine)
+instrument_engine(engine)  # a second call is a no-op
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def override_get_db():
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+app = FastAPI()
+app.add_middleware(SQLProfilerMiddleware)
+
+@app.get("/users/{user_id}")
+def get_user(user_id: int, db: Session = Depends(override_get_db)):
+    # Runs in the threadpool; the profile still follows the request
+    return {"id": db.execute(text("SELECT :id"), {"id": user_id}).scalar()}
+
+@app.get("/n-plus-one")
+def n_plus_one(db: Session = Depends(override_get_db)):
+    return [db.execute(text(f"SELECT {i}")).scalar() for i in range(settings.SQL_REPEAT_THRESHOLD + 1)]
+
+client = TestClient(app)
+
+def setup_module():
+    Base.metadata.create_all(bind=engine)
+
+def teardown_module():
+    Base.metadata.drop_all(bind=engine)
+
+def test_normalize_and_parameter_shape():
+    assert normalize_statement("SELECT * FROM users\n WHERE id = 42 AND name = 'bob'") == \
+        "SELECT * FROM users WHERE id = ? AND name = ?"
+    assert normalize_statement("SELECT * FROM t WHERE id IN (?, ?, ?)") == \
+        normalize_statement("SELECT * FROM t WHERE id IN (:id_1, :id_2)")
+    assert normalize_statement("SELECT col_1 FROM t2") == "SELECT col_1 FROM t2"
+    assert parameter_shape((1, "x", None)) == "(int, str, NoneType)"
+    assert parameter_shape({"amount": 1.5}) == "{amount: float}"
+    assert parameter_shape([(1,), (2,)], executemany=True) == "2 x (int)"
+
+def test_headers_count_request_statements():
+    response = client.get("/users/5")
+    assert response.json() == {"id": 5}
+    assert response.headers["x-db-queries"] == "1"
+    assert float(response.headers["x-db-time-ms"]) >= 0
+
+    # Statements outside a profiled request are not attributed to one
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    assert current_profile.get() is None
+
+def test_repeated_statement_flagged(caplog):
+    with caplog.at_level(logging.WARNING, logger="app.middlewares.sql_profiler"):
+        response = client.get("/n-plus-one")
+    assert response.headers["x-db-queries"] == str(settings.SQL_REPEAT_THRESHOLD + 1)
+    assert "Possible N+1 in GET /n-plus-one" in caplog.text
+    assert "SELECT ?" in caplog.text
+
+    caplog.clear()
+    with caplog.at_level(logging.WARNING, logger="app.middlewares.sql_profiler"):
+        client.get("/users/1")
+    assert "Possible N+1" not in caplog.text
+
+def test_slow_query_logged_with_parameter_shape(caplog, monkeypatch):
+    monkeypatch.setattr(settings, "SQL_SLOW_QUERY_MS", 0)
+    with caplog.at_level(logging.WARNING, logger="app.utils.sql_profiler.slow"):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT :name, :amount"), {"name": "secret-value", "amount": 12.5})
+    assert "SELECT ?, ?" in caplog.text
+    # The shape of the parameters as the driver receives them
+    assert "params=(str, float)" in caplog.text
+    assert "secret-value" not in caplog.text
+
+def test_report_top_users_load_wallets_together():
+    db = TestingSessionLocal()
+    now = datetime.utcnow()
+    for i in range(3):
+        user = User(email=f"top{i}@example.com", username=f"top{i}", hashed_password="x")
+        db.add(user)
+        db.flush()
+        wallet = Wallet(user_id=user.id, balance=0.0, currency=CurrencyType.USD)
+        db.add(wallet)
+        db.flush()
+        db.add(Transaction(user_id=user.id, wallet_id=wallet.id, transaction_type=TransactionType.DEPOSIT,
+                           amount=10.0 * (i + 1), currency="USD", status=TransactionStatus.COMPLETED))
+    db.commit()
+    db.expunge_all()
+
+    profile = RequestProfile("report")
+    token = current_profile.set(profile)
+    try:
+        generator = ReportingService(db)
+        top_users = generator._get_top_users(now - timedelta(hours=1), now + timedelta(hours=1))
+        formatted = generator._format_top_users(top_users)
+    finally:
+        current_profile.reset(token)
+    assert formatted.splitlines()[0] == "- top2: 30.0 USD"
+    assert profile.statements == 2
+    db.close()
@@ -0,0 +1,213 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.database import Base
+from app.models.user import User
+from app.models.wallet import Wallet, WalletShard
+from app.models.balance import UserBalance
+from app.models.transaction import Transaction, TransactionType
+from app.utils.pagination import apply_keyset, build_page
+from app.crud.balance import get_user_balances, rebuild_user_balances
+from app.schemas.transaction import BatchTransactionRequest
+from app.services.transaction import TransactionService
+from app.crud.wallet import set_wallet_shards, wallet_balance
+from app.utils.db_retry import contention, is_retryable_error
+from sqlalchemy.exc import OperationalError
+
+engine = create_engine(
+    "sqlite://",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def setup_module():
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    sender = User(username="batchsender", email="batchsender@example.com")
+    recipient = User(username="batchrecipient", email="batchrecipient@example.com")
+    db.add_all([sender, recipient])
+    db.flush()
+    db.add_all([
+        Wallet(user_id=sender.id, balance=100.0),
+        Wallet(user_id=recipient.id, balance=0.0),
+    ])
+    db.commit()
+    db.close()
+
+def teardown_module():
+    Base.metadata.drop_all(bind=engine)
+
+def make_user(db, username, balance):
+    user = User(username=username, email=f"{username}@example.com")
+    db.add(user)
+    db.flush()
+    db.add(Wallet(user_id=user.id, balance=balance))
+    db.commit()
+    return user
+
+def get_balances(db):
+    return {w.user.username: w.balance for w in db.query(Wallet).all()}
+
+def test_process_batch_modes():
+    db = TestingSessionLocal()
+    sender = db.query(User).filter(User.username == "batchsender").first()
+    recipient = db.query(User).filter(User.username == "batchrecipient").first()
+    batch = BatchTransactionRequest(operations=[
+        {"transaction_type": "DEPOSIT", "amount": 50},
+        {"transaction_type": "TRANSFER", "amount": 120, "recipient_id": recipient.id},
+        {"transaction_type": "WITHDRAWAL", "amount": 100},
+    ])
+
+    result = TransactionService(db).process_batch(sender.id, batch.operations, "atomic")
+    assert result["committed"] is False
+    assert result["results"][2]["error"] == "Insufficient funds"
+    assert get_balances(db) == {"batchsender": 100.0, "batchrecipient": 0.0}
+
+    result = TransactionService(db).process_batch(sender.id, batch.operations, "best_effort")
+    assert result["committed"] is True
+    assert result["processed"] == 2
+    assert [r["success"] for r in result["results"]] == [True, True, False]
+    assert all(r["transaction_id"] for r in result["results"][:2])
+    assert get_balances(db) == {"batchsender": 30.0, "batchrecipient": 120.0}
+    db.close()
+
+def test_user_balances_follow_wallets_and_rebuild():
+    db = TestingSessionLocal()
+    sender = db.query(User).filter(User.username == "batchsender").first()
+    recipient = db.query(User).filter(User.username == "batchrecipient").first()
+    maintained = (get_user_balances(db, sender.id), get_user_balances(db, recipient.id))
+    # The sender's opening balance was seeded when the wallet was created
+    assert maintained == (
+        {"USD": wallet_balance(db, sender.wallet)}, {"USD": wallet_balance(db, recipient.wallet)}
+    )
+
+    db.query(UserBalance).delete()
+    db.commit()
+    assert rebuild_user_balances(db) == 2
+    assert (get_user_balances(db, sender.id), get_user_balances(db, recipient.id)) == maintained
+    db.close()
+
+def test_keyset_pagination_walks_history_once():
+    db = TestingSessionLocal()
+    sender = db.query(User).filter(User.username == "batchsender").first()
+    query = db.query(Transaction).filter(Transaction.user_id == sender.id)
+    expected = [t.id for t in query.order_by(Transaction.created_at.desc(), Transaction.id.desc())]
+
+    seen, cursor = [], None
+    while True:
+        page = build_page(apply_keyset(query, Transaction, cursor, 1).all(), 1)
+        seen.extend(t.id for t in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == expected
+    db.close()
+
+def test_transfers_in_both_directions_and_retry_on_deadlock(monkeypatch):
+    db = TestingSessionLocal()
+    alice = make_user(db, "alice", 100.0)
+    bob = make_user(db, "bob", 100.0)
+    service = TransactionService(db)
+    service.process_transaction(alice.id, 30.0, "USD", TransactionType.TRANSFER, recipient_id=bob.id)
+    service.process_transaction(bob.id, 10.0, "USD", TransactionType.TRANSFER, recipient_id=alice.id)
+
+    # The first attempt loses a deadlock; the retry goes through
+    deadlock = OperationalError("UPDATE wallets", {}, Exception("deadlock detected"))
+    assert is_retryable_error(deadlock)
+    apply = service._apply_transaction
+    attempts = []
+    def flaky(*args):
+        attempts.append(args)
+        if len(attempts) == 1:
+            raise deadlock
+        return apply(*args)
+    monkeypatch.setattr(service, "_apply_transaction", flaky)
+    retries = contention.stats()["retries"]
+    service.process_transaction(alice.id, 5.0, "USD", TransactionType.TRANSFER, recipient_id=bob.id)
+
+    assert len(attempts) == 2
+    assert contention.stats()["retries"] == retries + 1
+    assert contention.stats()["lock_waits"] > 0
+    wallets = {w.user_id: w.balance for w in db.query(Wallet).filter(Wallet.user_id.in_([alice.id, bob.id]))}
+    assert wallets == {alice.id: 75.0, bob.id: 125.0}
+    db.close()
+
+def test_hot_wallet_credits_spread_over_shards():
+    db = TestingSessionLocal()
+    payer = make_user(db, "payer", 100.0)
+    merchant = make_user(db, "merchant", 10.0)
+    wallet = db.query(Wallet).filter(Wallet.user_id == merchant.id).first()
+    set_wallet_shards(db, wallet, 3)
+
+    service = TransactionService(db)
+    for _ in range(3):
+        service.process_transaction(payer.id, 5.0, "USD", TransactionType.TRANSFER, recipient_id=merchant.id)
+    shards = db.query(WalletShard.balance).filter(WalletShard.wallet_id == wallet.id).order_by(WalletShard.shard)
+    assert [balance for balance, in shards] == [5.0, 5.0, 5.0]
+    db.refresh(wallet)
+    assert wallet.balance == 10.0
+    assert wallet_balance(db, wallet) == 25.0
+    assert get_user_balances(db, merchant.id) == {"USD": 25.0}
+
+    # A debit folds the shards back into the wallet row before checking funds
+    service.process_transaction(merchant.id, 20.0, "USD", TransactionType.WITHDRAWAL)
+    db.refresh(wallet)
+    assert wallet.balance == 5.0
+    assert wallet_balance(db, wallet) == 5.0
+
+    set_wallet_shards(db, wallet, 0)
+    assert db.query(WalletShard).filter(WalletShard.wallet_id == wallet.id).count() == 0
+    assert wallet_balance(db, wallet) == 5.0
+    assert get_user_balances(db, merchant.id) == {"USD": 5.0}
+    db.close()
+
+def test_batch_credits_hot_recipients_on_shards_and_retries_on_deadlock(monkeypatch):
+    db = TestingSessionLocal()
+    payer = make_user(db, "batchpayer", 100.0)
+    shop = make_user(db, "batchshop", 10.0)
+    wallet = db.query(Wallet).filter(Wallet.user_id == shop.id).first()
+    set_wallet_shards(db, wallet, 2)
+
+    service = TransactionService(db)
+    apply = service._apply_batch
+    attempts = []
+    def flaky(*args):
+        attempts.append(args)
+        if len(attempts) == 1:
+            raise OperationalError("UPDATE wallets", {}, Exception("deadlock detected"))
+        return apply(*args)
+    monkeypatch.setattr(service, "_apply_batch", flaky)
+    batch = BatchTransactionRequest(operations=[
+        {"transaction_type": "TRANSFER", "amount": 5, "recipient_id": shop.id},
+        {"transaction_type": "DEPOSIT", "amount": 20},
+        {"transaction_type": "TRANSFER", "amount": 7, "recipient_id": shop.id},
+    ])
+    result = service.process_batch(payer.id, batch.operations, "atomic")
+
+    assert len(attempts) == 2
+    assert result["committed"] is True and result["processed"] == 3
+    db.refresh(wallet)
+    # The unlocked wallet row is untouched; the credit sits on a shard
+    assert wallet.balance == 10.0
+    shards = db.query(WalletShard.balance).filter(WalletShard.wallet_id == wallet.id)
+    assert sorted(balance for balance, in shards) == [0.0, 12.0]
+    assert get_user_balances(db, shop.id) == {"USD": wallet_balance(db, wallet)} == {"USD": 22.0}
+    assert get_user_balances(db, payer.id) == {"USD": 108.0}
+    assert db.query(Wallet).filter(Wallet.user_id == payer.id).one().balance == 108.0
+    db.close()
+
+def test_currency_must_match_wallet():
+    db = TestingSessionLocal()
+    payer = db.query(User).filter(User.username == "payer").first()
+    with pytest.raises(HTTPException) as exc:
+        TransactionService(db).process_transaction(payer.id, 5.0, "EUR", TransactionType.DEPOSIT)
+    assert exc.value.detail == "Currency does not match wallet"
+
+    batch = BatchTransactionRequest(operations=[{"transaction_type": "DEPOSIT", "amount": 5, "currency": "EUR"}])
+    result = TransactionService(db).process_batch(payer.id, batch.operations, "best_effort")
+    assert result["results"][0]["error"] == "Currency does not match wallet"
+    assert get_user_balances(db, payer.id) == {"USD": wallet_balance(db, payer.wallet)}
+    db.close()
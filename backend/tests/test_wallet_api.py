@@ -0,0 +1,159 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from app.main import app
+from app.core import models as core_models
+from app.core.database import Base as CoreBase, get_async_db, get_async_read_db
+from app.core.security import Principal, create_access_token, get_current_user_async, principal_cache
+from app.crud.balance import get_user_balances
+from app.crud.wallet import set_wallet_shards, wallet_balance
+from app.database import Base
+from app.models.transaction import Transaction
+from app.models.user import User
+from app.models.wallet import Wallet, WalletShard
+from app.services.transaction import TransactionService
+from app.utils import db_retry
+from app.utils.idempotency import REPLAY_HEADER
+
+@pytest.fixture
+def sessions(tmp_path):
+    path = tmp_path / "wallet_api.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    payer = User(username="payer", email="payer@example.com")
+    merchant = User(username="merchant", email="merchant@example.com")
+    db.add_all([payer, merchant])
+    db.flush()
+    db.add_all([Wallet(user_id=payer.id, balance=100.0), Wallet(user_id=merchant.id, balance=0.0)])
+    db.commit()
+    db.close()
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    async def override_db():
+        async with AsyncSessionLocal() as session:
+            yield session
+
+    app.dependency_overrides[get_async_db] = override_db
+    app.dependency_overrides[get_async_read_db] = override_db
+    app.dependency_overrides[get_current_user_async] = lambda: Principal(
+        id=1, email="payer@example.com", is_active=True, is_admin=False
+    )
+    yield sessionmaker(bind=engine)
+    for dependency in (get_async_db, get_async_read_db, get_current_user_async):
+        app.dependency_overrides.pop(dependency, None)
+    engine.dispose()
+
+def test_deposit_withdraw_and_balance(sessions):
+    client = TestClient(app)
+    response = client.post("/wallet/transactions", json={"type": "deposit", "amount": 50, "currency": "usd"})
+    assert response.status_code == 201
+    assert {key: response.json()[key] for key in ("type", "amount", "currency", "sender_id")} == {
+        "type": "DEPOSIT", "amount": 50.0, "currency": "USD", "sender_id": 1
+    }
+    assert client.post("/wallet/transactions", json={"type": "withdraw", "amount": 30}).status_code == 201
+    assert client.post("/wallet/transactions", json={"type": "refund", "amount": 1}).status_code == 400
+
+    balance = client.get("/wallet/balance").json()
+    assert (balance["balance"], balance["currency"]) == (120.0, "USD")
+    db = sessions()
+    assert get_user_balances(db, 1) == {"USD": 120.0}
+    db.close()
+
+def test_retry_with_idempotency_key_is_replayed(sessions):
+    client = TestClient(app)
+    body = {"type": "deposit", "amount": 10}
+    first = client.post("/wallet/transactions", json=body, headers={"Idempotency-Key": "deposit-1"})
+    retry = client.post("/wallet/transactions", json=body, headers={"Idempotency-Key": "deposit-1"})
+    assert (first.status_code, retry.status_code) == (201, 201)
+    assert retry.headers[REPLAY_HEADER] == "true"
+    assert retry.json() == first.json()
+
+    db = sessions()
+    assert db.query(Transaction).count() == 1
+    assert db.query(Wallet).filter(Wallet.user_id == 1).one().balance == 110.0
+    db.close()
+
+def test_current_user_async_resolves_token_once(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'core.db'}")
+    CoreBase.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    user = core_models.User(email="async@example.com", is_active=True, is_admin=False)
+    db.add(user)
+    db.commit()
+    user_id = user.id
+    db.close()
+    principal_cache.pop(("id", user_id))
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'core.db'}")
+    AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+    token = create_access_token(user_id)
+
+    async def resolve_twice():
+        async with AsyncSessionLocal() as session:
+            first = await get_current_user_async(session, token)
+        # A cached principal needs no session at all
+        second = await get_current_user_async(None, token)
+        await async_engine.dispose()
+        return first, second
+
+    first, second = asyncio.run(resolve_twice())
+    assert first == second == Principal(id=user_id, email="async@example.com", is_active=True, is_admin=False)
+    engine.dispose()
+
+def test_transfer_to_hot_wallet_goes_through_its_shards(sessions):
+    db = sessions()
+    merchant = db.query(Wallet).filter(Wallet.user_id == 2).first()
+    set_wallet_shards(db, merchant, 2)
+    db.close()
+
+    client = TestClient(app)
+    for _ in range(2):
+        response = client.post("/wallet/transactions", json={"type": "transfer", "amount": 10, "receiver_username": "merchant"})
+        assert response.status_code == 201
+    assert response.json()["receiver_id"] == 2
+    assert response.json()["type"] == "TRANSFER"
+
+    response = client.post("/wallet/transactions", json={"type": "withdraw", "amount": 500})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Insufficient funds"
+    response = client.post("/wallet/transactions", json={"type": "transfer", "amount": 1, "receiver_username": "nobody"})
+    assert response.status_code == 404
+
+    db = sessions()
+    merchant = db.query(Wallet).filter(Wallet.user_id == 2).first()
+    shards = db.query(WalletShard.balance).filter(WalletShard.wallet_id == merchant.id).order_by(WalletShard.shard)
+    assert [balance for balance, in shards] == [10.0, 10.0]
+    assert merchant.balance == 0.0
+    assert get_user_balances(db, 2) == {"USD": wallet_balance(db, merchant)} == {"USD": 20.0}
+    assert get_user_balances(db, 1) == {"USD": 80.0}
+    db.close()
+
+def test_lost_deadlock_is_retried_without_blocking_the_loop(sessions, monkeypatch):
+    apply = TransactionService._apply_transaction
+    attempts = []
+    def flaky(self, *args):
+        attempts.append(args)
+        if len(attempts) == 1:
+            raise OperationalError("UPDATE wallets", {}, Exception("database is locked"))
+        return apply(self, *args)
+    def blocking_sleep(seconds):
+        raise AssertionError("time.sleep on the event loop")
+    monkeypatch.setattr(TransactionService, "_apply_transaction", flaky)
+    monkeypatch.setattr(db_retry.time, "sleep", blocking_sleep)
+    retries = db_retry.contention.stats()["retries"]
+
+    client = TestClient(app)
+    response = client.post("/wallet/transactions", json={"type": "deposit", "amount": 5})
+    assert response.status_code == 201
+    assert len(attempts) == 2
+    assert db_retry.contention.stats()["retries"] == retries + 1
+    db = sessions()
+    assert db.query(Wallet).filter(Wallet.user_id == 1).one().balance == 105.0
+    db.close()
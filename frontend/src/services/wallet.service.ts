@@ -1,5 +1,5 @@
 import api from './api';
-import type { Wallet, Transaction, TransactionCreate } from '../types';
+import type { Wallet, Transaction, TransactionCreate, TransactionPage } from '../types';
 
 class WalletService {
   async getWallet(): Promise<Wallet> {
@@ -22,8 +22,10 @@ class WalletService {
     return response.data;
   }
 
-  async getTransactionHistory(): Promise<Transaction[]> {
-    const response = await api.get<Transaction[]>('/transactions/history');
+  async getTransactionHistory(cursor?: string, limit?: number): Promise<TransactionPage> {
+    const response = await api.get<TransactionPage>('/transactions/history', {
+      params: { cursor, limit }
+    });
     return response.data;
   }
 
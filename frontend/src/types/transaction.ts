@@ -11,4 +11,9 @@ export interface Transaction {
   flag_reason?: string;
   status: 'PENDING' | 'COMPLETED' | 'FAILED';
   created_at: string;
-} 
\ No newline at end of file
+}
+
+export interface TransactionPage {
+  items: Transaction[];
+  next_cursor: string | null;
+}